@@ -9,4 +9,5 @@ urlpatterns = [
     path("students/", views.students_list, name="students_list"),
     path("teachers/", views.teachers_list, name="teachers_list"),
     path("courses/", views.courses_list, name="courses_list"),
+    path("sales/", views.sales, name="sales"),                 # تقرير المبيعات من الملخصات
 ]
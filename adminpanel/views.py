@@ -1,4 +1,11 @@
+from datetime import timedelta
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
+from django.utils import timezone
+
+from orders.models import Order
+from orders.reports import last_refreshed_at, sales_report
 from store.models import Booking
 from students.models import Student
 from teachers.models import TeacherProfile, Course
@@ -21,3 +28,28 @@ def teachers_list(request):
 def courses_list(request):
     courses = Course.objects.all()
     return render(request, "adminpanel/courses_list.html", {"courses": courses})
+
+
+@staff_member_required
+def sales(request):
+    """تقرير المبيعات: يقرأ من جداول الملخص اليومية فقط (refresh_sales_rollups)."""
+    try:
+        days = min(max(int(request.GET.get("days", 30)), 1), 366)
+    except ValueError:
+        days = 30
+    status = request.GET.get("status", Order.STATUS_PAID)
+    if status not in dict(Order.STATUS_CHOICES):
+        status = Order.STATUS_PAID
+
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    ctx = {
+        "report": sales_report(start, end, status=status),
+        "start": start,
+        "end": end,
+        "days": days,
+        "status": status,
+        "status_choices": Order.STATUS_CHOICES,
+        "refreshed_at": last_refreshed_at(),
+    }
+    return render(request, "adminpanel/sales.html", ctx)
@@ -1,3 +1,19 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Cart, CartLine
+
+
+class CartLineInline(admin.TabularInline):
+    model = CartLine
+    extra = 0
+    raw_id_fields = ("product",)
+
+
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    """السلال المحفوظة (للمستخدمين والزوار)"""
+    list_display = ("id", "user", "token", "created_at")
+    list_select_related = ("user",)
+    search_fields = ("user__username", "token")
+    ordering = ("-created_at",)
+    inlines = [CartLineInline]
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cart.models import Cart
+
+
+class Command(BaseCommand):
+    help = "حذف سلال الزوار غير المستخدمة منذ مدة (الافتراضي 30 يومًا)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(days=max(1, opts["days"]))
+        stale = (
+            Cart.objects.filter(user__isnull=True, created_at__lt=cutoff)
+            .exclude(lines__updated_at__gte=cutoff)
+        )
+        deleted, _ = stale.delete()
+        self.stdout.write(self.style.SUCCESS(f"تم حذف {deleted} سجل."))
@@ -0,0 +1,41 @@
+# cart/middleware.py
+from __future__ import annotations
+
+from django.conf import settings
+
+from .store import COOKIE_MAX_AGE, COOKIE_NAME
+
+_CLEAR_ATTR = "_cart_cookie_clear"
+
+
+class CartCookieMiddleware:
+    """
+    يضبط كوكي سلة الزائر عند إنشاء سلة جديدة ويحذفها بعد دمجها عند تسجيل الدخول.
+    لا يلمس الطلبات التي لم تعدّل السلة.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if getattr(request, _CLEAR_ATTR, False):
+            response.delete_cookie(COOKIE_NAME, samesite="Lax")
+            return response
+
+        store = getattr(request, "_cart_store", None)
+        if store is not None and store.new_token:
+            response.set_cookie(
+                COOKIE_NAME,
+                store.new_token,
+                max_age=COOKIE_MAX_AGE,
+                httponly=True,
+                samesite="Lax",
+                secure=getattr(settings, "SESSION_COOKIE_SECURE", False),
+            )
+        return response
+
+
+def clear_cart_cookie(request) -> None:
+    setattr(request, _CLEAR_ATTR, True)
@@ -1,3 +1,57 @@
+from __future__ import annotations
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from store.models import Product
+
+
+# =========================
+#          السلة
+# =========================
+class Cart(models.Model):
+    """
+    سلة واحدة لكل مستخدم مسجل، أو لكل زائر عبر رمز مجهول (كوكي cart_token).
+    سلة الزائر تُدمج في سلة المستخدم عند تسجيل الدخول (cart/signals.py).
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="cart",
+        verbose_name="المستخدم",
+    )
+    token = models.CharField("رمز الزائر", max_length=64, unique=True, null=True, blank=True)
+
+    created_at = models.DateTimeField("تاريخ الإنشاء", default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "سلة"
+        verbose_name_plural = "السلال"
+
+    def __str__(self):
+        owner = getattr(self.user, "username", None) or f"زائر {self.token[:8] if self.token else '—'}"
+        return f"سلة {owner}"
+
+
+class CartLine(models.Model):
+    """سطر واحد لكل منتج في السلة؛ الكمية تتغير بعبارات UPDATE ذرية (F())."""
+
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="lines", verbose_name="السلة")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+", verbose_name="المنتج")
+    quantity = models.PositiveIntegerField("الكمية", default=1)
+    # يُضبط صراحة مع كل UPDATE (auto_now لا يعمل مع QuerySet.update)
+    updated_at = models.DateTimeField("آخر تعديل", default=timezone.now)
+
+    class Meta:
+        verbose_name = "سطر سلة"
+        verbose_name_plural = "أسطر السلة"
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="cart_line_unique_product"),
+        ]
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.product_id} × {self.quantity}"
@@ -0,0 +1,20 @@
+# cart/signals.py
+from __future__ import annotations
+
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from .middleware import clear_cart_cookie
+from .store import COOKIE_NAME, merge_anonymous_cart
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    """دمج سلة الزائر (إن وُجدت) في سلة المستخدم عند تسجيل الدخول."""
+    token = request.COOKIES.get(COOKIE_NAME) if request is not None else None
+    if not token:
+        return
+    merge_anonymous_cart(token, user)
+    clear_cart_cookie(request)
+    # سلة الطلب الحالي (إن حُمّلت) أصبحت قديمة
+    request.__dict__.pop("_cart_store", None)
@@ -0,0 +1,204 @@
+# cart/store.py
+from __future__ import annotations
+
+import secrets
+from typing import Dict, Mapping, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from store.pricing import MAX_QTY_PER_ITEM, normalize_cart
+
+from .models import Cart, CartLine
+
+# =========================
+#        الإعدادات
+# =========================
+COOKIE_NAME = "cart_token"
+COOKIE_MAX_AGE = 60 * 60 * 24 * 30        # 30 يومًا لسلة الزائر
+
+_REQUEST_ATTR = "_cart_store"
+
+
+def get_cart(request) -> "CartStore":
+    """مخزن السلة للطلب الحالي (نسخة واحدة لكل طلب)."""
+    store = getattr(request, _REQUEST_ATTR, None)
+    if store is None:
+        store = CartStore(request)
+        setattr(request, _REQUEST_ATTR, store)
+    return store
+
+
+class CartStore:
+    """
+    واجهة السلة التي تستخدمها الـ views بدل قاموس الجلسة:
+    - القراءة: as_dict() بنفس الشكل القديم {"product_id": quantity}.
+    - التعديل: add / decrement / set / remove / clear / replace؛ كل عملية
+      عبارة واحدة على سطر واحد (F() وLeast) فلا تضيع تعديلات تبويبين متزامنين.
+    - لا كتابة في الجلسة إطلاقًا؛ سلة الزائر تُعرف بكوكي cart_token
+      (يضبطها cart.middleware.CartCookieMiddleware عند إنشاء سلة جديدة).
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.new_token: Optional[str] = None
+        self._cart_id: Optional[int] = None
+        self._resolved = False
+        self._lines: Optional[Dict[str, int]] = None
+
+    # ===== تحديد السلة =====
+    @property
+    def _user(self):
+        user = getattr(self.request, "user", None)
+        return user if getattr(user, "is_authenticated", False) else None
+
+    def _lookup(self) -> Optional[int]:
+        if not self._resolved:
+            if self._user is not None:
+                self._cart_id = Cart.objects.filter(user=self._user).values_list("pk", flat=True).first()
+            else:
+                token = self.request.COOKIES.get(COOKIE_NAME)
+                self._cart_id = (
+                    Cart.objects.filter(token=token, user__isnull=True).values_list("pk", flat=True).first()
+                    if token else None
+                )
+            self._resolved = True
+        return self._cart_id
+
+    def _ensure(self) -> int:
+        """إنشاء السلة عند أول كتابة فقط."""
+        cart_id = self._lookup()
+        if cart_id is not None:
+            return cart_id
+        if self._user is not None:
+            cart, _ = Cart.objects.get_or_create(user=self._user)
+        else:
+            self.new_token = secrets.token_urlsafe(32)
+            cart = Cart.objects.create(token=self.new_token)
+        self._cart_id = cart.pk
+        return cart.pk
+
+    def _lines_qs(self, product_id: int):
+        return CartLine.objects.filter(cart_id=self._ensure(), product_id=product_id)
+
+    def _touch(self) -> None:
+        self._lines = None
+
+    # ===== القراءة =====
+    def as_dict(self) -> Dict[str, int]:
+        if self._lines is None:
+            cart_id = self._lookup()
+            self._lines = {} if cart_id is None else {
+                str(pid): qty
+                for pid, qty in CartLine.objects.filter(cart_id=cart_id).values_list("product_id", "quantity")
+            }
+        return self._lines
+
+    def quantity(self, product_id: int) -> int:
+        return self.as_dict().get(str(product_id), 0)
+
+    def __bool__(self) -> bool:
+        return bool(self.as_dict())
+
+    def __len__(self) -> int:
+        return sum(self.as_dict().values())
+
+    # ===== التعديل =====
+    def add(self, product_id: int, quantity: int = 1, limit: int = MAX_QTY_PER_ITEM) -> None:
+        """زيادة ذرية مع سقف؛ السطر يُنشأ إن لم يكن موجودًا."""
+        quantity = max(int(quantity), 1)
+        qs = self._lines_qs(product_id)
+        if not qs.update(quantity=Least(F("quantity") + quantity, limit), updated_at=timezone.now()):
+            try:
+                with transaction.atomic():
+                    CartLine.objects.create(
+                        cart_id=self._cart_id, product_id=product_id, quantity=min(quantity, limit),
+                    )
+            except IntegrityError:
+                # تبويب آخر أنشأ السطر للتو
+                qs.update(quantity=Least(F("quantity") + quantity, limit), updated_at=timezone.now())
+        self._touch()
+
+    def decrement(self, product_id: int, quantity: int = 1) -> None:
+        """إنقاص ذري؛ السطر يُحذف عند الوصول للصفر."""
+        quantity = max(int(quantity), 1)
+        qs = self._lines_qs(product_id)
+        if not qs.filter(quantity__gt=quantity).update(
+            quantity=F("quantity") - quantity, updated_at=timezone.now(),
+        ):
+            qs.filter(quantity__lte=quantity).delete()
+        self._touch()
+
+    def set(self, product_id: int, quantity: int) -> None:
+        """ضبط كمية مطلقة (0 = إزالة)."""
+        quantity = min(int(quantity), MAX_QTY_PER_ITEM)
+        if quantity <= 0:
+            return self.remove(product_id)
+        if not self._lines_qs(product_id).update(quantity=quantity, updated_at=timezone.now()):
+            CartLine.objects.bulk_create(
+                [CartLine(cart_id=self._cart_id, product_id=product_id, quantity=quantity)],
+                ignore_conflicts=True,
+            )
+        self._touch()
+
+    def remove(self, product_id: int) -> bool:
+        cart_id = self._lookup()
+        if cart_id is None:
+            return False
+        deleted, _ = CartLine.objects.filter(cart_id=cart_id, product_id=product_id).delete()
+        self._touch()
+        return bool(deleted)
+
+    def clear(self) -> None:
+        cart_id = self._lookup()
+        if cart_id is not None:
+            CartLine.objects.filter(cart_id=cart_id).delete()
+        self._touch()
+
+    def replace(self, cart: Mapping) -> None:
+        """استبدال محتوى السلة بالكامل (مثل زر "احجز الآن")."""
+        clean = normalize_cart(cart)
+        with transaction.atomic():
+            cart_id = self._ensure()
+            CartLine.objects.filter(cart_id=cart_id).delete()
+            CartLine.objects.bulk_create(
+                [CartLine(cart_id=cart_id, product_id=pid, quantity=qty) for pid, qty in clean.items()]
+            )
+        self._touch()
+
+
+# =========================
+#     الدمج عند الدخول
+# =========================
+def merge_anonymous_cart(token: str, user) -> int:
+    """
+    دمج سلة الزائر في سلة المستخدم: الكميات تُجمع (مع السقف)، ثم تُحذف سلة الزائر.
+    عدد استعلامات ثابت مهما كان عدد الأسطر. تُرجع عدد الأسطر المدموجة.
+    """
+    anon = Cart.objects.filter(token=token, user__isnull=True).values_list("pk", flat=True).first()
+    if anon is None:
+        return 0
+    with transaction.atomic():
+        incoming = dict(CartLine.objects.filter(cart_id=anon).values_list("product_id", "quantity"))
+        if incoming:
+            cart, _ = Cart.objects.get_or_create(user=user)
+            existing = {
+                line.product_id: line
+                for line in CartLine.objects.select_for_update().filter(cart=cart, product_id__in=incoming)
+            }
+            now = timezone.now()
+            for pid, line in existing.items():
+                line.quantity = min(line.quantity + incoming[pid], MAX_QTY_PER_ITEM)
+                line.updated_at = now
+            CartLine.objects.bulk_update(existing.values(), ["quantity", "updated_at"])
+            CartLine.objects.bulk_create(
+                [
+                    CartLine(cart=cart, product_id=pid, quantity=min(qty, MAX_QTY_PER_ITEM))
+                    for pid, qty in incoming.items() if pid not in existing
+                ],
+                ignore_conflicts=True,
+            )
+        Cart.objects.filter(pk=anon).delete()
+    return len(incoming)
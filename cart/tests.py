@@ -1,3 +1,191 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import CustomUser
+from store.models import Category, Product
+from store.pricing import MAX_QTY_PER_ITEM
+
+from .models import Cart, CartLine
+from .store import COOKIE_NAME, CartStore
+from .views import MAX_CHANGES_PER_REQUEST
+
+
+class CartStoreTests(TestCase):
+    """السلة في جدول: كل تعديل عبارة واحدة بسقف، وسلة الزائر بكوكي، والدمج عند الدخول."""
+
+    def setUp(self):
+        category = Category.objects.create(name="مكتبية")
+        self.pen = Product.objects.create(name="قلم", price="2.00", category=category)
+        self.book = Product.objects.create(name="دفتر", price="8.00", category=category)
+        self.user = CustomUser.objects.create_user("shopper", password="pass-12345", role="student")
+
+    def _store(self, user=None, token=None):
+        request = RequestFactory().get("/")
+        request.user = user or AnonymousUser()
+        if token:
+            request.COOKIES[COOKIE_NAME] = token
+        return CartStore(request)
+
+    def test_add_respects_the_cap(self):
+        cart = self._store(self.user)
+        cart.add(self.pen.pk, 5, limit=3)
+        cart.add(self.pen.pk, limit=3)
+        self.assertEqual(cart.quantity(self.pen.pk), 3)
+
+        cart.add(self.book.pk, MAX_QTY_PER_ITEM + 10)
+        self.assertEqual(cart.quantity(self.book.pk), MAX_QTY_PER_ITEM)
+        self.assertEqual(len(cart), 3 + MAX_QTY_PER_ITEM)
+
+    def test_decrement_deletes_at_zero(self):
+        cart = self._store(self.user)
+        cart.add(self.pen.pk, 3)
+        cart.decrement(self.pen.pk)
+        self.assertEqual(cart.quantity(self.pen.pk), 2)
+        cart.decrement(self.pen.pk, 5)
+        self.assertFalse(CartLine.objects.filter(product=self.pen).exists())
+        self.assertFalse(cart)
+
+    def test_set_caps_and_zero_removes(self):
+        cart = self._store(self.user)
+        cart.set(self.pen.pk, MAX_QTY_PER_ITEM + 1)
+        self.assertEqual(cart.quantity(self.pen.pk), MAX_QTY_PER_ITEM)
+        cart.set(self.pen.pk, 2)
+        self.assertEqual(cart.as_dict(), {str(self.pen.pk): 2})
+        cart.set(self.pen.pk, 0)
+        self.assertEqual(cart.as_dict(), {})
+        self.assertFalse(cart.remove(self.pen.pk))
+
+    def test_reading_does_not_create_a_cart(self):
+        cart = self._store()
+        self.assertEqual(cart.as_dict(), {})
+        self.assertIsNone(cart.new_token)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_guest_cart_lives_in_the_cookie(self):
+        response = self.client.post(
+            reverse("cart:cart_lines"), {"product_id": self.pen.pk, "action": "add", "quantity": 2},
+        )
+        self.assertEqual(response.status_code, 200)
+        token = response.cookies[COOKIE_NAME].value
+        self.assertTrue(response.cookies[COOKIE_NAME]["httponly"])
+        self.assertEqual(Cart.objects.get(token=token).lines.get().quantity, 2)
+
+        # الطلب التالي بنفس الكوكي يقرأ السلة نفسها ولا يعيد ضبط الكوكي
+        response = self.client.post(reverse("cart:cart_lines"), {"product_id": self.pen.pk, "action": "add"})
+        self.assertNotIn(COOKIE_NAME, response.cookies)
+        self.assertEqual(self._store(token=token).as_dict(), {str(self.pen.pk): 3})
+
+        # الكوكي لا يفتح سلة مستخدم مسجّل
+        Cart.objects.filter(token=token).update(user=self.user)
+        self.assertEqual(self._store(token=token).as_dict(), {})
+
+    def test_guest_cart_merges_on_login(self):
+        self._store(self.user).add(self.pen.pk, MAX_QTY_PER_ITEM - 1)
+        guest = self._store()
+        guest.add(self.pen.pk, 2)
+        guest.add(self.book.pk)
+
+        self.client.cookies[COOKIE_NAME] = guest.new_token
+        response = self.client.post(reverse("login"), {"username": "shopper", "password": "pass-12345"})
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(
+            self._store(self.user).as_dict(),
+            {str(self.pen.pk): MAX_QTY_PER_ITEM, str(self.book.pk): 1},
+        )
+        self.assertFalse(Cart.objects.filter(token=guest.new_token).exists())
+        self.assertEqual(response.cookies[COOKIE_NAME].value, "")
+
+
+@override_settings(STORE_TAX_RATE_BP=1500)
+class CartLinesViewTests(TestCase):
+    """تعديل الأسطر بالدفعة: JSON أو حقول نموذج، وأجزاء HTMX للأسطر المتأثرة والملخص فقط."""
+
+    def setUp(self):
+        category = Category.objects.create(name="مكتبية")
+        self.pen = Product.objects.create(name="قلم", price="2.00", category=category)
+        self.book = Product.objects.create(name="دفتر", price="8.00", category=category)
+        self.gone = Product.objects.create(name="نافد", price="5.00", category=category, available=False)
+        self.user = CustomUser.objects.create_user("editor", password="pass-12345", role="student")
+        self.client.force_login(self.user)
+        self.url = reverse("cart:cart_lines")
+
+    def _json(self, changes, **extra):
+        return self.client.post(self.url, json.dumps({"changes": changes}), content_type="application/json", **extra)
+
+    def _cart(self):
+        return dict(CartLine.objects.filter(cart__user=self.user).values_list("product_id", "quantity"))
+
+    def test_json_batch(self):
+        response = self._json([
+            {"product_id": self.pen.pk, "action": "add", "quantity": 3},
+            {"product_id": self.book.pk, "action": "set", "quantity": 2},
+            {"product_id": self.pen.pk, "action": "decrease"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(self._cart(), {self.pen.pk: 2, self.book.pk: 2})
+        self.assertEqual(
+            [(line["product_id"], line["quantity"], line["subtotal"]) for line in data["lines"]],
+            [(self.pen.pk, 2, "4.00"), (self.book.pk, 2, "16.00")],
+        )
+        self.assertEqual(
+            {k: data["totals"][k] for k in ("items_count", "subtotal", "tax", "grand_total")},
+            {"items_count": 4, "subtotal": "20.00", "tax": "3.00", "grand_total": "23.00"},
+        )
+        self.assertIn(f'id="cart-line-{self.pen.pk}"', data["lines"][0]["html"])
+        self.assertNotIn("hx-swap-oob", data["lines"][0]["html"])
+
+    def test_form_encoded_single_change(self):
+        response = self.client.post(self.url, {"product_id": self.book.pk, "action": "increase"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._cart(), {self.book.pk: 1})
+        self.assertEqual(response.json()["totals"]["items_count"], 1)
+
+    def test_htmx_returns_oob_fragments_with_deleted_row(self):
+        self._json([{"product_id": self.pen.pk, "action": "add"}, {"product_id": self.book.pk, "action": "add"}])
+        response = self._json(
+            [{"product_id": self.pen.pk, "action": "remove"}, {"product_id": self.book.pk, "action": "add"}],
+            HTTP_HX_REQUEST="true",
+        )
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        self.assertIn(f'<tr id="cart-line-{self.pen.pk}" hx-swap-oob="delete"></tr>', html)
+        self.assertIn(f'<tr id="cart-line-{self.book.pk}" hx-swap-oob="true">', html)
+        self.assertIn('id="cart-summary" hx-swap-oob="true"', html)
+        self.assertEqual(self._cart(), {self.book.pk: 2})
+
+    def test_change_count_is_capped(self):
+        changes = [{"product_id": self.pen.pk, "action": "add"}] * (MAX_CHANGES_PER_REQUEST + 1)
+        response = self._json(changes)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(MAX_CHANGES_PER_REQUEST), response.json()["error"])
+        self.assertEqual(self._cart(), {})
+
+        self.assertEqual(self._json(changes[:MAX_CHANGES_PER_REQUEST]).status_code, 200)
+        self.assertEqual(self._cart(), {self.pen.pk: MAX_CHANGES_PER_REQUEST})
+
+    def test_unknown_or_unavailable_product_is_rejected(self):
+        response = self._json([
+            {"product_id": self.pen.pk, "action": "add"},
+            {"product_id": self.gone.pk, "action": "add"},
+            {"product_id": 999999, "action": "set", "quantity": 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["product_ids"], [self.gone.pk, 999999])
+        self.assertEqual(self._cart(), {})
+
+    def test_malformed_changes_are_rejected(self):
+        malformed = (
+            [],
+            [{"product_id": self.pen.pk, "action": "explode"}],
+            [{"product_id": "x", "action": "add"}],
+            [{"product_id": self.pen.pk, "action": "add", "quantity": 0}],
+        )
+        for changes in malformed:
+            self.assertEqual(self._json(changes).status_code, 400, changes)
+        bad = self.client.post(self.url, "{", content_type="application/json")
+        self.assertEqual(bad.status_code, 400)
@@ -7,4 +7,5 @@ urlpatterns = [
     path("", views.cart_detail, name="cart_detail"),
     path("add/<int:product_id>/", views.add_to_cart, name="add_to_cart"),
     path("remove/<int:product_id>/", views.remove_from_cart, name="remove_from_cart"),
+    path("lines/", views.cart_lines, name="cart_lines"),   # تعديل أسطر بالدفعة (JSON/HTMX)
 ]
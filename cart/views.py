@@ -1,28 +1,20 @@
 from __future__ import annotations
 
-from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List
+import json
+from typing import List, Tuple
 
 from django.contrib import messages
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST
 from django.utils.http import url_has_allowed_host_and_scheme
 
 from store.models import Product  # تأكد من المسار الصحيح لموديل المنتج
+from store.pricing import MAX_QTY_PER_ITEM, price_request_cart
 
-# مفاتيح وإعدادات بسيطة
-CART_SESSION_KEY = "cart"
-MAX_QTY_PER_ITEM = 99
-
-
-def _get_cart(request) -> Dict[str, int]:
-    """إحضار السلة من السيشن (قاموس: product_id كسلسلة -> quantity)."""
-    return request.session.get(CART_SESSION_KEY, {})
-
-
-def _save_cart(request, cart: Dict[str, int]) -> None:
-    """حفظ السلة في السيشن."""
-    request.session[CART_SESSION_KEY] = cart
+from .store import get_cart
 
 
 def _safe_redirect_next(request, fallback_name: str = "cart_detail"):
@@ -44,20 +36,18 @@ def add_to_cart(request, product_id: int):
     - يدعم حقول stock اختياريًا (إن وجدت).
     """
     product = get_object_or_404(Product, pk=product_id)
-    cart = _get_cart(request)
-    key = str(product_id)
-
-    current_qty = int(cart.get(key, 0))
-    new_qty = min(current_qty + 1, MAX_QTY_PER_ITEM)
+    cart = get_cart(request)
+    limit = MAX_QTY_PER_ITEM
 
     # تحقق اختياري من المخزون إن كان الحقل موجودًا
     if hasattr(product, "stock") and product.stock is not None:
-        if new_qty > int(product.stock):
+        limit = min(limit, int(product.stock))
+        if cart.quantity(product_id) + 1 > limit:
             messages.warning(request, "الكمية المطلوبة تتجاوز المخزون المتاح.")
             return _safe_redirect_next(request)
 
-    cart[key] = new_qty
-    _save_cart(request, cart)
+    # زيادة ذرية بسقف داخل عبارة UPDATE نفسها
+    cart.add(product_id, limit=limit)
     messages.success(request, f"تمت إضافة «{product.name}» إلى السلة.")
 
     return _safe_redirect_next(request)
@@ -68,11 +58,7 @@ def remove_from_cart(request, product_id: int):
     """
     إزالة منتج من السلة بالكامل.
     """
-    cart = _get_cart(request)
-    key = str(product_id)
-    if key in cart:
-        del cart[key]
-        _save_cart(request, cart)
+    if get_cart(request).remove(product_id):
         messages.success(request, "تمت إزالة المنتج من السلة.")
     else:
         messages.info(request, "المنتج غير موجود في السلة.")
@@ -82,41 +68,138 @@ def remove_from_cart(request, product_id: int):
 
 def cart_detail(request):
     """
-    عرض تفاصيل السلة مع حساب الإجمالي.
-    نبني مصفوفة cart_items: [{product, quantity, unit_price, subtotal}, ...]
+    عرض تفاصيل السلة مع حساب الإجمالي عبر محرك التسعير الموحّد (استعلام واحد).
+    cart_items: أسطر مسعّرة (product, quantity, unit_price, subtotal).
     """
-    cart = _get_cart(request)
-    cart_items: List[dict] = []
-    total = Decimal("0.00")
+    priced = price_request_cart(request, get_cart(request).as_dict())
+    return render(request, "cart/cart_detail.html", {
+        "cart": priced,
+        "cart_items": priced.lines,
+        "cart_total": priced.subtotal,
+        "tax": priced.tax,
+        "grand_total": priced.grand_total,
+    })
 
-    for pid_str, qty in cart.items():
-        try:
-            pid = int(pid_str)
-            quantity = int(qty)
-        except (TypeError, ValueError):
-            # تجاهل المدخلات الفاسدة
-            continue
 
-        product = get_object_or_404(Product, pk=pid)
-        unit_price = product.price if hasattr(product, "price") and product.price is not None else Decimal("0.00")
+# =========================
+#   تعديل أسطر السلة (JSON/HTMX)
+# =========================
+MAX_CHANGES_PER_REQUEST = 50
 
-        # تأكد أن السعر Decimal
-        if not isinstance(unit_price, Decimal):
-            unit_price = Decimal(str(unit_price))
+# الاسم المرسل ← دالة CartStore المقابلة
+_ACTIONS = {
+    "add": "add", "increase": "add",
+    "decrease": "decrement", "decrement": "decrement",
+    "set": "set",
+    "remove": "remove",
+}
 
-        subtotal = (unit_price * quantity).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        total += subtotal
 
-        cart_items.append({
-            "product": product,
-            "quantity": quantity,
-            "unit_price": unit_price,
-            "subtotal": subtotal,
-        })
+class _BadChange(ValueError):
+    pass
 
-    total = total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
-    return render(request, "cart/cart_detail.html", {
-        "cart_items": cart_items,
-        "cart_total": total,
+def _parse_changes(request) -> List[Tuple[int, str, int]]:
+    """
+    التغييرات من JSON ({"changes": [...]} أو تغيير واحد) أو من حقول نموذج
+    (product_id, action, quantity). كل تغيير: (product_id, action, quantity).
+    """
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            raise _BadChange("invalid JSON")
+        raw = data.get("changes", [data]) if isinstance(data, dict) else data
+    else:
+        raw = [request.POST.dict()]
+
+    if not isinstance(raw, list) or not raw:
+        raise _BadChange("no changes")
+    if len(raw) > MAX_CHANGES_PER_REQUEST:
+        raise _BadChange(f"at most {MAX_CHANGES_PER_REQUEST} changes per request")
+
+    changes = []
+    for item in raw:
+        if not isinstance(item, dict):
+            raise _BadChange("each change must be an object")
+        action = _ACTIONS.get(str(item.get("action", "")))
+        if action is None:
+            raise _BadChange(f"unknown action: {item.get('action')!r}")
+        try:
+            product_id = int(item.get("product_id"))
+            quantity = int(item.get("quantity", 0 if action == "set" else 1))
+        except (TypeError, ValueError):
+            raise _BadChange("product_id and quantity must be integers")
+        if quantity < 0 or (action != "set" and quantity == 0):
+            raise _BadChange("invalid quantity")
+        changes.append((product_id, action, quantity))
+    return changes
+
+
+@require_POST
+def cart_lines(request):
+    """
+    تطبيق دفعة تغييرات على أسطر السلة في طلب واحد، وإرجاع الأسطر المتأثرة
+    والملخص فقط بدل إعادة عرض الصفحة كاملة:
+    - JSON: {"lines": [{product_id, quantity, subtotal, html}], "totals": {..., html}}.
+    - HTMX (ترويسة HX-Request): أجزاء HTML مع hx-swap-oob.
+    كل تغيير عبارة UPDATE ذرية واحدة (cart.store)، والتسعير استعلام واحد للسلة.
+    """
+    try:
+        changes = _parse_changes(request)
+    except _BadChange as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    cart = get_cart(request)
+    adding = {pid for pid, action, _ in changes if action in ("add", "set")}
+    if adding:
+        known = set(Product.objects.filter(pk__in=adding, available=True).values_list("pk", flat=True))
+        if adding - known:
+            return JsonResponse({"error": "unknown product", "product_ids": sorted(adding - known)}, status=400)
+
+    with transaction.atomic():
+        for product_id, action, quantity in changes:
+            if action == "remove":
+                cart.remove(product_id)
+            elif action == "set":
+                cart.set(product_id, quantity)
+            elif action == "decrement":
+                cart.decrement(product_id, quantity)
+            else:
+                cart.add(product_id, quantity)
+
+    priced = price_request_cart(request, cart.as_dict())
+    by_product = {line.product.pk: line for line in priced.lines}
+    touched = list(dict.fromkeys(pid for pid, _, _ in changes))
+    htmx = request.headers.get("HX-Request") == "true"
+
+    def line_html(pid):
+        line = by_product.get(pid)
+        if line is None:
+            return f'<tr id="cart-line-{pid}" hx-swap-oob="delete"></tr>' if htmx else ""
+        return render_to_string("store/partials/cart_line.html", {"it": line, "oob": htmx}, request=request)
+
+    summary_html = render_to_string("store/partials/cart_summary.html", {"cart": priced, "oob": htmx})
+
+    if htmx:
+        return HttpResponse("".join(line_html(pid) for pid in touched) + summary_html)
+
+    return JsonResponse({
+        "lines": [
+            {
+                "product_id": pid,
+                "quantity": by_product[pid].quantity if pid in by_product else 0,
+                "subtotal": str(by_product[pid].subtotal) if pid in by_product else "0.00",
+                "html": line_html(pid),
+            }
+            for pid in touched
+        ],
+        "totals": {
+            "items_count": priced.items_count,
+            "subtotal": str(priced.subtotal),
+            "tax": str(priced.tax),
+            "grand_total": str(priced.grand_total),
+            "is_empty": priced.is_empty,
+            "html": summary_html,
+        },
     })
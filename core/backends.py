@@ -0,0 +1,22 @@
+# core/backends.py
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .profiles import PROFILE_ACCESSORS
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    مثل ModelBackend، لكن تحميل مستخدم الجلسة يجلب ملف الطالب/المعلّم
+    في نفس الاستعلام (LEFT JOIN)، فلا يحتاج request.profile ولا student_for/teacher_profile_for أي استعلام إضافي.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related(*PROFILE_ACCESSORS).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,189 @@
+# core/media.py
+from __future__ import annotations
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.utils.http import http_date, parse_http_date_safe
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _accel_mode() -> str:
+    return (getattr(settings, "MEDIA_ACCEL", "") or "").lower()
+
+
+def _accel_roots() -> dict[str, str]:
+    """
+    الجذور المحلية وأسماؤها في موقع nginx الداخلي، مثال:
+        location /protected/media/  { internal; alias <MEDIA_ROOT>/; }
+        location /protected/staged/ { internal; alias <MEDIA_STAGING_DIR>/; }
+    """
+    roots = {"media": getattr(settings, "MEDIA_ROOT", "")}
+    staging = getattr(settings, "MEDIA_STAGING_DIR", "")
+    if staging:
+        roots["staged"] = staging
+    return {key: os.path.realpath(root) for key, root in roots.items() if root}
+
+
+def _accel_uri(path: str) -> str | None:
+    prefix = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected/")
+    for key, root in _accel_roots().items():
+        if path.startswith(root + os.sep):
+            return f"{prefix.rstrip('/')}/{key}/{quote(os.path.relpath(path, root))}"
+    return None
+
+
+def _etag(stat) -> str:
+    # قوي (مطلوب لـ If-Range): الحجم + زمن التعديل بالنانوثانية
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    نطاق واحد "bytes=a-b" / "bytes=a-" / "bytes=-n" → (البداية، النهاية شاملة).
+    يُرجع None لترويسة لا نفهمها أو نطاقات متعددة (يُرسل الملف كاملًا كما يسمح RFC 9110)،
+    و(-1, -1) لنطاق خارج الملف (416).
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return -1, -1
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return -1, -1
+    return start, end
+
+
+class _RangeFile:
+    """
+    ملف مقيّد بنطاق: القراءة تتوقف عند النهاية (خوادم بلا sendfile/اختبارات)،
+    وfileno() مع موضع الملف الفعلي يسمحان لـ wsgi.file_wrapper في gunicorn/uWSGI
+    باستدعاء os.sendfile على البايتات المطلوبة فقط (Content-Length يحدّ الطول).
+    """
+
+    def __init__(self, fh, start: int, length: int):
+        self._fh = fh
+        self._remaining = length
+        fh.seek(start)
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self._fh.fileno()
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _has_signed_url(fieldfile) -> bool:
+    storage = fieldfile.storage
+    check = getattr(storage, "has_signed_url", None)
+    if check is not None:
+        return check(fieldfile.name)
+    return bool(getattr(storage, "signed_urls", False))
+
+
+def _disposition(filename: str, as_attachment: bool) -> str:
+    return f"{'attachment' if as_attachment else 'inline'}; filename*=UTF-8''{quote(filename)}"
+
+
+def serve_file(request, fieldfile, *, as_attachment: bool = False) -> HttpResponse:
+    """
+    تسليم ملف بعد أن تحقّق المستدعي من الصلاحية:
+    - تخزين بعيد برابط موقّع مؤقت (teachers.storage.course_media_storage): تحويل إليه،
+      فالبايتات لا تمر بالعملية. التخزين البعيد برابط عام دائم خطأ إعداد لا يُسلَّم.
+    - MEDIA_ACCEL="nginx": X-Accel-Redirect لموقع داخلي؛ "apache": X-Sendfile بالمسار
+      (Apache mod_xsendfile / lighttpd).
+    - وإلا من العملية عبر FileResponse/sendfile مع Range وIf-Range وETag.
+    """
+    filename = os.path.basename(fieldfile.name)
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    try:
+        path = os.path.realpath(fieldfile.path)
+    except NotImplementedError:
+        if not _has_signed_url(fieldfile):
+            raise ImproperlyConfigured(
+                f"{type(fieldfile.storage).__name__} لا يعطي روابط موقّعة: ملفات المقررات على course_media_storage."
+            )
+        response = HttpResponseRedirect(fieldfile.url)
+        # الرابط ينتهي قريبًا: لا يُخزَّن التحويل في أي كاش
+        response["Cache-Control"] = "private, no-store"
+        return response
+
+    mode = _accel_mode()
+    if mode == "nginx":
+        header, value = "X-Accel-Redirect", _accel_uri(path)
+    elif mode == "apache":
+        header, value = "X-Sendfile", path
+    else:
+        header = value = None
+    if value:
+        # الوكيل الأمامي يقرأ الملف ويتولى Range/If-Range بنفسه
+        response = HttpResponse(content_type=content_type)
+        response[header] = value
+        response["Content-Disposition"] = _disposition(filename, as_attachment)
+        return response
+
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        raise Http404("الملف غير موجود.")
+
+    stat = os.fstat(fh.fileno())
+    size, etag = stat.st_size, _etag(stat)
+    last_modified = http_date(stat.st_mtime)
+
+    if etag in (request.headers.get("If-None-Match") or ""):
+        fh.close()
+        return HttpResponseNotModified(headers={"ETag": etag})
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.method in ("GET", "HEAD"):
+        if_range = (request.headers.get("If-Range") or "").strip()
+        # If-Range غير المطابق (ETag أو تاريخ) يعني أن الملف تغيّر: يُرسل كاملًا
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == int(stat.st_mtime):
+            byte_range = _parse_range(range_header, size)
+
+    if byte_range == (-1, -1):
+        fh.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    response = FileResponse(
+        _RangeFile(fh, start, length), content_type=content_type,
+        as_attachment=as_attachment, filename=filename,
+    )
+    response["Content-Length"] = str(length)
+    if byte_range:
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    return response
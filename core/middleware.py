@@ -0,0 +1,46 @@
+# core/middleware.py
+from __future__ import annotations
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.utils.functional import SimpleLazyObject
+
+from .profiles import profile_for
+
+# مسارات مصادقة قديمة مخزّنة في جلسات قائمة ← تُنقل لأول مسار في AUTHENTICATION_BACKENDS
+LEGACY_AUTH_BACKENDS = {"django.contrib.auth.backends.ModelBackend"}
+
+
+class LegacySessionBackendMiddleware:
+    """
+    الجلسات المنشأة قبل ProfileModelBackend تحمل مسار ModelBackend؛ Django يسجّل خروجها
+    إن لم يكن المسار مدرجًا، وإدراجه يعني فحص كلمة المرور مرتين عند كل دخول فاشل.
+    يُحدَّث المسار في الجلسة بدل ذلك. يجب أن يأتي بعد SessionMiddleware وقبل
+    AuthenticationMiddleware. الزائر بلا كعكة جلسة لا يكلّف أي استعلام.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = getattr(request, "session", None)
+        if session is not None and session.session_key and session.get(BACKEND_SESSION_KEY) in LEGACY_AUTH_BACKENDS:
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        return self.get_response(request)
+
+
+class ProfileMiddleware:
+    """
+    يضيف request.profile: ملف الطالب أو المعلّم للمستخدم الحالي، يُحسب عند أول
+    استخدام فقط ويُخزَّن لبقية الطلب. مستخدم الجلسة محمّل عبر ProfileModelBackend
+    مع ملفه (select_related)، فلا يكلّف الوصول إليه استعلامًا إضافيًا.
+    لا يوجد ملف (زائر/مشرف) → قيمة falsy (استعمل `if request.profile` لا `is None`).
+    يجب أن يأتي بعد AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(lambda: profile_for(request.user))
+        return self.get_response(request)
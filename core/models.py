@@ -15,6 +15,13 @@ class CustomUser(AbstractUser):
         verbose_name="الدور"
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # نحفظ الدور كما قُرئ لتعرف الإشارات إن تغيّر فعلًا عند الحفظ
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_role = instance.__dict__.get("role")
+        return instance
+
     def is_student(self):
         return self.role == 'student'
 
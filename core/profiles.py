@@ -0,0 +1,46 @@
+# core/profiles.py
+from __future__ import annotations
+
+# أسماء العلاقات العكسية (OneToOne) من المستخدم إلى ملفه
+STUDENT_ACCESSOR = "student_profile"     # students.Student.user (related_name)
+TEACHER_ACCESSOR = "teacherprofile"      # teachers.TeacherProfile.user (الاسم الافتراضي)
+
+PROFILE_ACCESSORS = (STUDENT_ACCESSOR, TEACHER_ACCESSOR)
+
+
+def _related(user, accessor: str):
+    """
+    الملف المرتبط بالمستخدم دون تكرار الاستعلام:
+    من كاش select_related (انظر core.backends) إن وُجد، وإلا استعلام واحد
+    تُخزَّن نتيجته على كائن المستخدم (حتى لو لم يوجد ملف) لبقية الطلب.
+    """
+    if not getattr(user, "is_authenticated", False):
+        return None
+    rel = user._meta.get_field(accessor)
+    if not rel.is_cached(user):
+        rel.set_cached_value(user, rel.related_model._default_manager.filter(user=user).first())
+    return rel.get_cached_value(user)
+
+
+def student_for(user, create: bool = False):
+    """سجل Student للمستخدم؛ create=True ينشئه عند غيابه (أول دخول للطالب)."""
+    student = _related(user, STUDENT_ACCESSOR)
+    if student is None and create and getattr(user, "is_authenticated", False):
+        rel = user._meta.get_field(STUDENT_ACCESSOR)
+        student, _ = rel.related_model._default_manager.get_or_create(user=user)
+        rel.set_cached_value(user, student)
+    return student
+
+
+def teacher_profile_for(user):
+    return _related(user, TEACHER_ACCESSOR)
+
+
+def profile_for(user):
+    """ملف المستخدم حسب دوره: Student للطالب، TeacherProfile للمعلّم، وإلا أيّهما وُجد."""
+    role = getattr(user, "role", "")
+    if role == "student":
+        return student_for(user)
+    if role == "teacher":
+        return teacher_profile_for(user)
+    return teacher_profile_for(user) or student_for(user)
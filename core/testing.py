@@ -0,0 +1,7 @@
+# core/testing.py
+from __future__ import annotations
+
+# عدّ الاستعلامات في الاختبارات يخص استعلامات البناء: كاش الذاكرة بدل جدول الكاش
+# المشترك (settings.CACHES) الذي يضيف استعلامات قراءة/كتابة لكل وصول.
+# الاستعمال: @override_settings(CACHES=LOCMEM_CACHE)
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -1,3 +1,86 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import BACKEND_SESSION_KEY, authenticate
+from django.test import RequestFactory, TestCase
+
+from students.models import Student
+from teachers.models import TeacherProfile
+
+from .backends import ProfileModelBackend
+from .middleware import ProfileMiddleware
+from .models import CustomUser
+from .profiles import student_for, teacher_profile_for
+
+
+class ProfileBackendTests(TestCase):
+    """مستخدم الجلسة وملفه باستعلام واحد، وفحص كلمة مرور واحد لكل دخول فاشل."""
+
+    def setUp(self):
+        self.student = CustomUser.objects.create_user("pupil", password="pass-12345", role="student")
+
+    def test_session_user_brings_profiles_in_one_query(self):
+        with self.assertNumQueries(1):
+            user = ProfileModelBackend().get_user(self.student.pk)
+            self.assertIsNotNone(student_for(user))
+            self.assertIsNone(teacher_profile_for(user))
+
+        teacher = CustomUser.objects.create_user("tutor", password="pass-12345", role="teacher")
+        TeacherProfile.objects.create(user=teacher)
+        with self.assertNumQueries(1):
+            user = ProfileModelBackend().get_user(teacher.pk)
+            self.assertIsNotNone(teacher_profile_for(user))
+
+    def test_request_profile_is_lazy_and_free(self):
+        request = RequestFactory().get("/")
+        request.user = ProfileModelBackend().get_user(self.student.pk)
+        ProfileMiddleware(lambda r: None)(request)
+        with self.assertNumQueries(0):
+            self.assertEqual(request.profile.user_id, self.student.pk)
+
+        # لا شيء يُحسب قبل أول وصول؛ معلّم بلا ملف → قيمة falsy
+        request = RequestFactory().get("/")
+        request.user = CustomUser.objects.create_user("tutor", password="pass-12345", role="teacher")
+        with self.assertNumQueries(0):
+            ProfileMiddleware(lambda r: None)(request)
+        self.assertFalse(request.profile)
+
+    def test_failed_login_hashes_once(self):
+        with mock.patch.object(CustomUser, "check_password", autospec=True, return_value=False) as check:
+            self.assertIsNone(authenticate(username="pupil", password="wrong-password"))
+        self.assertEqual(check.call_count, 1)
+
+    def test_legacy_backend_session_stays_logged_in(self):
+        self.client.force_login(self.student, backend="django.contrib.auth.backends.ModelBackend")
+        response = self.client.get("/")
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], "core.backends.ProfileModelBackend")
+
+
+class EnsureStudentProfileSignalTests(TestCase):
+    """حفظ last_login عند كل دخول لا يلمس جدول الطلاب؛ تغيّر الدور وحده ينشئ السجل."""
+
+    def test_last_login_save_skips_profile_lookup(self):
+        user = CustomUser.objects.create_user("reader", password="pass-12345", role="student")
+        user = CustomUser.objects.get(pk=user.pk)
+        with self.assertNumQueries(1):
+            user.save(update_fields=["last_login"])
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_role_change_creates_student(self):
+        user = CustomUser.objects.create_user("switcher", password="pass-12345", role="teacher")
+        self.assertFalse(Student.objects.filter(user=user).exists())
+        user = CustomUser.objects.get(pk=user.pk)
+        user.role = "student"
+        user.save()
+        self.assertTrue(Student.objects.filter(user=user).exists())
+
+
+class HomePageTests(TestCase):
+    """الصفحة الرئيسية لا تحمل الكتالوج: لا استعلام منتجات ولا قائمة في السياق."""
+
+    def test_home_runs_no_catalog_query(self):
+        with self.assertNumQueries(0):
+            response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("products", response.context)
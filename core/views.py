@@ -5,14 +5,12 @@ from django.contrib import messages
 from django.urls import reverse  # يمكن حذفه إن لم يُستخدم
 
 from .forms import CustomUserCreationForm
-from store.models import Product
 from students.models import Student
 from teachers.models import TeacherProfile  # ✅ جديد
 
-# ✅ الصفحة الرئيسية - عرض المنتجات المتاحة
+# ✅ الصفحة الرئيسية (القالب لا يعرض قائمة المنتجات؛ الكتالوج في /products/ مرقّم)
 def home(request):
-    products = Product.objects.filter(available=True).order_by('-created_at')
-    return render(request, 'home.html', {'products': products})
+    return render(request, 'home.html')
 
 # ✅ تضمين الهيدر والفوتر
 def header(request):
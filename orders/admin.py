@@ -1,6 +1,6 @@
 # orders/admin.py
-from django.contrib import admin
-from .models import Order, OrderItem
+from django.contrib import admin, messages
+from .models import DailySalesRollup, Order, OrderItem, OutboxEvent, WebhookEvent
 
 
 class OrderItemInline(admin.TabularInline):
@@ -18,7 +18,8 @@ class OrderAdmin(admin.ModelAdmin):
         "id",
         "user_display",
         "status",
-        "total_price_display",
+        "total_price",
+        "items_count",
         "created_at",
     )
     list_select_related = ("user",)
@@ -26,29 +27,51 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ("id", "user__username", "user__email")
     ordering = ("-created_at",)
 
-    readonly_fields = ("created_at", "updated_at", "total_price_display")
+    readonly_fields = ("created_at", "updated_at", "total_price", "items_count")
 
     fieldsets = (
         ("الأساسية", {
             "fields": ("user", "status")
         }),
         ("معلومات إضافية", {
-            "fields": ("total_price_display", "created_at", "updated_at"),
+            "fields": ("total_price", "items_count", "created_at", "updated_at"),
         }),
     )
 
     inlines = [OrderItemInline]
+    actions = ("mark_confirmed", "mark_paid", "mark_canceled")
+
+    def get_readonly_fields(self, request, obj=None):
+        # الحالة لا تُعدَّل بالحفظ العادي: الانتقال عبر الإجراءات فقط (TRANSITIONS + order_transitioned)
+        fields = super().get_readonly_fields(request, obj)
+        return (*fields, "status") if obj is not None else fields
+
+    # ===== انتقالات الحالة =====
+    def _transition(self, request, queryset, to_status: str):
+        moved = queryset.transition(to_status)
+        skipped = queryset.count() - len(moved)
+        label = dict(Order.STATUS_CHOICES)[to_status]
+        self.message_user(request, f"تم نقل {len(moved)} طلب إلى «{label}».", messages.SUCCESS)
+        if skipped:
+            self.message_user(request, f"تجاهل {skipped} طلب حالته لا تسمح بهذا الانتقال.", messages.WARNING)
+
+    @admin.action(description="تأكيد الطلبات المحددة")
+    def mark_confirmed(self, request, queryset):
+        self._transition(request, queryset, Order.STATUS_CONFIRMED)
+
+    @admin.action(description="تعليم المحدد كمدفوع (يفعّل الدورات)")
+    def mark_paid(self, request, queryset):
+        self._transition(request, queryset, Order.STATUS_PAID)
+
+    @admin.action(description="إلغاء الطلبات المحددة")
+    def mark_canceled(self, request, queryset):
+        self._transition(request, queryset, Order.STATUS_CANCELED)
 
     # عرض المستخدم
     def user_display(self, obj):
         return getattr(obj.user, "username", "ضيف")
     user_display.short_description = "المستخدم"
 
-    # عرض الإجمالي
-    def total_price_display(self, obj):
-        return obj.total_price
-    total_price_display.short_description = "الإجمالي"
-
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -59,3 +82,40 @@ class OrderItemAdmin(admin.ModelAdmin):
     ordering = ("-id",)
 
     readonly_fields = ("subtotal",)
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    """مراقبة صندوق وارد إشعارات الدفع"""
+    list_display = ("id", "event_key", "status", "attempts", "next_attempt_at", "received_at", "processed_at")
+    list_filter = ("status",)
+    search_fields = ("event_key",)
+    ordering = ("-id",)
+    readonly_fields = ("event_key", "payload", "attempts", "last_error", "locked_by", "locked_at",
+                       "received_at", "processed_at")
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    """مراقبة صندوق الصادر (أحداث تفعيل التسجيلات)"""
+    list_display = ("id", "topic", "status", "attempts", "next_attempt_at", "created_at", "processed_at")
+    list_filter = ("topic", "status")
+    ordering = ("-id",)
+    readonly_fields = ("topic", "payload", "attempts", "last_error", "locked_by", "locked_at",
+                       "created_at", "processed_at")
+
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    """ملخصات المبيعات (للقراءة فقط؛ تُبنى عبر refresh_sales_rollups)"""
+    list_display = ("day", "product", "course", "status", "revenue", "units", "orders_count")
+    list_select_related = ("product", "course")
+    list_filter = ("status", "day")
+    date_hierarchy = "day"
+    ordering = ("-day",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,80 @@
+# orders/events.py
+# حجز وإنهاء وإعادة محاولة الأحداث، مشترك بين صندوق الوارد (WebhookEvent، orders.inbox)
+# وصندوق الصادر (OutboxEvent، orders.outbox): للنموذجين نفس حقول الحالة والحجز.
+from __future__ import annotations
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# =========================
+#        الإعدادات
+# =========================
+LEASE = timedelta(minutes=5)        # حدث محجوز أطول من هذا يُعتبر متروكًا (عامل توقف)
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+
+
+def _max_attempts() -> int:
+    return int(getattr(settings, "WEBHOOK_MAX_ATTEMPTS", 8))
+
+
+def backoff(attempts: int) -> timedelta:
+    """تأخير أسّي: 30s, 60s, 120s ... بحد أقصى ساعة."""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS))
+
+
+# =========================
+#          الحجز
+# =========================
+def claim_batch(batch_size: int, model) -> list:
+    """
+    حجز دفعة بعبارة UPDATE مشروطة (آمنة مع أكثر من عامل):
+    الأحداث المستحقة + المحجوزة منذ أطول من LEASE.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = (
+        Q(status=model.STATUS_PENDING, next_attempt_at__lte=now)
+        | Q(status=model.STATUS_PROCESSING, locked_at__lt=now - LEASE)
+    )
+    ids = list(model.objects.filter(due).order_by("id").values_list("pk", flat=True)[:batch_size])
+    if not ids:
+        return []
+    model.objects.filter(due, pk__in=ids).update(
+        status=model.STATUS_PROCESSING, locked_by=token, locked_at=now,
+    )
+    return list(model.objects.filter(locked_by=token, status=model.STATUS_PROCESSING))
+
+
+# =========================
+#     الإنهاء وإعادة المحاولة
+# =========================
+def finish(events: list, status: str, error: str = "") -> None:
+    """إنهاء أحداث (من نفس النموذج) بحالة نهائية وتحرير حجزها."""
+    type(events[0]).objects.filter(pk__in=[e.pk for e in events]).update(
+        status=status, last_error=error, processed_at=timezone.now(), locked_by="", locked_at=None,
+    )
+
+
+def retry(event, error: str) -> None:
+    """إعادة الحدث للانتظار مع تأخير أسّي، أو DEAD بعد WEBHOOK_MAX_ATTEMPTS محاولة."""
+    model = type(event)
+    attempts = event.attempts + 1
+    dead = attempts >= _max_attempts()
+    model.objects.filter(pk=event.pk).update(
+        status=model.STATUS_DEAD if dead else model.STATUS_PENDING,
+        attempts=attempts,
+        next_attempt_at=timezone.now() + backoff(attempts),
+        last_error=error[:2000],
+        locked_by="",
+        locked_at=None,
+    )
+    if dead:
+        logger.error("%s is dead after %s attempts: %s", event, attempts, error)
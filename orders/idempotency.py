@@ -0,0 +1,234 @@
+# orders/idempotency.py
+from __future__ import annotations
+
+import hashlib
+import time
+import uuid
+from datetime import timedelta
+from functools import wraps
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+# =========================
+#        الإعدادات
+# =========================
+HEADER_NAME = "Idempotency-Key"
+FORM_FIELD = "idempotency_key"
+MAX_KEY_LENGTH = 255
+
+# حقول النموذج التي تتغير بين عرضين لنفس الصفحة ولا تغيّر معنى الطلب
+_VOLATILE_FIELDS = {"csrfmiddlewaretoken", FORM_FIELD}
+
+# ترويسات الاستجابة التي تستحق الحفظ لإعادة التشغيل
+_REPLAY_HEADERS = ("Content-Type", "Location")
+
+# محاولات الحجز حين يُحرَّر مفتاح محجوز أثناء انتظاره، قبل الرد بـ 409
+CLAIM_ATTEMPTS = 3
+
+
+def _ttl() -> timedelta:
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60))
+
+
+def _wait_seconds() -> float:
+    return float(getattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 5))
+
+
+def new_key() -> str:
+    """مفتاح جديد يُضمَّن في النماذج (hidden input) عند عرض صفحة التأكيد."""
+    return uuid.uuid4().hex
+
+
+# =========================
+#     مفتاح وبصمة الطلب
+# =========================
+def key_from_request(request) -> str:
+    """المفتاح من الترويسة أولًا ثم من حقل النموذج."""
+    return (request.headers.get(HEADER_NAME) or request.POST.get(FORM_FIELD) or "").strip()
+
+
+def webhook_key(request) -> str:
+    """
+    مفتاح إشعار المزوّد: الترويسة، ثم event_id، ثم بصمة المحتوى
+    (إعادة الإرسال من المزوّد تحمل نفس المحتوى حرفيًا).
+    """
+    return (
+        request.headers.get(HEADER_NAME)
+        or request.POST.get("event_id")
+        or hashlib.sha256(request.body or b"").hexdigest()
+    ).strip()
+
+
+def request_fingerprint(request) -> str:
+    """
+    بصمة تمنع إعادة استخدام نفس المفتاح لطلب مختلف:
+    المسار + المستخدم + المحتوى (بدون csrf/المفتاح نفسه في النماذج).
+    """
+    user_id = getattr(getattr(request, "user", None), "pk", None) or ""
+    if request.content_type in ("application/x-www-form-urlencoded", "multipart/form-data"):
+        items = sorted(
+            (k, v) for k, values in request.POST.lists() if k not in _VOLATILE_FIELDS for v in values
+        )
+        body = urlencode(items).encode()
+    else:
+        body = request.body or b""
+    h = hashlib.sha256()
+    for part in (request.method.encode(), request.path.encode(), str(user_id).encode(), body):
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+# =========================
+#      الحجز والتسجيل
+# =========================
+def claim(scope: str, key: str, fingerprint: str) -> Optional[IdempotencyKey]:
+    """
+    محاولة حجز المفتاح بإدراج صف واحد.
+    - ينجح طلب واحد فقط (القيد الفريد)، ويُرجع None للبقية.
+    - المفاتيح المنتهية تُحذف بشرط انتهائها ثم يُعاد الحجز مرة واحدة.
+    """
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    scope=scope,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=timezone.now() + _ttl(),
+                )
+        except IntegrityError:
+            deleted, _ = IdempotencyKey.objects.filter(
+                scope=scope, key=key, expires_at__lte=timezone.now()
+            ).delete()
+            if not deleted:
+                return None
+    return None
+
+
+def record(entry: IdempotencyKey, response: HttpResponse) -> None:
+    """حفظ الاستجابة الأولى لإعادتها لاحقًا."""
+    headers = {h: response[h] for h in _REPLAY_HEADERS if response.has_header(h)}
+    IdempotencyKey.objects.filter(pk=entry.pk).update(
+        state=IdempotencyKey.STATE_COMPLETED,
+        response_status=response.status_code,
+        response_headers=headers,
+        response_body=bytes(response.content),
+    )
+
+
+def release(entry: IdempotencyKey) -> None:
+    """تحرير المفتاح عند الفشل حتى يمكن إعادة المحاولة بنفس المفتاح."""
+    IdempotencyKey.objects.filter(pk=entry.pk, state=IdempotencyKey.STATE_PROCESSING).delete()
+
+
+def _is_replayable(response: HttpResponse) -> bool:
+    """
+    تُحفظ الاستجابات الناجحة غير المتدفقة فقط. أي 4xx/5xx يحرّر المفتاح: رفض طلب
+    (توقيع خاطئ، بيانات ناقصة) لا يحجز المفتاح ولا يُعاد للطلب الصحيح اللاحق به.
+    """
+    return response.status_code < 400 and not getattr(response, "streaming", False)
+
+
+def replay(entry: IdempotencyKey) -> HttpResponse:
+    response = HttpResponse(bytes(entry.response_body), status=entry.response_status or 200)
+    for name, value in (entry.response_headers or {}).items():
+        response[name] = value
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _await_completion(scope: str, key: str) -> Optional[IdempotencyKey]:
+    """انتظار قصير لطلب متزامن ما زال قيد التنفيذ بنفس المفتاح."""
+    deadline = time.monotonic() + _wait_seconds()
+    delay = 0.02
+    while True:
+        entry = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+        if entry is None or entry.state == IdempotencyKey.STATE_COMPLETED:
+            return entry
+        if time.monotonic() >= deadline:
+            return entry
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+
+# =========================
+#         الديكوريتر
+# =========================
+def idempotent(scope: str, key_func: Callable = key_from_request, fingerprint_func: Callable = request_fingerprint):
+    """
+    يجعل الـ view آمنًا للتكرار لطلبات POST التي تحمل مفتاحًا:
+    - أول طلب ينفّذ الـ view وتُحفظ استجابته.
+    - التكرار (إعادة محاولة/ضغط مزدوج/إعادة إرسال المزوّد) يستلم نفس الاستجابة.
+    - نفس المفتاح مع محتوى مختلف → 422، وطلب متزامن لم يكتمل بعد → 409.
+    - مفتاح يُحرَّر أثناء الانتظار يُعاد حجزه CLAIM_ATTEMPTS مرات على الأكثر ثم → 409.
+    - استجابات الخطأ (4xx/5xx) والاستثناءات تحرّر المفتاح لتسمح بإعادة المحاولة،
+      فلا يستطيع طلب بتوقيع خاطئ حجز مفتاح إشعار حقيقي.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if request.method != "POST":
+                return view_func(request, *args, **kwargs)
+
+            if not request.content_type.startswith("multipart/"):
+                # نقرأ المحتوى الخام أولًا ليبقى request.body متاحًا للـ view بعد قراءة POST
+                request.body
+
+            key = (key_func(request) or "")[:MAX_KEY_LENGTH]
+            if not key:
+                return view_func(request, *args, **kwargs)
+
+            fingerprint = fingerprint_func(request)
+            for _ in range(CLAIM_ATTEMPTS):
+                entry = claim(scope, key, fingerprint)
+                if entry is not None:
+                    break
+                existing = _await_completion(scope, key)
+                if existing is None:
+                    # حُرّر المفتاح أثناء الانتظار (فشل الطلب الأول): نحاول الحجز من جديد
+                    continue
+                if existing.fingerprint != fingerprint:
+                    return HttpResponse("idempotency key reused with a different request", status=422)
+                if existing.state != IdempotencyKey.STATE_COMPLETED:
+                    return HttpResponse("request with this idempotency key is in progress", status=409)
+                return replay(existing)
+            else:
+                # المفتاح يُحجز ويُحرَّر باستمرار من طلبات أخرى: لا نكرر بلا حد
+                return HttpResponse("request with this idempotency key is in progress", status=409)
+
+            try:
+                response = view_func(request, *args, **kwargs)
+            except Exception:
+                release(entry)
+                raise
+
+            if _is_replayable(response):
+                record(entry, response)
+            else:
+                release(entry)
+            return response
+        return _wrapped
+    return decorator
+
+
+def purge_expired(batch_size: int = 1000) -> int:
+    """حذف المفاتيح المنتهية على دفعات."""
+    total = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects
+            .filter(expires_at__lte=timezone.now())
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        deleted, _ = IdempotencyKey.objects.filter(pk__in=ids).delete()
+        total += deleted
@@ -0,0 +1,92 @@
+# orders/inbox.py
+from __future__ import annotations
+
+import logging
+from typing import Dict, List
+
+from django.db import IntegrityError, transaction
+
+from .events import claim_batch, finish, retry
+from .models import Order, WebhookEvent
+from .services import mark_orders_paid
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+#          الإضافة
+# =========================
+def enqueue(event_key: str, payload: Dict) -> bool:
+    """إضافة إشعار للصندوق؛ التكرار بنفس المفتاح يُتجاهل. تُرجع True إن كان جديدًا."""
+    try:
+        with transaction.atomic():
+            WebhookEvent.objects.create(event_key=event_key[:255], payload=payload)
+    except IntegrityError:
+        return False
+    return True
+
+
+# =========================
+#         المعالجة
+# =========================
+def _order_id(event: WebhookEvent):
+    try:
+        return int(event.payload.get("order_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _apply(events: List[WebhookEvent]) -> None:
+    """تطبيق الانتقالات دفعة واحدة: كل الطلبات المدفوعة في UPDATE واحد."""
+    mark_orders_paid({_order_id(e) for e in events})
+
+
+def process_batch(batch_size: int = 100) -> int:
+    """
+    معالجة دفعة واحدة. إن فشلت الدفعة كاملة نعيد كل إشعار منفردًا
+    حتى لا يعطّل إشعار واحد معطوب بقية الدفعة. تُرجع عدد الإشعارات المحجوزة.
+    """
+    events = claim_batch(batch_size, WebhookEvent)
+    if not events:
+        return 0
+
+    valid = [e for e in events if _order_id(e) is not None and e.payload.get("status") == "paid"]
+    invalid = [e for e in events if e not in valid]
+    if invalid:
+        finish(invalid, WebhookEvent.STATUS_DEAD, "bad payload")
+
+    existing = set(Order.objects.filter(pk__in={_order_id(e) for e in valid}).values_list("pk", flat=True))
+    missing = [e for e in valid if _order_id(e) not in existing]
+    if missing:
+        finish(missing, WebhookEvent.STATUS_DEAD, "order not found")
+    valid = [e for e in valid if _order_id(e) in existing]
+
+    if not valid:
+        return len(events)
+
+    try:
+        with transaction.atomic():
+            _apply(valid)
+            finish(valid, WebhookEvent.STATUS_DONE)
+    except Exception:
+        logger.exception("webhook batch failed; retrying events one by one")
+        for event in valid:
+            try:
+                with transaction.atomic():
+                    _apply([event])
+                    finish([event], WebhookEvent.STATUS_DONE)
+            except Exception as exc:
+                retry(event, repr(exc))
+    return len(events)
+
+
+def drain(batch_size: int = 100, max_batches: int | None = None) -> int:
+    """معالجة كل الإشعارات المستحقة الآن على دفعات."""
+    total, batches = 0, 0
+    while max_batches is None or batches < max_batches:
+        n = process_batch(batch_size)
+        if not n:
+            break
+        total += n
+        batches += 1
+    return total
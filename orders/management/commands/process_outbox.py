@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.outbox import drain
+
+
+class Command(BaseCommand):
+    help = "معالجة صندوق الصادر (تفعيل التسجيلات) على دفعات (مع إعادة المحاولة والتأخير الأسّي)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--loop", action="store_true", help="تشغيل مستمر كعامل خلفي")
+        parser.add_argument("--interval", type=float, default=2.0, help="ثوانٍ بين الدورات عند --loop")
+
+    def handle(self, *args, **opts):
+        batch = max(1, opts["batch_size"])
+        while True:
+            n = drain(batch_size=batch)
+            if n:
+                self.stdout.write(f"تمت معالجة {n} حدث.")
+            if not opts["loop"]:
+                break
+            time.sleep(opts["interval"])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "حذف مفاتيح عدم التكرار المنتهية الصلاحية (يُشغَّل دوريًا عبر cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        total = purge_expired(batch_size=max(1, opts["batch_size"]))
+        self.stdout.write(self.style.SUCCESS(f"تم حذف {total} مفتاح منتهٍ."))
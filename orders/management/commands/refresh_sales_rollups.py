@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.reports import refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "تحديث جداول ملخص المبيعات اليومية تدريجيًا من آخر علامة ماء (updated_at)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="إعادة بناء كل الأيام من الصفر")
+
+    def handle(self, *args, **opts):
+        days, rows = refresh_sales_rollups(full=opts["full"])
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة بناء {days} يوم ({rows} صف)."))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_stored_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50, verbose_name='النطاق')),
+                ('key', models.CharField(max_length=255, verbose_name='المفتاح')),
+                ('fingerprint', models.CharField(max_length=64, verbose_name='بصمة الطلب')),
+                ('state', models.CharField(choices=[('processing', 'قيد التنفيذ'), ('completed', 'مكتمل')], default='processing', max_length=20, verbose_name='الحالة')),
+                ('response_status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='رمز الاستجابة')),
+                ('response_headers', models.JSONField(blank=True, default=dict, verbose_name='ترويسات الاستجابة')),
+                ('response_body', models.BinaryField(blank=True, default=b'', verbose_name='محتوى الاستجابة')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ الإنشاء')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='ينتهي في')),
+            ],
+            options={
+                'verbose_name': 'مفتاح عدم تكرار',
+                'verbose_name_plural': 'مفاتيح عدم التكرار',
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='uq_idempotency_scope_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_key', models.CharField(max_length=255, unique=True, verbose_name='معرّف الإشعار')),
+                ('payload', models.JSONField(default=dict, verbose_name='المحتوى')),
+                ('status', models.CharField(choices=[('pending', 'بانتظار المعالجة'), ('processing', 'قيد المعالجة'), ('done', 'تمت'), ('dead', 'متوقفة')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='المحاولة التالية')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('locked_by', models.CharField(blank=True, max_length=64, verbose_name='محجوز بواسطة')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت الحجز')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ الاستلام')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ المعالجة')),
+            ],
+            options={
+                'verbose_name': 'إشعار دفع',
+                'verbose_name_plural': 'إشعارات الدفع',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='orders_webh_status_9d0119_idx')],
+            },
+        ),
+    ]
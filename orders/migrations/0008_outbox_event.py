@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(choices=[('enrollment.activate', 'تفعيل تسجيلات طلبات مدفوعة')], max_length=50, verbose_name='النوع')),
+                ('payload', models.JSONField(default=dict, verbose_name='المحتوى')),
+                ('status', models.CharField(choices=[('pending', 'بانتظار المعالجة'), ('processing', 'قيد المعالجة'), ('done', 'تمت'), ('dead', 'متوقفة')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='المحاولة التالية')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('locked_by', models.CharField(blank=True, max_length=64, verbose_name='محجوز بواسطة')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت الحجز')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ الإنشاء')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ المعالجة')),
+            ],
+            options={
+                'verbose_name': 'حدث صادر',
+                'verbose_name_plural': 'صندوق الصادر',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='orders_outb_status_c93eb1_idx')],
+            },
+        ),
+    ]
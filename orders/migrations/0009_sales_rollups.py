@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:53
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_outbox_event'),
+        ('store', '0008_product_keyset_index'),
+        ('teachers', '0006_alter_course_code_alter_resource_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='الاسم')),
+                ('high_water', models.DateTimeField(blank=True, null=True, verbose_name='حتى')),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True, verbose_name='آخر تحديث')),
+            ],
+            options={
+                'verbose_name': 'نقطة تحديث الملخصات',
+                'verbose_name_plural': 'نقاط تحديث الملخصات',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('status', models.CharField(choices=[('new', 'جديد'), ('confirmed', 'مؤكد'), ('paid', 'مدفوع'), ('canceled', 'ملغي')], max_length=20, verbose_name='حالة الطلب')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='الإيراد')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='القطع')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='عدد الطلبات')),
+                ('course', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='teachers.course', verbose_name='الدورة')),
+                ('product', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='store.product', verbose_name='المنتج')),
+            ],
+            options={
+                'verbose_name': 'ملخص مبيعات يومي',
+                'verbose_name_plural': 'ملخصات المبيعات اليومية',
+                'ordering': ('-day', 'product_id'),
+                'indexes': [models.Index(fields=['status', 'day'], name='orders_dail_status_517477_idx'), models.Index(fields=['course', 'day'], name='orders_dail_course__a8682c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'product', 'course', 'status'), name='sales_rollup_unique')],
+            },
+        ),
+    ]
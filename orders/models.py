@@ -7,14 +7,68 @@ from typing import Optional
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
 from django.utils import timezone
 
 from store.models import Product
 
 
+# يُرسل داخل نفس المعاملة للطلبات التي انتقلت فعلًا فقط (to_status, order_ids)
+order_transitioned = Signal()
+
+
 # =========================
 #         Order
 # =========================
+class OrderQuerySet(models.QuerySet):
+    def transition(self, to_status: str) -> list[int]:
+        """
+        نقل كل طلبات الـ QuerySet المؤهلة إلى to_status دفعة واحدة:
+        قفل الصفوف المؤهلة ثم UPDATE مشروط بالحالة، وإرسال order_transitioned
+        بأرقام الطلبات التي انتقلت فعلًا. تُرجع تلك الأرقام.
+        """
+        allowed = Order.TRANSITIONS[to_status]
+        with transaction.atomic():
+            ids = list(
+                self.select_for_update()
+                .filter(status__in=allowed)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            if not ids:
+                return []
+            Order.objects.filter(pk__in=ids, status__in=allowed).update(
+                status=to_status, updated_at=timezone.now(),
+            )
+            order_transitioned.send(sender=Order, to_status=to_status, order_ids=ids)
+        return ids
+
+    def refresh_totals(self) -> int:
+        """
+        إعادة حساب الإجمالي وعدد القطع من OrderItem بعبارة UPDATE واحدة
+        (استعلامات فرعية مترابطة) لكل الطلبات في الـ QuerySet.
+        """
+        items = OrderItem.objects.filter(order_id=OuterRef("pk")).values("order_id")
+        line_total = ExpressionWrapper(
+            F("unit_price") * F("quantity"),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+        return self.update(
+            total_price=Coalesce(
+                Subquery(items.annotate(s=Sum(line_total)).values("s")[:1]),
+                Decimal("0.00"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            items_count=Coalesce(
+                Subquery(items.annotate(q=Sum("quantity")).values("q")[:1]),
+                0,
+            ),
+            updated_at=timezone.now(),
+        )
+
+
 class Order(models.Model):
     """
     طلب رئيسي:
@@ -35,6 +89,13 @@ class Order(models.Model):
         (STATUS_CANCELED, "ملغي"),
     )
 
+    # الحالة الهدف ← الحالات المسموح الانتقال منها
+    TRANSITIONS = {
+        STATUS_CONFIRMED: (STATUS_NEW,),
+        STATUS_PAID: (STATUS_NEW, STATUS_CONFIRMED),
+        STATUS_CANCELED: (STATUS_NEW, STATUS_CONFIRMED),
+    }
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         null=True,
@@ -52,9 +113,21 @@ class Order(models.Model):
         db_index=True,
     )
 
+    # قيم مخزّنة تُحدَّث مع كل تغيير في OrderItem (انظر orders/signals.py)
+    AGGREGATE_FIELDS = ("total_price", "items_count")
+    total_price = models.DecimalField(
+        "الإجمالي",
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal("0.00"),
+    )
+    items_count = models.PositiveIntegerField("عدد القطع", default=0)
+
     created_at = models.DateTimeField("تاريخ الإنشاء", default=timezone.now, db_index=True)
     updated_at = models.DateTimeField("آخر تحديث", auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         verbose_name = "طلب"
         verbose_name_plural = "الطلبات"
@@ -67,36 +140,46 @@ class Order(models.Model):
         user_display = getattr(self.user, "username", "ضيف")
         return f"طلب #{self.pk or '—'} بواسطة {user_display} [{self.get_status_display()}]"
 
-    # ===== خصائص =====
-    @property
-    def total_price(self) -> Decimal:
-        """إجمالي قيمة الطلب"""
-        return sum(item.subtotal for item in self.items.all())
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get("update_fields") is None:
+            # لا نكتب إجماليات قد تكون قديمة في الذاكرة فوق ما حسبته إشارات OrderItem
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.AGGREGATE_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    # ===== الإجماليات =====
+    def refresh_totals(self) -> None:
+        """إعادة حساب الإجمالي المخزّن من العناصر ثم تحديث النسخة الحالية."""
+        Order.objects.filter(pk=self.pk).refresh_totals()
+        self.refresh_from_db(fields=["total_price", "items_count", "updated_at"])
 
     # ===== انتقالات الحالة =====
-    @transaction.atomic
+    def _transition(self, to_status: str) -> bool:
+        """
+        انتقال بأسلوب compare-and-set: عبارة UPDATE ... WHERE status IN (...) واحدة.
+        تُرجع True للطلب الفائز فقط، وعندها فقط تُرسل order_transitioned.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            won = Order.objects.filter(pk=self.pk, status__in=self.TRANSITIONS[to_status]).update(
+                status=to_status, updated_at=now,
+            ) == 1
+            if won:
+                order_transitioned.send(sender=Order, to_status=to_status, order_ids=[self.pk])
+        if won:
+            self.status, self.updated_at = to_status, now
+        return won
+
     def confirm(self) -> bool:
-        if self.status != self.STATUS_NEW:
-            return False
-        self.status = self.STATUS_CONFIRMED
-        self.save(update_fields=["status", "updated_at"])
-        return True
+        return self._transition(self.STATUS_CONFIRMED)
 
-    @transaction.atomic
     def pay(self) -> bool:
-        if self.status in (self.STATUS_PAID, self.STATUS_CANCELED):
-            return False
-        self.status = self.STATUS_PAID
-        self.save(update_fields=["status", "updated_at"])
-        return True
+        return self._transition(self.STATUS_PAID)
 
-    @transaction.atomic
     def cancel(self) -> bool:
-        if self.status in (self.STATUS_PAID, self.STATUS_CANCELED):
-            return False
-        self.status = self.STATUS_CANCELED
-        self.save(update_fields=["status", "updated_at"])
-        return True
+        return self._transition(self.STATUS_CANCELED)
 
     # ===== فلاتر سريعة =====
     def is_paid(self) -> bool:
@@ -165,3 +248,206 @@ class OrderItem(models.Model):
         if not self.pk and (not self.unit_price or self.unit_price == 0):
             self.unit_price = getattr(self.product, "price", Decimal("0.00")) or Decimal("0.00")
         super().save(*args, **kwargs)
+
+
+# =========================
+#     مفاتيح عدم التكرار
+# =========================
+class IdempotencyKey(models.Model):
+    """
+    سجل مفتاح عدم تكرار (Idempotency-Key) لكل (scope, key):
+    - أول طلب يحجز المفتاح بإدراج صف (القيد الفريد يحسم السباق بين الطلبات المتزامنة).
+    - تُخزَّن الاستجابة الأولى وتُعاد كما هي لأي تكرار حتى انتهاء الصلاحية.
+    """
+
+    STATE_PROCESSING = "processing"
+    STATE_COMPLETED = "completed"
+
+    STATE_CHOICES = (
+        (STATE_PROCESSING, "قيد التنفيذ"),
+        (STATE_COMPLETED, "مكتمل"),
+    )
+
+    scope = models.CharField("النطاق", max_length=50)
+    key = models.CharField("المفتاح", max_length=255)
+    fingerprint = models.CharField("بصمة الطلب", max_length=64)
+    state = models.CharField("الحالة", max_length=20, choices=STATE_CHOICES, default=STATE_PROCESSING)
+
+    response_status = models.PositiveSmallIntegerField("رمز الاستجابة", null=True, blank=True)
+    response_headers = models.JSONField("ترويسات الاستجابة", default=dict, blank=True)
+    response_body = models.BinaryField("محتوى الاستجابة", default=b"", blank=True)
+
+    created_at = models.DateTimeField("تاريخ الإنشاء", default=timezone.now)
+    expires_at = models.DateTimeField("ينتهي في", db_index=True)
+
+    class Meta:
+        verbose_name = "مفتاح عدم تكرار"
+        verbose_name_plural = "مفاتيح عدم التكرار"
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="uq_idempotency_scope_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} [{self.state}]"
+
+    @property
+    def is_expired(self) -> bool:
+        return self.expires_at <= timezone.now()
+
+
+# =========================
+#     صندوق وارد الويبهوك
+# =========================
+class WebhookEvent(models.Model):
+    """
+    إشعار دفع مستلم ومتحقَّق من توقيعه، ينتظر المعالجة في الخلفية
+    (أمر process_webhooks) بدل تنفيذه داخل طلب المزوّد.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSING = "processing"
+    STATUS_DONE = "done"
+    STATUS_DEAD = "dead"
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "بانتظار المعالجة"),
+        (STATUS_PROCESSING, "قيد المعالجة"),
+        (STATUS_DONE, "تمت"),
+        (STATUS_DEAD, "متوقفة"),
+    )
+
+    event_key = models.CharField("معرّف الإشعار", max_length=255, unique=True)
+    payload = models.JSONField("المحتوى", default=dict)
+    status = models.CharField("الحالة", max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    attempts = models.PositiveSmallIntegerField("عدد المحاولات", default=0)
+    next_attempt_at = models.DateTimeField("المحاولة التالية", default=timezone.now)
+    last_error = models.TextField("آخر خطأ", blank=True)
+
+    locked_by = models.CharField("محجوز بواسطة", max_length=64, blank=True)
+    locked_at = models.DateTimeField("وقت الحجز", null=True, blank=True)
+
+    received_at = models.DateTimeField("تاريخ الاستلام", default=timezone.now)
+    processed_at = models.DateTimeField("تاريخ المعالجة", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "إشعار دفع"
+        verbose_name_plural = "إشعارات الدفع"
+        ordering = ("id",)
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"إشعار {self.event_key} [{self.get_status_display()}]"
+
+
+# =========================
+#   صندوق الصادر (Outbox)
+# =========================
+class OutboxEvent(models.Model):
+    """
+    حدث داخلي يُكتب في نفس معاملة التغيير الذي سببه (مثل انتقال الطلب إلى paid)
+    ويطبّقه عامل خلفي على دفعات (أمر process_outbox)، فلا يضيع ولا يُبتلع خطؤه.
+    """
+
+    TOPIC_ENROLLMENT_ACTIVATE = "enrollment.activate"
+
+    TOPIC_CHOICES = (
+        (TOPIC_ENROLLMENT_ACTIVATE, "تفعيل تسجيلات طلبات مدفوعة"),
+    )
+
+    STATUS_PENDING = WebhookEvent.STATUS_PENDING
+    STATUS_PROCESSING = WebhookEvent.STATUS_PROCESSING
+    STATUS_DONE = WebhookEvent.STATUS_DONE
+    STATUS_DEAD = WebhookEvent.STATUS_DEAD
+    STATUS_CHOICES = WebhookEvent.STATUS_CHOICES
+
+    topic = models.CharField("النوع", max_length=50, choices=TOPIC_CHOICES)
+    payload = models.JSONField("المحتوى", default=dict)
+    status = models.CharField("الحالة", max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    attempts = models.PositiveSmallIntegerField("عدد المحاولات", default=0)
+    next_attempt_at = models.DateTimeField("المحاولة التالية", default=timezone.now)
+    last_error = models.TextField("آخر خطأ", blank=True)
+
+    locked_by = models.CharField("محجوز بواسطة", max_length=64, blank=True)
+    locked_at = models.DateTimeField("وقت الحجز", null=True, blank=True)
+
+    created_at = models.DateTimeField("تاريخ الإنشاء", default=timezone.now)
+    processed_at = models.DateTimeField("تاريخ المعالجة", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "حدث صادر"
+        verbose_name_plural = "صندوق الصادر"
+        ordering = ("id",)
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"حدث {self.topic} #{self.pk or '—'} [{self.get_status_display()}]"
+
+
+# =========================
+#   جداول التقارير (Rollups)
+# =========================
+class DailySalesRollup(models.Model):
+    """
+    ملخص مبيعات يومي لكل (يوم × منتج × دورة × حالة طلب):
+    الإيراد والقطع وعدد الطلبات. يُبنى تدريجيًا عبر refresh_sales_rollups
+    وتقرأ منه التقارير بدل مسح جداول الطلبات.
+    """
+
+    day = models.DateField("اليوم")
+    product = models.ForeignKey(
+        Product,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        db_constraint=False,
+        verbose_name="المنتج",
+    )
+    course = models.ForeignKey(
+        "teachers.Course",
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        db_constraint=False,
+        verbose_name="الدورة",
+    )
+    status = models.CharField("حالة الطلب", max_length=20, choices=Order.STATUS_CHOICES)
+
+    revenue = models.DecimalField("الإيراد", max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    units = models.PositiveIntegerField("القطع", default=0)
+    orders_count = models.PositiveIntegerField("عدد الطلبات", default=0)
+
+    class Meta:
+        verbose_name = "ملخص مبيعات يومي"
+        verbose_name_plural = "ملخصات المبيعات اليومية"
+        ordering = ("-day", "product_id")
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product", "course", "status"], name="sales_rollup_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "day"]),
+            models.Index(fields=["course", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / منتج {self.product_id} / {self.status}"
+
+
+class RollupCheckpoint(models.Model):
+    """علامة الماء العالية (آخر updated_at تمت معالجته) لكل جدول ملخص."""
+
+    name = models.CharField("الاسم", max_length=50, unique=True)
+    high_water = models.DateTimeField("حتى", null=True, blank=True)
+    refreshed_at = models.DateTimeField("آخر تحديث", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "نقطة تحديث الملخصات"
+        verbose_name_plural = "نقاط تحديث الملخصات"
+
+    def __str__(self):
+        return f"{self.name} ← {self.high_water or '—'}"
@@ -0,0 +1,90 @@
+# orders/outbox.py
+from __future__ import annotations
+
+import logging
+from typing import Dict, List
+
+from django.db import transaction
+
+from .events import claim_batch, finish, retry
+from .models import OutboxEvent
+from .services import activate_paid_orders
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+#          النشر
+# =========================
+def publish(topic: str, payload: Dict) -> OutboxEvent:
+    """
+    كتابة حدث في صندوق الصادر. يُستدعى داخل معاملة التغيير نفسها،
+    فيُحفظ الحدث مع التغيير أو يُلغى معه.
+    """
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+# =========================
+#         المعالجة
+# =========================
+def _activate(events: List[OutboxEvent]) -> None:
+    """كل طلبات الدفعة في تفعيل واحد (bulk_create + bulk_update على Enrollment)."""
+    order_ids = {int(i) for e in events for i in e.payload.get("order_ids", [])}
+    activate_paid_orders(order_ids)
+
+
+HANDLERS = {
+    OutboxEvent.TOPIC_ENROLLMENT_ACTIVATE: _activate,
+}
+
+
+def _apply(events: List[OutboxEvent]) -> None:
+    by_topic: Dict[str, List[OutboxEvent]] = {}
+    for e in events:
+        by_topic.setdefault(e.topic, []).append(e)
+    for topic, group in by_topic.items():
+        HANDLERS[topic](group)
+
+
+def process_batch(batch_size: int = 100) -> int:
+    """
+    معالجة دفعة واحدة داخل معاملة؛ إن فشلت نعيد كل حدث منفردًا
+    مع إعادة المحاولة والتأخير الأسّي. تُرجع عدد الأحداث المحجوزة.
+    """
+    events = claim_batch(batch_size, OutboxEvent)
+    if not events:
+        return 0
+
+    unknown = [e for e in events if e.topic not in HANDLERS]
+    if unknown:
+        finish(unknown, OutboxEvent.STATUS_DEAD, "unknown topic")
+    events = [e for e in events if e.topic in HANDLERS]
+    if not events:
+        return len(unknown)
+
+    try:
+        with transaction.atomic():
+            _apply(events)
+            finish(events, OutboxEvent.STATUS_DONE)
+    except Exception:
+        logger.exception("outbox batch failed; retrying events one by one")
+        for event in events:
+            try:
+                with transaction.atomic():
+                    _apply([event])
+                    finish([event], OutboxEvent.STATUS_DONE)
+            except Exception as exc:
+                retry(event, repr(exc))
+    return len(events) + len(unknown)
+
+
+def drain(batch_size: int = 100, max_batches: int | None = None) -> int:
+    """معالجة كل الأحداث المستحقة الآن على دفعات."""
+    total, batches = 0, 0
+    while max_batches is None or batches < max_batches:
+        n = process_batch(batch_size)
+        if not n:
+            break
+        total += n
+        batches += 1
+    return total
@@ -0,0 +1,139 @@
+# orders/reports.py
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySalesRollup, Order, OrderItem, RollupCheckpoint
+
+# =========================
+#        الإعدادات
+# =========================
+CHECKPOINT_NAME = "daily_sales"
+
+# نعيد مسح هامش صغير قبل علامة الماء: معاملة بدأت قبلها ولم تُكمِل وقت التحديث السابق
+OVERLAP = timedelta(minutes=5)
+
+_LINE_TOTAL = ExpressionWrapper(
+    F("unit_price") * F("quantity"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+# =========================
+#         البناء
+# =========================
+def _touched_days(since: Optional[datetime], until) -> list[date]:
+    """أيام إنشاء الطلبات التي تغيّرت (updated_at) ضمن النافذة."""
+    qs = Order.objects.filter(updated_at__lte=until)
+    if since is not None:
+        qs = qs.filter(updated_at__gt=since - OVERLAP)
+    return sorted(
+        qs.annotate(day=TruncDate("created_at")).values_list("day", flat=True).order_by().distinct()
+    )
+
+
+def rebuild_days(days: Iterable[date]) -> int:
+    """
+    إعادة بناء صفوف الأيام المحددة من الجداول الخام:
+    حذف صفوف تلك الأيام ثم إدراجها باستعلام تجميعي واحد + bulk_create.
+    """
+    days = list(days)
+    if not days:
+        return 0
+    rows = (
+        OrderItem.objects
+        .filter(order__created_at__date__in=days)
+        .annotate(day=TruncDate("order__created_at"))
+        .values("day", "product_id", "product__course_id", "order__status")
+        .annotate(
+            revenue=Sum(_LINE_TOTAL),
+            units=Sum("quantity"),
+            orders_count=Count("order_id", distinct=True),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        DailySalesRollup.objects.filter(day__in=days).delete()
+        created = DailySalesRollup.objects.bulk_create(
+            [
+                DailySalesRollup(
+                    day=r["day"],
+                    product_id=r["product_id"],
+                    course_id=r["product__course_id"],
+                    status=r["order__status"],
+                    revenue=r["revenue"],
+                    units=r["units"],
+                    orders_count=r["orders_count"],
+                )
+                for r in rows
+            ],
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def refresh_sales_rollups(full: bool = False) -> tuple[int, int]:
+    """
+    تحديث تدريجي من علامة الماء العالية على Order.updated_at.
+    full=True يعيد بناء كل الأيام (مثلًا بعد حذف طلبات).
+    تُرجع (عدد الأيام المعاد بناؤها، عدد الصفوف).
+    """
+    until = timezone.now()
+    RollupCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    with transaction.atomic():
+        # قفل نقطة التحديث: عامل واحد فقط يحدّث في نفس الوقت
+        checkpoint = RollupCheckpoint.objects.select_for_update().get(name=CHECKPOINT_NAME)
+        if full:
+            days = _touched_days(None, until)
+            DailySalesRollup.objects.exclude(day__in=days).delete()
+        else:
+            days = _touched_days(checkpoint.high_water, until)
+        rows = rebuild_days(days)
+        checkpoint.high_water = until
+        checkpoint.refreshed_at = timezone.now()
+        checkpoint.save(update_fields=["high_water", "refreshed_at"])
+    return len(days), rows
+
+
+# =========================
+#        القراءة
+# =========================
+def last_refreshed_at():
+    return (
+        RollupCheckpoint.objects.filter(name=CHECKPOINT_NAME)
+        .values_list("refreshed_at", flat=True)
+        .first()
+    )
+
+
+def sales_report(start: date, end: date, status: str = Order.STATUS_PAID) -> dict:
+    """
+    ملخص الفترة [start, end] من جداول الـ rollup فقط:
+    الإجمالي، وحسب اليوم، وأعلى المنتجات والدورات، وتوزيع الحالات.
+    """
+    period = DailySalesRollup.objects.filter(day__range=(start, end))
+    scoped = period.filter(status=status)
+    sums = dict(revenue=Sum("revenue"), units=Sum("units"))
+
+    return {
+        "totals": scoped.aggregate(**sums),
+        "by_day": list(scoped.values("day").annotate(**sums).order_by("-day")),
+        "by_product": list(
+            scoped.values("product_id", "product__name")
+            .annotate(**sums, orders_count=Sum("orders_count"))
+            .order_by("-revenue")[:20]
+        ),
+        "by_course": list(
+            scoped.exclude(course__isnull=True)
+            .values("course_id", "course__title")
+            .annotate(**sums)
+            .order_by("-revenue")[:20]
+        ),
+        "by_status": list(period.values("status").annotate(**sums).order_by("status")),
+    }
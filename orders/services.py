@@ -0,0 +1,116 @@
+# orders/services.py
+from __future__ import annotations
+
+from django.db import transaction
+
+from store.models import Product
+from store.pricing import PricedCart, to_minor
+from students.models import Enrollment, Student
+
+from .models import Order, OrderItem
+
+
+class CheckoutError(Exception):
+    """السلة تغيّرت (منتج لم يعد متاحًا أو تغيّر سعره) بين العرض والتأكيد."""
+
+
+# =========================
+#       إنشاء الطلب
+# =========================
+def place_order(
+    user,
+    priced: PricedCart,
+    *,
+    status: str = Order.STATUS_NEW,
+    enroll: bool = False,
+) -> Order:
+    """
+    كتابة الطلب دفعة واحدة داخل معاملة قصيرة:
+    1) قفل المنتجات المسعّرة (select_for_update بترتيب pk لتفادي الـ deadlock)
+       والتأكد أن الأسعار والتوفر لم تتغير منذ التسعير.
+    2) Order واحد + bulk_create لكل OrderItem.
+    3) (اختياري) تفعيل تسجيلات الدورات المرتبطة دفعة واحدة.
+    عدد الاستعلامات ثابت مهما كبرت السلة.
+    """
+    if priced.is_empty:
+        raise CheckoutError("السلة فارغة.")
+
+    lines = {line.product.pk: line for line in priced.lines}
+
+    with transaction.atomic():
+        locked = list(
+            Product.objects
+            .select_for_update()
+            .filter(pk__in=lines.keys(), available=True)
+            .order_by("pk")
+            .values_list("pk", "price", "course_id")
+        )
+        if len(locked) != len(lines) or any(
+            to_minor(price) != lines[pk].unit_minor for pk, price, _ in locked
+        ):
+            raise CheckoutError("تغيّرت بعض المنتجات في السلة، راجع السلة قبل التأكيد.")
+
+        # الإجماليات معروفة مسبقًا؛ bulk_create لا يطلق إشارات OrderItem
+        order = Order.objects.create(
+            user=user if getattr(user, "is_authenticated", False) else None,
+            status=status,
+            total_price=priced.subtotal,
+            items_count=priced.items_count,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_id=pk,
+                quantity=lines[pk].quantity,
+                unit_price=lines[pk].unit_price,
+            )
+            for pk, _, _ in locked
+        ])
+
+        if enroll and order.user_id:
+            enroll_user(order.user, {course_id for _, _, course_id in locked})
+
+    return order
+
+
+def enroll_user(user, course_ids) -> int:
+    """تفعيل الدورات لطالب واحد باستعلامات ثابتة العدد."""
+    course_ids = {c for c in course_ids if c}
+    if not course_ids:
+        return 0
+    student, _ = Student.objects.get_or_create(user=user)
+    return Enrollment.objects.activate_bulk((student.pk, c) for c in course_ids)
+
+
+# =========================
+#     الدفع بالجملة
+# =========================
+def mark_orders_paid(order_ids) -> list[int]:
+    """
+    نقل مجموعة طلبات إلى paid بانتقال مشروط واحد (Order.objects.transition)؛
+    تفعيل الدورات يتم عبر order_transitioned للطلبات الفائزة فقط.
+    تُرجع أرقام الطلبات التي انتقلت فعلًا (المدفوعة/الملغاة مسبقًا تُتجاهل).
+    """
+    ids = {int(i) for i in order_ids}
+    if not ids:
+        return []
+    return Order.objects.filter(pk__in=ids).transition(Order.STATUS_PAID)
+
+
+def activate_paid_orders(order_ids) -> int:
+    """
+    تفعيل الدورات المرتبطة بعناصر الطلبات المدفوعة لكل أصحابها:
+    استعلام واحد للأزواج (user, course) + إنشاء سجلات الطلاب الناقصة + activate_bulk.
+    """
+    pairs = set(
+        OrderItem.objects
+        .filter(order_id__in=order_ids, order__user__isnull=False, product__course__isnull=False)
+        .values_list("order__user_id", "product__course_id")
+    )
+    if not pairs:
+        return 0
+
+    user_ids = {u for u, _ in pairs}
+    Student.objects.bulk_create([Student(user_id=u) for u in user_ids], ignore_conflicts=True)
+    students = dict(Student.objects.filter(user_id__in=user_ids).values_list("user_id", "pk"))
+    return Enrollment.objects.activate_bulk((students[u], c) for u, c in pairs if u in students)
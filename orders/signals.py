@@ -1,70 +1,40 @@
 # orders/signals.py
 from __future__ import annotations
 
-from datetime import timedelta
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.utils import timezone
 
-from orders.models import Order
-from students.models import Student, Enrollment
-from teachers.models import Course
+from orders.models import Order, OrderItem, OutboxEvent, order_transitioned
+from orders.outbox import publish
 
 
-def _activate_enrollment(student: Student, course: Course) -> None:
+# =========================
+#     تفعيل بعد الدفع
+# =========================
+@receiver(order_transitioned, sender=Order)
+def enqueue_activation_on_paid(sender, to_status: str, order_ids, **kwargs):
     """
-    تفعيل/إنشاء تسجيل نشط للطالب على الدورة مع نافذة زمنية افتراضية.
-    العملية idempotent: إعادة الاستدعاء لن تكرّر التسجيل.
+    يُستدعى للطلبات التي فازت بالانتقال إلى 'paid' فقط، داخل نفس المعاملة:
+    يكتب حدث تفعيل واحد في صندوق الصادر، والتفعيل نفسه يتم عبر process_outbox.
     """
-    if not (student and course):
-        return
-
-    enr, _ = Enrollment.objects.get_or_create(student=student, course=course)
-
-    # تعيين النوافذ الزمنية إن لزم
-    if hasattr(enr, "activate_with_defaults"):
-        enr.activate_with_defaults()
-    else:
-        if not enr.starts_at:
-            enr.starts_at = timezone.now()
-        if not enr.ends_at:
-            days = getattr(course, "duration_days", 30) or 30
-            enr.ends_at = enr.starts_at + timedelta(days=days)
-
-    enr.status = "active"
-    enr.save(update_fields=["status", "starts_at", "ends_at"])
-
-
-@receiver(post_save, sender=Order)
-def activate_on_paid(sender, instance: Order, created: bool, **kwargs):
-    """
-    عندما يصبح الطلب 'paid':
-      - نحدد الطالب من order.user
-      - نستخرج الدورة من المنتج المرتبط
-      - نفعّل Enrollment
-    """
-    try:
-        if instance.status != Order.STATUS_PAID:
-            return
-
-        user = getattr(instance, "user", None)
-        if not user:
-            return
+    if to_status == Order.STATUS_PAID:
+        publish(OutboxEvent.TOPIC_ENROLLMENT_ACTIVATE, {"order_ids": list(order_ids)})
 
-        student, _ = Student.objects.get_or_create(user=user)
 
-        # طلب منتج واحد
-        product = getattr(instance, "product", None)
-        if not product:
-            return
-
-        course = getattr(product, "course", None)
-        if not course:
-            return
+# =========================
+#   تحديث إجماليات الطلب
+# =========================
+@receiver(post_save, sender=OrderItem)
+def refresh_totals_on_item_save(sender, instance: OrderItem, raw: bool = False, **kwargs):
+    """أي إضافة/تعديل على عنصر يعيد حساب إجمالي طلبه بعبارة UPDATE واحدة."""
+    if raw:
+        return
+    Order.objects.filter(pk=instance.order_id).refresh_totals()
 
-        _activate_enrollment(student, course)
 
-    except Exception:
-        # يُفضَّل استخدام logging هنا
-        # import logging; logging.getLogger(__name__).exception("activate_on_paid failed")
-        pass
+@receiver(post_delete, sender=OrderItem)
+def refresh_totals_on_item_delete(sender, instance: OrderItem, origin=None, **kwargs):
+    # عند حذف الطلب نفسه (حذف متسلسل) لا داعي لإعادة الحساب
+    if isinstance(origin, Order) or getattr(origin, "model", None) is Order:
+        return
+    Order.objects.filter(pk=instance.order_id).refresh_totals()
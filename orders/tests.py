@@ -1,3 +1,440 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.core.management import call_command
+from django.urls import reverse
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from cart.models import Cart, CartLine
+from core.models import CustomUser
+from store.models import Category, Product
+from store.pricing import PricedCart, price_cart
+from students.models import Course as StudentCourse, Enrollment
+from teachers.models import Course as TeacherCourse, Subject, TeacherProfile
+
+from . import idempotency
+from .inbox import drain
+from .models import DailySalesRollup, IdempotencyKey, Order, OrderItem, OutboxEvent, WebhookEvent
+from .outbox import drain as drain_outbox
+from .reports import refresh_sales_rollups, sales_report
+from .services import CheckoutError, place_order
+
+
+@override_settings(IDEMPOTENCY_WAIT_SECONDS=10, PAYMENT_WEBHOOK_SECRET="test-secret")
+class IdempotencyConcurrencyTests(TransactionTestCase):
+    """نفس المفتاح من عدة خيوط متزامنة يجب أن ينفّذ العمل مرة واحدة فقط."""
+
+    THREADS = 8
+
+    def setUp(self):
+        category = Category.objects.create(name="عام")
+        self.product = Product.objects.create(name="منتج", price="25.00", category=category)
+        self.user = CustomUser.objects.create_user("buyer", password="pass-12345", role="student")
+
+    def _fill_cart(self, quantity):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartLine.objects.update_or_create(cart=cart, product=self.product, defaults={"quantity": quantity})
+
+    def _hammer(self, send):
+        barrier = threading.Barrier(self.THREADS)
+        responses, errors = [], []
+
+        def worker():
+            try:
+                client = Client()
+                barrier.wait()
+                responses.append(send(client))
+            except Exception as exc:  # pragma: no cover - يظهر في رسالة الفشل
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(responses), self.THREADS)
+        return responses
+
+    def test_checkout_same_key_creates_one_order(self):
+        user = self.user
+        self._fill_cart(2)
+
+        def send(client):
+            client.force_login(user)
+            return client.post("/checkout/", {"idempotency_key": "checkout-key-1"})
+
+        responses = self._hammer(send)
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 1)
+        self.assertEqual({r.status_code for r in responses}, {302})
+        self.assertEqual({r["Location"] for r in responses}, {responses[0]["Location"]})
+        self.assertEqual(
+            sum(1 for r in responses if r.has_header("Idempotent-Replayed")),
+            self.THREADS - 1,
+        )
+
+    def test_webhook_redelivery_is_processed_once(self):
+        order = Order.objects.create(user=self.user)
+        body = urlencode({"order_id": order.pk, "status": "paid", "event_id": "evt-1"})
+        signature = hmac.new(b"test-secret", body.encode(), hashlib.sha256).hexdigest()
+
+        def send(client):
+            return client.post(
+                "/orders/webhook/",
+                data=body,
+                content_type="application/x-www-form-urlencoded",
+                HTTP_X_PAY_SIGNATURE=signature,
+            )
+
+        responses = self._hammer(send)
+
+        self.assertEqual({r.status_code for r in responses}, {200})
+        self.assertEqual(IdempotencyKey.objects.filter(scope="orders.webhook").count(), 1)
+        self.assertEqual(
+            sum(1 for r in responses if r.has_header("Idempotent-Replayed")),
+            self.THREADS - 1,
+        )
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+        # الـ view يضيف للصندوق فقط؛ العامل يطبّق الانتقال
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.STATUS_NEW)
+        self.assertEqual(drain(), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.STATUS_PAID)
+        self.assertEqual(WebhookEvent.objects.get().status, WebhookEvent.STATUS_DONE)
+
+    def test_rejected_webhook_does_not_pin_the_event_key(self):
+        order = Order.objects.create(user=self.user)
+        body = urlencode({"order_id": order.pk, "status": "paid", "event_id": "evt-forged"})
+        client = Client()
+
+        def post(signature):
+            return client.post(
+                "/orders/webhook/", data=body,
+                content_type="application/x-www-form-urlencoded", HTTP_X_PAY_SIGNATURE=signature,
+            )
+
+        self.assertEqual(post("0" * 64).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.filter(scope="orders.webhook").exists())
+
+        genuine = post(hmac.new(b"test-secret", body.encode(), hashlib.sha256).hexdigest())
+        self.assertEqual(genuine.status_code, 200)
+        self.assertFalse(genuine.has_header("Idempotent-Replayed"))
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_key_released_while_waiting_is_retried_a_bounded_number_of_times(self):
+        client = Client()
+        client.force_login(self.user)
+        self._fill_cart(1)
+        # المفتاح محجوز عند كل محاولة ثم يختفي قبل اكتمال الانتظار
+        with mock.patch.object(idempotency, "claim", return_value=None) as claim, \
+                mock.patch.object(idempotency, "_await_completion", return_value=None):
+            response = client.post("/checkout/", {"idempotency_key": "k-flapping"})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(claim.call_count, idempotency.CLAIM_ATTEMPTS)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_same_key_different_payload_is_rejected(self):
+        client = Client()
+        client.force_login(self.user)
+        self._fill_cart(1)
+        first = client.post("/checkout/", {"idempotency_key": "k-2"})
+        self.assertEqual(first.status_code, 302)
+
+        second = client.post("/checkout/", {"idempotency_key": "k-2", "note": "x"})
+        self.assertEqual(second.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class IdempotentReleaseTests(TestCase):
+    """استجابات الخطأ تحرّر المفتاح؛ النجاح وحده يُحفظ ويُعاد."""
+
+    def _post(self, view):
+        request = RequestFactory().post("/", {"idempotency_key": "k-release"})
+        return idempotency.idempotent("orders.test")(view)(request)
+
+    def test_client_errors_release_the_key(self):
+        statuses = iter((400, 404, 201))
+        view = mock.Mock(side_effect=lambda request: HttpResponse(status=next(statuses)))
+        self.assertEqual(self._post(view).status_code, 400)
+        self.assertEqual(self._post(view).status_code, 404)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.assertEqual(self._post(view).status_code, 201)
+        replayed = self._post(view)
+        self.assertEqual(replayed.status_code, 201)
+        self.assertTrue(replayed.has_header("Idempotent-Replayed"))
+        self.assertEqual(view.call_count, 3)
+
+
+class OrderTransitionTests(TransactionTestCase):
+    """الانتقالات المشروطة: فائز واحد فقط مهما تزامنت المحاولات."""
+
+    THREADS = 8
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("payer", password="pass-12345", role="student")
+
+    def test_concurrent_pay_has_single_winner(self):
+        order = Order.objects.create(user=self.user)
+        barrier = threading.Barrier(self.THREADS)
+        results, errors = [], []
+
+        def worker():
+            try:
+                mine = Order.objects.get(pk=order.pk)
+                barrier.wait()
+                results.append(mine.pay())
+            except Exception as exc:  # pragma: no cover - يظهر في رسالة الفشل
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results.count(True), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.STATUS_PAID)
+        self.assertFalse(order.cancel())
+
+    def test_bulk_transition_skips_ineligible(self):
+        new, paid, canceled = (Order.objects.create(user=self.user, status=s) for s in (
+            Order.STATUS_NEW, Order.STATUS_PAID, Order.STATUS_CANCELED,
+        ))
+        moved = Order.objects.filter(pk__in=[new.pk, paid.pk, canceled.pk]).transition(Order.STATUS_PAID)
+        self.assertEqual(moved, [new.pk])
+
+    def test_paid_transition_writes_one_outbox_event(self):
+        teacher = TeacherProfile.objects.create(
+            user=CustomUser.objects.create_user("tutor", password="pass-12345", role="teacher"),
+        )
+        course = TeacherCourse.objects.create(
+            teacher=teacher, subject=Subject.objects.create(name="فيزياء", stage="ثانوي"), title="ميكانيكا",
+        )
+        StudentCourse.objects.create(pk=course.pk, title=course.title)
+        product = Product.objects.create(
+            name="اشتراك", price="50.00", category=Category.objects.create(name="دورات"), course=course,
+        )
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=order, product=product, unit_price=product.price, quantity=1)
+        self.assertTrue(order.pay())
+        self.assertFalse(order.pay())
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.topic, OutboxEvent.TOPIC_ENROLLMENT_ACTIVATE)
+        self.assertEqual(event.payload, {"order_ids": [order.pk]})
+        self.assertEqual(drain_outbox(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.status, OutboxEvent.STATUS_DONE)
+
+        enrollment = Enrollment.objects.get(student__user=self.user, course_id=course.pk)
+        self.assertEqual(enrollment.status, Enrollment.STATUS_ACTIVE)
+        counters = StudentCourse.objects.values_list("enrollments_total", "enrollments_active").get(pk=course.pk)
+        self.assertEqual(counters, (1, 1))
+
+
+class OrderTotalsTests(TestCase):
+    """الإجمالي وعدد القطع المخزّنان يتبعان OrderItem، ولا يكتب فوقهما حفظ نسخة قديمة."""
+
+    def setUp(self):
+        category = Category.objects.create(name="كتب")
+        self.book = Product.objects.create(name="كتاب", price="30.00", category=category)
+        self.pen = Product.objects.create(name="قلم", price="2.50", category=category)
+        self.order = Order.objects.create()
+
+    def _totals(self):
+        return Order.objects.filter(pk=self.order.pk).values_list("total_price", "items_count").get()
+
+    def test_item_signals_keep_totals_current(self):
+        item = OrderItem.objects.create(order=self.order, product=self.book, quantity=2, unit_price="30.00")
+        OrderItem.objects.create(order=self.order, product=self.pen, quantity=4, unit_price="2.50")
+        self.assertEqual(self._totals(), (Decimal("70.00"), 6))
+
+        item.quantity = 1
+        item.save()
+        self.assertEqual(self._totals(), (Decimal("40.00"), 5))
+
+        item.delete()
+        self.assertEqual(self._totals(), (Decimal("10.00"), 4))
+
+    def test_full_save_of_stale_instance_keeps_totals(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        OrderItem.objects.create(order=self.order, product=self.book, quantity=1, unit_price="30.00")
+        stale.status = Order.STATUS_CONFIRMED
+        stale.save()
+        self.assertEqual(self._totals(), (Decimal("30.00"), 1))
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.STATUS_CONFIRMED)
+
+    def test_backfill_repairs_drifted_totals(self):
+        OrderItem.objects.create(order=self.order, product=self.book, quantity=3, unit_price="30.00")
+        empty = Order.objects.create()
+        Order.objects.filter(pk__in=[self.order.pk, empty.pk]).update(total_price=Decimal("1.00"), items_count=99)
+
+        out = StringIO()
+        call_command("backfill_order_totals", batch_size=1, stdout=out)
+        self.assertEqual(self._totals(), (Decimal("90.00"), 3))
+        self.assertEqual(
+            Order.objects.filter(pk=empty.pk).values_list("total_price", "items_count").get(),
+            (Decimal("0.00"), 0),
+        )
+        self.assertIn("2", out.getvalue())
+
+
+class PlaceOrderTests(TestCase):
+    """الطلب كاملًا بعدد استعلامات ثابت: OrderItem دفعة واحدة بسعر لحظة الطلب، والمنتجات مقفولة."""
+
+    def setUp(self):
+        category = Category.objects.create(name="قرطاسية")
+        self.user = CustomUser.objects.create_user("checkout", password="pass-12345", role="student")
+        self.products = [
+            Product.objects.create(name=f"صنف {i}", price=f"{i + 1}.50", category=category) for i in range(4)
+        ]
+
+    def _queries(self, cart):
+        priced = price_cart(cart)
+        with CaptureQueriesContext(connection) as ctx:
+            order = place_order(self.user, priced)
+        return order, len(ctx)
+
+    def test_multi_item_order_in_constant_queries(self):
+        small, small_queries = self._queries({p.pk: 1 for p in self.products[:2]})
+        order, queries = self._queries({p.pk: i + 1 for i, p in enumerate(self.products)})
+        self.assertEqual(queries, small_queries)
+
+        self.assertEqual(order.items.count(), 4)
+        self.assertEqual((order.total_price, order.items_count), (Decimal("35.00"), 10))
+        self.assertEqual(order.user, self.user)
+        self.assertEqual(small.items.count(), 2)
+
+    def test_prices_are_snapshotted(self):
+        pen = self.products[0]
+        order = place_order(self.user, price_cart({pen.pk: 2}))
+        Product.objects.filter(pk=pen.pk).update(price="99.00")
+        item = order.items.get()
+        self.assertEqual((item.unit_price, item.quantity), (Decimal("1.50"), 2))
+
+    def test_products_are_locked(self):
+        cart = {p.pk: 1 for p in reversed(self.products)}
+        with mock.patch.object(Product.objects, "select_for_update", wraps=Product.objects.select_for_update) as lock:
+            place_order(self.user, price_cart(cart))
+        lock.assert_called_once_with()
+
+    def test_empty_cart_is_rejected(self):
+        with self.assertRaises(CheckoutError), self.assertNumQueries(0):
+            place_order(self.user, PricedCart())
+        self.assertFalse(Order.objects.exists())
+
+    def test_unavailable_or_repriced_product_aborts(self):
+        pen, book = self.products[:2]
+        priced = price_cart({pen.pk: 1, book.pk: 1})
+        Product.objects.filter(pk=book.pk).update(available=False)
+        with self.assertRaises(CheckoutError):
+            place_order(self.user, priced)
+
+        Product.objects.filter(pk=book.pk).update(available=True, price="7.00")
+        with self.assertRaises(CheckoutError):
+            place_order(self.user, priced)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+
+class DailySalesRollupTests(TestCase):
+    """التحديث التدريجي: تكراره لا يضاعف الصفوف، والطلب المتأخر يُحدِّث يومه الموجود."""
+
+    def setUp(self):
+        category = Category.objects.create(name="أدوات")
+        self.mug = Product.objects.create(name="كوب", price="10.00", category=category)
+        self.yesterday = timezone.now() - timedelta(days=1)
+
+    def _order(self, quantity, created_at=None, status=Order.STATUS_PAID):
+        order = Order.objects.create(status=status)
+        OrderItem.objects.create(order=order, product=self.mug, quantity=quantity, unit_price="10.00")
+        if created_at is not None:
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+
+    def _rows(self):
+        return list(
+            DailySalesRollup.objects.order_by("day", "status")
+            .values_list("day", "product_id", "status", "revenue", "units", "orders_count")
+        )
+
+    def test_refresh_twice_is_idempotent(self):
+        self._order(2)
+        self._order(1, created_at=self.yesterday)
+        refresh_sales_rollups()
+        before = self._rows()
+        self.assertEqual(len(before), 2)
+
+        refresh_sales_rollups()
+        self.assertEqual(self._rows(), before)
+        refresh_sales_rollups(full=True)
+        self.assertEqual(self._rows(), before)
+
+    def test_late_order_updates_existing_day(self):
+        day = timezone.localdate(self.yesterday)
+        self._order(1, created_at=self.yesterday)
+        refresh_sales_rollups()
+        self.assertEqual(sales_report(day, day)["totals"], {"revenue": Decimal("10.00"), "units": 1})
+
+        # طلب بتاريخ أمس يصل بعد التحديث (استيراد متأخر مثلًا)
+        self._order(3, created_at=self.yesterday)
+        days, _ = refresh_sales_rollups()
+        self.assertEqual(days, 1)
+        rows = self._rows()
+        self.assertEqual(rows, [(day, self.mug.pk, Order.STATUS_PAID, Decimal("40.00"), 4, 2)])
+
+
+class OrderAdminTransitionTests(TestCase):
+    """تغيير الحالة من لوحة الإدارة يمر بـ transition(): القواعد وحدث التفعيل معًا."""
+
+    def setUp(self):
+        admin_user = CustomUser.objects.create_superuser("boss", "boss@example.com", "pass-12345")
+        self.client.force_login(admin_user)
+        self.order = Order.objects.create(user=CustomUser.objects.create_user("payer2", password="pass-12345"))
+
+    def test_status_is_read_only_on_the_change_form(self):
+        url = reverse("admin:orders_order_change", args=[self.order.pk])
+        response = self.client.post(url, {
+            "user": self.order.user_id,
+            "status": Order.STATUS_PAID,
+            "items-TOTAL_FORMS": "0", "items-INITIAL_FORMS": "0",
+            "items-MIN_NUM_FORMS": "0", "items-MAX_NUM_FORMS": "1000",
+        })
+        self.assertEqual(response.status_code, 302)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.STATUS_NEW)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_actions_go_through_transition(self):
+        canceled = Order.objects.create(status=Order.STATUS_CANCELED)
+        changelist = reverse("admin:orders_order_changelist")
+        response = self.client.post(changelist, {
+            "action": "mark_paid", "_selected_action": [self.order.pk, canceled.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.order.refresh_from_db()
+        canceled.refresh_from_db()
+        self.assertEqual((self.order.status, canceled.status), (Order.STATUS_PAID, Order.STATUS_CANCELED))
+        self.assertEqual(OutboxEvent.objects.get().payload, {"order_ids": [self.order.pk]})
@@ -1,8 +1,7 @@
 # orders/views.py
 from __future__ import annotations
 
-from decimal import Decimal
-from typing import Dict, List, Tuple
+from typing import Dict, List
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -14,8 +13,12 @@ from django.views.decorators.http import require_http_methods
 from django.conf import settings
 import hmac, hashlib
 
-from store.models import Product
+from cart.store import get_cart
+from store.pricing import price_request_cart
+from . import inbox
+from .idempotency import idempotent, new_key, webhook_key
 from .models import Order
+from .services import CheckoutError, place_order
 
 
 # =========================
@@ -23,44 +26,13 @@ from .models import Order
 # =========================
 
 def _get_cart_dict(request) -> Dict[str, int]:
-    """إرجاع قاموس السلة من الـ Session بشكل آمن."""
-    cart = request.session.get("cart", {})
-    return cart if isinstance(cart, dict) else {}
+    """قاموس السلة من مخزن السلة (cart.store)."""
+    return get_cart(request).as_dict()
 
 
 def _empty_cart(request) -> None:
-    """إفراغ السلة من الجلسة."""
-    request.session["cart"] = {}
-    request.session.modified = True
-
-
-def _build_items_from_cart(cart: Dict[str, int]) -> Tuple[List[dict], Decimal]:
-    """
-    يحوّل قاموس السلة إلى قائمة عناصر قابلة للعرض/الحفظ.
-    كل عنصر: {product, quantity, unit_price, line_total}
-    """
-    items: List[dict] = []
-    subtotal = Decimal("0.00")
-    for pid_str, qty in cart.items():
-        try:
-            pid = int(pid_str)
-            qty = int(qty)
-        except (TypeError, ValueError):
-            continue
-        if qty <= 0:
-            continue
-
-        product = get_object_or_404(Product, pk=pid, available=True)
-        unit_price = Decimal(product.price)
-        line_total = unit_price * qty
-        items.append({
-            "product": product,
-            "quantity": qty,
-            "unit_price": unit_price,
-            "line_total": line_total,
-        })
-        subtotal += line_total
-    return items, subtotal
+    """إفراغ السلة بعد إنشاء الطلب."""
+    get_cart(request).clear()
 
 
 # =========================
@@ -68,38 +40,42 @@ def _build_items_from_cart(cart: Dict[str, int]) -> Tuple[List[dict], Decimal]:
 # =========================
 
 @require_http_methods(["GET", "POST"])
+@idempotent("orders.checkout")
 def checkout(request):
     """
     صفحة إتمام الشراء:
     - GET: يعرض ملخص السلة.
-    - POST: ينشئ طلبًا، يفرغ السلة، ثم يوجّه لصفحة النجاح.
+    - POST: ينشئ طلبًا واحدًا بكل العناصر، يفرغ السلة، ثم يوجّه لصفحة النجاح.
     """
     cart = _get_cart_dict(request)
     if not cart:
         messages.error(request, "سلتك فارغة.")
         return redirect("cart_detail")
 
-    items, subtotal = _build_items_from_cart(cart)
+    # تسعير واحد للسلة يخدم العرض والحفظ
+    priced = price_request_cart(request, cart)
 
     if request.method == "POST":
-        created_ids: List[int] = []
-        for it in items:
-            order = Order.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                product=it["product"],
-                quantity=it["quantity"],
-                unit_price=it["unit_price"],
-                status=Order.STATUS_NEW,
-            )
-            created_ids.append(order.id)
+        try:
+            order = place_order(request.user, priced, status=Order.STATUS_NEW)
+        except CheckoutError as e:
+            messages.error(request, str(e))
+            return redirect("cart_detail")
 
         _empty_cart(request)
-        request.session["last_order_ids"] = created_ids
+        request.session["last_order_ids"] = [order.id]
         request.session.modified = True
         messages.success(request, "تم إنشاء طلبك بنجاح ✅")
         return redirect("orders:checkout_success")
 
-    ctx = {"items": items, "subtotal": subtotal}
+    ctx = {
+        "cart": priced,
+        "items": priced.lines,
+        "subtotal": priced.subtotal,
+        "tax": priced.tax,
+        "grand_total": priced.grand_total,
+        "idempotency_key": new_key(),
+    }
     return render(request, "orders/checkout.html", ctx)
 
 
@@ -119,28 +95,26 @@ def pay_now(request, order_id: int):
     """
     صفحة دفع تجريبية (محاكاة):
     - GET: تعرض ملخص الطلب وزر "ادفع الآن".
-    - POST: تغيّر الحالة إلى paid وتشغّل signal لتفعيل الدورة، ثم تعيدك للوحة الطالب.
+    - POST: ينقل الطلب إلى paid شرطيًا؛ تفعيل الدورة يتم للفائز بالانتقال فقط.
     """
-    order = get_object_or_404(Order, pk=order_id)
+    order = get_object_or_404(Order.objects.prefetch_related("items__product"), pk=order_id)
 
     # أمان: السماح فقط لصاحب الطلب
     if order.user_id != request.user.id:
         raise Http404("لا تملك صلاحية الوصول لهذا الطلب.")
 
     if request.method == "POST":
-        # منع حالات غير صالحة
-        if order.status == Order.STATUS_CANCELED:
-            messages.error(request, "لا يمكن دفع طلب ملغي.")
-            return redirect("orders:checkout_success")
+        # انتقال مشروط: ينجح طلب واحد فقط حتى مع ويبهوك متزامن أو ضغط مزدوج
+        if order.pay():
+            messages.success(request, "تم الدفع بنجاح ✅ وسيتم تفعيل دورتك خلال لحظات.")
+            return redirect("students:dashboard")
+
+        order.refresh_from_db(fields=["status"])
         if order.status == Order.STATUS_PAID:
             messages.info(request, "الطلب مدفوع مسبقًا.")
             return redirect("students:dashboard")
-
-        # محاكاة الدفع: غيّر الحالة إلى paid
-        order.status = Order.STATUS_PAID
-        order.save(update_fields=["status"])
-        messages.success(request, "تم الدفع بنجاح ✅ وتم تفعيل دورتك.")
-        return redirect("students:dashboard")
+        messages.error(request, "لا يمكن دفع طلب ملغي.")
+        return redirect("orders:checkout_success")
 
     return render(request, "orders/pay_now.html", {"order": order})
 
@@ -149,11 +123,14 @@ def pay_now(request, order_id: int):
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@idempotent("orders.webhook", key_func=webhook_key)
 def payment_webhook(request):
     """
     محاكاة ويبهوك حقيقي بتوقيع HMAC:
-    - Body: form-encoded يحتوي (order_id, status=paid)
+    - Body: form-encoded يحتوي (order_id, status=paid[, event_id])
     - Header: X-PAY-SIGNature = hmac_sha256(body, PAYMENT_WEBHOOK_SECRET)
+    يتحقق من التوقيع ويضيف الإشعار لصندوق الوارد فقط ثم يرد 200 فورًا؛
+    التطبيق على الطلبات يتم في الخلفية عبر: python manage.py process_webhooks
     """
     secret = (getattr(settings, "PAYMENT_WEBHOOK_SECRET", "dev-secret") or "dev-secret").encode()
 
@@ -169,12 +146,5 @@ def payment_webhook(request):
     if not (order_id and status == "paid"):
         return HttpResponse("bad payload", status=400)
 
-    order = Order.objects.filter(pk=order_id).first()
-    if not order:
-        return HttpResponse("order not found", status=404)
-
-    if order.status != Order.STATUS_PAID:
-        order.status = Order.STATUS_PAID
-        order.save(update_fields=["status"])  # 🔔 يشغّل signal لتفعيل الدورة
-
+    inbox.enqueue(webhook_key(request), request.POST.dict())
     return HttpResponse("ok", status=200)
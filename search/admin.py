@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import SearchDocument
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "title", "is_public", "updated_at")
+    list_filter = ("kind", "is_public")
+    ordering = ("-updated_at",)
+    readonly_fields = ("content_type", "object_id", "search_title", "search_body", "updated_at")
+    list_per_page = 50
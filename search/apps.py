@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "search"
+    verbose_name = "البحث"
+
+    def ready(self):
+        # ربط إشارات الحفظ/الحذف للنماذج المفهرسة
+        import search.signals  # noqa: F401
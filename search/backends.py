@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import SearchDocument
+
+FTS_TABLE = "search_fts"
+
+
+# =========================
+#      الواجهة العامة
+# =========================
+class SearchBackend:
+    """واجهة موحّدة؛ كل قاعدة بيانات تنفّذ البحث المرتّب بطريقتها."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def search(
+        self,
+        terms: Sequence[str],
+        *,
+        course_ids: Sequence[int] = (),
+        kinds: Sequence[str] = (),
+        limit: int,
+        offset: int = 0,
+    ) -> List[SearchDocument]:
+        raise NotImplementedError
+
+    def _filters(self, course_ids: Sequence[int], kinds: Sequence[str]):
+        """الوثائق العامة، والخاصة (محاضرات/مراجع) لمقررات course_ids فقط."""
+        sql, params = [], []
+        course_ids = sorted({int(pk) for pk in course_ids})
+        if course_ids:
+            sql.append("(d.is_public = %%s OR d.course_id IN (%s))" % ", ".join(["%s"] * len(course_ids)))
+            params.extend([True, *course_ids])
+        else:
+            sql.append("d.is_public = %s")
+            params.append(True)
+        if kinds:
+            sql.append("d.kind IN (%s)" % ", ".join(["%s"] * len(kinds)))
+            params.extend(kinds)
+        return "".join(f" AND {s}" for s in sql), params
+
+    def _raw(self, sql: str, params: list) -> List[SearchDocument]:
+        return list(SearchDocument.objects.using(self.connection.alias).raw(sql, params))
+
+
+# =========================
+#      SQLite (FTS5)
+# =========================
+class SQLiteFTSBackend(SearchBackend):
+    """
+    جدول FTS5 بمحتوى خارجي فوق search_searchdocument تُحدّثه Triggers.
+    الترتيب بـ bm25 مع وزن أعلى للعنوان.
+    """
+
+    def match_expression(self, terms: Sequence[str]) -> str:
+        # الكلمات موحّدة مسبقًا (حروف/أرقام فقط)، فالاقتباس كافٍ للهروب
+        return " ".join(f'"{t}"*' for t in terms)
+
+    def search(self, terms, *, course_ids=(), kinds=(), limit, offset=0):
+        where, params = self._filters(course_ids, kinds)
+        sql = (
+            "SELECT d.id, d.kind, d.title, d.snippet, d.url, "
+            f"bm25({FTS_TABLE}, 5.0, 1.0) AS rank "
+            f"FROM {FTS_TABLE} JOIN search_searchdocument d ON d.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s{where} "
+            "ORDER BY rank, d.id LIMIT %s OFFSET %s"
+        )
+        return self._raw(sql, [self.match_expression(terms), *params, limit, offset])
+
+
+# =========================
+#   Postgres (tsvector/GIN)
+# =========================
+class PostgresBackend(SearchBackend):
+    """عمود search_vector مولَّد (وزن A للعنوان، B للمحتوى) مع فهرس GIN."""
+
+    def tsquery(self, terms: Sequence[str]) -> str:
+        return " & ".join(f"{t}:*" for t in terms)
+
+    def search(self, terms, *, course_ids=(), kinds=(), limit, offset=0):
+        where, params = self._filters(course_ids, kinds)
+        sql = (
+            "SELECT d.id, d.kind, d.title, d.snippet, d.url, "
+            "ts_rank_cd(d.search_vector, q) AS rank "
+            "FROM search_searchdocument d, to_tsquery('simple', %s) q "
+            f"WHERE d.search_vector @@ q{where} "
+            "ORDER BY rank DESC, d.id LIMIT %s OFFSET %s"
+        )
+        return self._raw(sql, [self.tsquery(terms), *params, limit, offset])
+
+
+# =========================
+#   احتياطي (قواعد أخرى)
+# =========================
+class FallbackBackend(SearchBackend):
+    """بدون فهرس نصي: مطابقة بسيطة على النص الموحّد (للبيئات غير المدعومة فقط)."""
+
+    def search(self, terms, *, course_ids=(), kinds=(), limit, offset=0):
+        qs = SearchDocument.objects.using(self.connection.alias).only("id", "kind", "title", "snippet", "url")
+        qs = qs.filter(Q(is_public=True) | Q(course_id__in=list(course_ids)))
+        if kinds:
+            qs = qs.filter(kind__in=kinds)
+        for t in terms:
+            qs = qs.filter(Q(search_title__contains=t) | Q(search_body__contains=t))
+        return list(qs.order_by("-updated_at", "id")[offset:offset + limit])
+
+
+_BACKENDS = {
+    "sqlite": SQLiteFTSBackend,
+    "postgresql": PostgresBackend,
+}
+
+
+def get_backend(using: str = "default") -> SearchBackend:
+    connection = connections[using]
+    return _BACKENDS.get(connection.vendor, FallbackBackend)(connection)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.urls import NoReverseMatch, reverse
+from django.utils.text import Truncator
+
+from .models import SearchDocument
+from .normalize import normalize_text
+
+SNIPPET_WORDS = 30
+
+
+# =========================
+#     سجل النماذج المفهرسة
+# =========================
+@dataclass(frozen=True)
+class IndexSpec:
+    """وصف طريقة تحويل كائن إلى وثيقة بحث."""
+    model_label: str
+    kind: str
+    title: Callable[[models.Model], str]
+    body: Callable[[models.Model], str]
+    url: Callable[[models.Model], str]
+    is_public: Callable[[models.Model], bool] = lambda obj: True
+    course_id: Callable[[models.Model], Optional[int]] = lambda obj: None
+    include: Callable[[models.Model], bool] = lambda obj: True
+    select_related: tuple = ()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+
+def _safe_reverse(name: str, *args) -> str:
+    try:
+        return reverse(name, args=args)
+    except NoReverseMatch:
+        return ""
+
+
+def _course_url(code: str) -> str:
+    return _safe_reverse("students:course_detail", code) if code else ""
+
+
+REGISTRY: Dict[str, IndexSpec] = {
+    spec.model_label: spec
+    for spec in (
+        IndexSpec(
+            model_label="store.Product",
+            kind=SearchDocument.KIND_PRODUCT,
+            title=lambda p: p.name,
+            body=lambda p: p.description,
+            url=lambda p: p.get_absolute_url(),
+            include=lambda p: p.available,
+        ),
+        IndexSpec(
+            model_label="teachers.Course",
+            kind=SearchDocument.KIND_COURSE,
+            title=lambda c: c.title,
+            body=lambda c: c.description,
+            url=lambda c: _course_url(c.code),
+            include=lambda c: c.is_active,
+        ),
+        IndexSpec(
+            model_label="teachers.Lesson",
+            kind=SearchDocument.KIND_LESSON,
+            title=lambda l: l.title,
+            body=lambda l: l.content,
+            url=lambda l: _course_url(l.course.code),
+            is_public=lambda l: False,
+            course_id=lambda l: l.course_id,
+            select_related=("course",),
+        ),
+        IndexSpec(
+            model_label="teachers.Resource",
+            kind=SearchDocument.KIND_RESOURCE,
+            title=lambda r: r.title,
+            body=lambda r: r.note,
+            url=lambda r: _course_url(r.course.code),
+            is_public=lambda r: False,
+            course_id=lambda r: r.course_id,
+            select_related=("course",),
+        ),
+        IndexSpec(
+            model_label="students.Resource",
+            kind=SearchDocument.KIND_RESOURCE,
+            title=lambda r: r.title,
+            body=lambda r: r.note,
+            url=lambda r: _course_url(r.course.slug) if r.course_id else _safe_reverse("students:my_resources"),
+            is_public=lambda r: False,
+            course_id=lambda r: r.course_id,
+            select_related=("course",),
+        ),
+    )
+}
+
+
+def spec_for(model) -> Optional[IndexSpec]:
+    return REGISTRY.get(model._meta.label)
+
+
+# =========================
+#       بناء الوثائق
+# =========================
+def build_document(spec: IndexSpec, obj, content_type: ContentType) -> SearchDocument:
+    title = spec.title(obj) or ""
+    body = spec.body(obj) or ""
+    return SearchDocument(
+        content_type=content_type,
+        object_id=obj.pk,
+        kind=spec.kind,
+        is_public=spec.is_public(obj),
+        course_id=spec.course_id(obj),
+        title=title[:255],
+        snippet=Truncator(body).words(SNIPPET_WORDS)[:300],
+        url=spec.url(obj)[:500],
+        search_title=normalize_text(title),
+        search_body=normalize_text(body),
+    )
+
+
+_UPDATE_FIELDS = ["kind", "is_public", "course_id", "title", "snippet", "url", "search_title", "search_body", "updated_at"]
+
+
+def index_object(obj) -> None:
+    """إضافة/تحديث وثيقة كائن واحد (أو حذفها إن لم يعد مؤهلًا للفهرسة)."""
+    spec = spec_for(obj.__class__)
+    if spec is None:
+        return
+    if not spec.include(obj):
+        unindex_object(obj.__class__, obj.pk)
+        return
+    ct = ContentType.objects.get_for_model(obj.__class__)
+    doc = build_document(spec, obj, ct)
+    SearchDocument.objects.update_or_create(
+        content_type=ct,
+        object_id=obj.pk,
+        defaults={f: getattr(doc, f) for f in _UPDATE_FIELDS if f != "updated_at"},
+    )
+
+
+def unindex_object(model, pk) -> None:
+    ct = ContentType.objects.get_for_model(model)
+    SearchDocument.objects.filter(content_type=ct, object_id=pk).delete()
+
+
+def rebuild(specs: Iterable[IndexSpec] | None = None, batch_size: int = 500) -> int:
+    """إعادة بناء الفهرس بالكامل على دفعات (للتعبئة الأولى أو بعد تعديل قواعد الفهرسة)."""
+    total = 0
+    for spec in specs or REGISTRY.values():
+        model = spec.model
+        ct = ContentType.objects.get_for_model(model)
+        SearchDocument.objects.filter(content_type=ct).delete()
+
+        batch = []
+        qs = model._default_manager.select_related(*spec.select_related).order_by("pk")
+        for obj in qs.iterator(chunk_size=batch_size):
+            if not spec.include(obj):
+                continue
+            batch.append(build_document(spec, obj, ct))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            SearchDocument.objects.bulk_create(batch)
+            total += len(batch)
+    return total
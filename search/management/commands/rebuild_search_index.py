@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from search.indexing import REGISTRY, rebuild
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء فهرس البحث بالكامل (أو لنماذج محددة عبر --model store.Product)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", action="append", default=[], help="اسم النموذج مثل store.Product")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        labels = opts["model"] or list(REGISTRY)
+        unknown = [l for l in labels if l not in REGISTRY]
+        if unknown:
+            self.stderr.write(f"نماذج غير مفهرسة: {', '.join(unknown)}")
+            return
+        total = rebuild([REGISTRY[l] for l in labels], batch_size=opts["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"تمت فهرسة {total} وثيقة."))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(choices=[('product', 'منتج'), ('course', 'دورة'), ('lesson', 'محاضرة'), ('resource', 'مرجع')], max_length=20)),
+                ('is_public', models.BooleanField(default=True, help_text='يظهر للزوار غير المسجّلين؟')),
+                ('title', models.CharField(max_length=255)),
+                ('snippet', models.CharField(blank=True, max_length=300)),
+                ('url', models.CharField(blank=True, max_length=500)),
+                ('search_title', models.TextField(blank=True)),
+                ('search_body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'وثيقة بحث',
+                'verbose_name_plural': 'وثائق البحث',
+                'indexes': [models.Index(fields=['kind', 'is_public'], name='search_sear_kind_b59149_idx')],
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id'), name='uq_searchdoc_object')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# =========================
+#   SQLite: جدول FTS5 + Triggers
+# =========================
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        search_title, search_body,
+        content='search_searchdocument', content_rowid='id',
+        tokenize='unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_fts_ai AFTER INSERT ON search_searchdocument BEGIN
+        INSERT INTO search_fts(rowid, search_title, search_body)
+        VALUES (new.id, new.search_title, new.search_body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_fts_ad AFTER DELETE ON search_searchdocument BEGIN
+        INSERT INTO search_fts(search_fts, rowid, search_title, search_body)
+        VALUES ('delete', old.id, old.search_title, old.search_body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_fts_au AFTER UPDATE ON search_searchdocument BEGIN
+        INSERT INTO search_fts(search_fts, rowid, search_title, search_body)
+        VALUES ('delete', old.id, old.search_title, old.search_body);
+        INSERT INTO search_fts(rowid, search_title, search_body)
+        VALUES (new.id, new.search_title, new.search_body);
+    END
+    """,
+    "INSERT INTO search_fts(search_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS search_fts_au",
+    "DROP TRIGGER IF EXISTS search_fts_ad",
+    "DROP TRIGGER IF EXISTS search_fts_ai",
+    "DROP TABLE IF EXISTS search_fts",
+]
+
+# =========================
+#   Postgres: tsvector مولَّد + GIN
+# =========================
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE search_searchdocument ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(search_title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(search_body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS search_doc_vector_gin ON search_searchdocument USING gin (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS search_doc_vector_gin",
+    "ALTER TABLE search_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_vendor):
+    def _apply(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return _apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            _run({"sqlite": SQLITE_REVERSE, "postgresql": POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-16 22:55
+
+from django.db import migrations, models
+
+# وثائق خاصة ← مقررها: تُعبّأ من الكائن الأصلي بدل إعادة بناء الفهرس.
+# course_id يخلط teachers.Course (المحاضرات ومراجع المعلّم) وstudents.Course (مراجع الطالب)
+# في عمود واحد اعتمادًا على اصطلاح المفتاح المشترك: دورة الطالب تُنشأ بنفس pk دورة المعلّم،
+# فيطابق Enrollment.course_id هذا العمود مباشرة. كسر الاصطلاح يُظهر الوثائق لمقرر آخر.
+PRIVATE_MODELS = (
+    ("teachers", "lesson"),
+    ("teachers", "resource"),
+    ("students", "resource"),
+)
+BATCH = 500
+
+
+def backfill_course_ids(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    SearchDocument = apps.get_model("search", "SearchDocument")
+    for app_label, model_name in PRIVATE_MODELS:
+        ct = ContentType.objects.filter(app_label=app_label, model=model_name).first()
+        if ct is None:
+            continue
+        model = apps.get_model(app_label, model_name)
+        last_id = 0
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", "course_id")[:BATCH]
+            )
+            if not rows:
+                break
+            by_course = {}
+            for pk, course_id in rows:
+                by_course.setdefault(course_id, []).append(pk)
+            for course_id, pks in by_course.items():
+                SearchDocument.objects.filter(content_type=ct, object_id__in=pks).update(course_id=course_id)
+            last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('search', '0002_fulltext_index'),
+        ('students', '0007_course_enrollment_counters'),
+        ('teachers', '0009_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchdocument',
+            name='course_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='searchdocument',
+            index=models.Index(fields=['course_id'], name='search_doc_course_idx'),
+        ),
+        migrations.RunPython(backfill_course_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+# =========================
+#     وثيقة البحث
+# =========================
+class SearchDocument(models.Model):
+    """
+    صفّ واحد لكل كائن مفهرس (منتج/دورة/محاضرة/مرجع).
+    - search_title/search_body: نص موحّد (بعد normalize_text) تُبنى عليه الفهرسة.
+    - title/snippet/url: بيانات عرض جاهزة حتى لا نحتاج استعلامًا إضافيًا لكل نتيجة.
+    جدول FTS5 (SQLite) أو عمود tsvector + GIN (Postgres) يُنشأ في الترحيل حسب قاعدة البيانات.
+    """
+
+    KIND_PRODUCT = "product"
+    KIND_COURSE = "course"
+    KIND_LESSON = "lesson"
+    KIND_RESOURCE = "resource"
+
+    KINDS = (
+        (KIND_PRODUCT, "منتج"),
+        (KIND_COURSE, "دورة"),
+        (KIND_LESSON, "محاضرة"),
+        (KIND_RESOURCE, "مرجع"),
+    )
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=20, choices=KINDS)
+    is_public = models.BooleanField(default=True, help_text="يظهر للزوار غير المسجّلين؟")
+    # معرّف الدورة (teachers.Course = students.Course) للوثائق الخاصة: تظهر لطلابها النشطين ومعلّمها فقط
+    course_id = models.PositiveBigIntegerField(null=True, blank=True)
+
+    title = models.CharField(max_length=255)
+    snippet = models.CharField(max_length=300, blank=True)
+    url = models.CharField(max_length=500, blank=True)
+
+    search_title = models.TextField(blank=True)
+    search_body = models.TextField(blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "وثيقة بحث"
+        verbose_name_plural = "وثائق البحث"
+        constraints = [
+            models.UniqueConstraint(fields=["content_type", "object_id"], name="uq_searchdoc_object"),
+        ]
+        indexes = [
+            models.Index(fields=["kind", "is_public"]),
+            models.Index(fields=["course_id"], name="search_doc_course_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"[{self.kind}] {self.title}"
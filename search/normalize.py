@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+
+# =========================
+#   توحيد النص العربي
+# =========================
+# التشكيل (الفتحة.. السكون) + الألف الخنجرية + التطويل
+_TASHKEEL_RE = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+
+_CHAR_MAP = str.maketrans({
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ؤ": "و",
+    "ئ": "ي",
+    "ى": "ي",
+    "ة": "ه",
+})
+
+# أي شيء ليس حرفًا أو رقمًا يتحوّل لمسافة (يشمل علامات الترقيم العربية)
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_text(text: str | None) -> str:
+    """
+    توحيد النص قبل الفهرسة والبحث:
+    - NFKC لفكّ أشكال العرض العربية.
+    - حذف التشكيل والتطويل.
+    - توحيد الألف/الهمزات، والتاء المربوطة → هاء، والألف المقصورة → ياء.
+    - أحرف صغيرة ومسافات موحّدة.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", str(text))
+    text = _TASHKEEL_RE.sub("", text)
+    text = text.translate(_CHAR_MAP).lower()
+    text = _NON_WORD_RE.sub(" ", text).replace("_", " ")
+    return " ".join(text.split())
+
+
+def query_terms(query: str | None, max_terms: int = 8) -> list[str]:
+    """تقسيم استعلام المستخدم إلى كلمات موحّدة (بحدّ أقصى لعدد الكلمات)."""
+    return normalize_text(query).split()[:max_terms]
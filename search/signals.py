@@ -0,0 +1,26 @@
+# search/signals.py
+from __future__ import annotations
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .indexing import REGISTRY, index_object, unindex_object
+
+
+def _on_save(sender, instance, raw=False, **kwargs):
+    """تحديث الوثيقة بعد نجاح المعاملة فقط (لا نفهرس صفوفًا قد تُلغى)."""
+    if raw:
+        return
+    transaction.on_commit(partial(index_object, instance))
+
+
+def _on_delete(sender, instance, **kwargs):
+    # نلتقط pk الآن لأن Django يصفّره بعد انتهاء الحذف
+    transaction.on_commit(partial(unindex_object, sender, instance.pk))
+
+
+for _spec in REGISTRY.values():
+    post_save.connect(_on_save, sender=_spec.model_label, dispatch_uid=f"search_index_{_spec.model_label}")
+    post_delete.connect(_on_delete, sender=_spec.model_label, dispatch_uid=f"search_unindex_{_spec.model_label}")
@@ -0,0 +1,131 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.models import CustomUser
+from store.models import Category, Product
+from students.models import Course as StudentCourse, Enrollment
+from teachers.models import Course, Lesson, Subject, TeacherProfile
+
+from .backends import FTS_TABLE, get_backend
+from .normalize import normalize_text, query_terms
+
+
+class NormalizeTextTests(SimpleTestCase):
+    """الفهرسة والبحث يمرّان بنفس التوحيد، فالصيغ المختلفة للكلمة تتطابق."""
+
+    def test_hamza_forms_fold_to_bare_letters(self):
+        self.assertEqual(normalize_text("أحمد إسلام آمن ٱلقرآن"), "احمد اسلام امن القران")
+        self.assertEqual(normalize_text("مؤمن قارئ"), "مومن قاري")
+
+    def test_taa_marbuta_and_alif_maqsura(self):
+        self.assertEqual(normalize_text("مدرسة"), normalize_text("مدرسه"))
+        self.assertEqual(normalize_text("مستشفى"), "مستشفي")
+
+    def test_diacritics_and_tatweel_are_dropped(self):
+        self.assertEqual(normalize_text("مُدَرِّسَةٌ"), "مدرسه")
+        self.assertEqual(normalize_text("رحمٰن"), "رحمن")
+        self.assertEqual(normalize_text("عـــربي"), "عربي")
+
+    def test_punctuation_case_and_empty(self):
+        self.assertEqual(normalize_text("  Python، و«جافا»؟ "), "python و جافا")
+        self.assertEqual(normalize_text(None), "")
+        self.assertEqual(query_terms("أ ب ج د ه و ز ح ط", max_terms=3), ["ا", "ب", "ج"])
+
+
+class PrivateDocumentAccessTests(TestCase):
+    """المحاضرات لا تظهر في البحث إلا لطلاب مقررها النشطين ومعلّمه."""
+
+    def setUp(self):
+        teacher = CustomUser.objects.create_user("owner", password="pass-12345", role="teacher")
+        self.teacher = teacher
+        with self.captureOnCommitCallbacks(execute=True):
+            course = Course.objects.create(
+                teacher=TeacherProfile.objects.create(user=teacher),
+                subject=Subject.objects.create(name="رياضيات", stage="ثانوي"),
+                title="تفاضل وتكامل",
+            )
+            Lesson.objects.create(
+                course=course, order=1, title="النهايات", content="تعريف النهاية",
+                recording_url="https://example.com/limits",
+            )
+        self.course = StudentCourse.objects.create(pk=course.pk, title=course.title, slug="calculus")
+
+    def _titles(self, user=None):
+        if user is not None:
+            self.client.force_login(user)
+        response = self.client.get(reverse("search:search"), {"q": "النهايات", "format": "json"})
+        return [r["title"] for r in response.json()["results"]]
+
+    def test_hidden_from_anonymous_and_non_enrolled_students(self):
+        self.assertEqual(self._titles(), [])
+        outsider = CustomUser.objects.create_user("outsider", password="pass-12345", role="student")
+        self.assertEqual(self._titles(outsider), [])
+
+    def test_visible_to_active_students_and_the_teacher(self):
+        student = CustomUser.objects.create_user("member", password="pass-12345", role="student")
+        enrollment = Enrollment.objects.create(student=student.student_profile, course=self.course)
+        self.assertEqual(self._titles(student), ["النهايات"])
+
+        Enrollment.objects.filter(pk=enrollment.pk).update(status=Enrollment.STATUS_EXPIRED)
+        self.assertEqual(self._titles(student), [])
+        self.assertEqual(self._titles(self.teacher), ["النهايات"])
+
+
+class SearchRankingTests(TestCase):
+    """الترتيب: تطابق العنوان قبل المحتوى، والاستعلام يُوحَّد كما يُوحَّد النص المفهرس."""
+
+    def setUp(self):
+        category = Category.objects.create(name="مكتبية")
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                name="دفتر مدرسي", description="دفتر بغلاف مقوّى يكتب عليه قلم الرصاص", price="8.00", category=category,
+            )
+            Product.objects.create(
+                name="قلم حبر", description="قلم أزرق", price="2.00", category=category,
+            )
+            Product.objects.create(name="مِسْطَرَة", description="", price="1.00", category=category)
+
+    def _titles(self, q):
+        response = self.client.get(reverse("search:search"), {"q": q, "format": "json"})
+        return [r["title"] for r in response.json()["results"]]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self._titles("قلم"), ["قلم حبر", "دفتر مدرسي"])
+
+    def test_query_is_normalized_like_the_index(self):
+        self.assertEqual(self._titles("مسطره"), ["مِسْطَرَة"])
+        self.assertEqual(self._titles("مدرسيّ"), ["دفتر مدرسي"])
+
+
+@skipUnless(connection.vendor == "sqlite", "Triggers جدول FTS5 خاصة بـ SQLite")
+class FullTextTriggerTests(TestCase):
+    """Triggers تُبقي جدول FTS5 مطابقًا للوثائق بعد التعديل والحذف، لا عند البناء فقط."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="أدوات")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name="ممحاة", price="1.00", category=self.category)
+
+    def _fts_rowids(self, term):
+        # مباشرة على الفهرس: صفّ قديم يتيم لا يظهر في JOIN البحث لكنه يظهر هنا
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [f'"{term}"'])
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_update_replaces_indexed_terms(self):
+        (doc_id,) = self._fts_rowids("ممحاه")
+        self.product.name = "براية"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(self._fts_rowids("ممحاه"), [])
+        self.assertEqual(self._fts_rowids("برايه"), [doc_id])
+        self.assertEqual([d.title for d in get_backend().search(["برايه"], limit=5)], ["براية"])
+
+    def test_delete_removes_indexed_terms(self):
+        self.assertEqual(len(self._fts_rowids("ممحاه")), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(self._fts_rowids("ممحاه"), [])
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
+
+from core.profiles import student_for, teacher_profile_for
+from students.models import Enrollment
+from teachers.models import Course
+
+from .backends import get_backend
+from .models import SearchDocument
+from .normalize import query_terms
+
+PAGE_SIZE = 20
+MAX_PAGE = 50  # النتائج المرتّبة تُرقّم بالإزاحة؛ نحدّ العمق لتبقى التكلفة محدودة
+
+_VALID_KINDS = {k for k, _ in SearchDocument.KINDS}
+
+
+def _page_number(raw) -> int:
+    try:
+        return max(1, min(int(raw), MAX_PAGE))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _visible_course_ids(user) -> list[int]:
+    """مقررات الوثائق الخاصة المسموحة: تسجيلات الطالب السارية الآن، ومقررات المعلّم."""
+    ids: set[int] = set()
+    student = student_for(user)
+    if student is not None:
+        ids.update(Enrollment.objects.active_now().filter(student=student).values_list("course_id", flat=True))
+    teacher = teacher_profile_for(user)
+    if teacher is not None:
+        ids.update(Course.objects.filter(teacher=teacher).values_list("pk", flat=True))
+    return sorted(ids)
+
+
+# =========================
+#        صفحة البحث
+# =========================
+@require_http_methods(["GET"])
+def search(request):
+    """
+    بحث مرتّب في المنتجات والدورات والمحاضرات والمراجع:
+    - الوثائق العامة (منتجات/دورات) للجميع؛ المحاضرات والمراجع لطلاب مقررها النشطين
+      ولمعلّمه فقط، لا لكل مستخدم مسجّل الدخول.
+    - ?kind=product&kind=course لتصفية النوع، ?page=N للترقيم، ?format=json لاستجابة JSON.
+    """
+    q = (request.GET.get("q") or "").strip()
+    kinds = [k for k in request.GET.getlist("kind") if k in _VALID_KINDS]
+    page = _page_number(request.GET.get("page"))
+    terms = query_terms(q)
+
+    results, has_next = [], False
+    if terms:
+        rows = get_backend().search(
+            terms,
+            course_ids=_visible_course_ids(request.user),
+            kinds=kinds,
+            limit=PAGE_SIZE + 1,
+            offset=(page - 1) * PAGE_SIZE,
+        )
+        has_next = len(rows) > PAGE_SIZE and page < MAX_PAGE
+        results = rows[:PAGE_SIZE]
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "q": q,
+            "page": page,
+            "has_next": has_next,
+            "results": [
+                {"kind": d.kind, "title": d.title, "snippet": d.snippet, "url": d.url}
+                for d in results
+            ],
+        })
+
+    return render(request, "search/results.html", {
+        "q": q,
+        "kinds": kinds,
+        "results": results,
+        "page": page,
+        "has_next": has_next,
+        "has_previous": page > 1,
+    })
@@ -0,0 +1,222 @@
+# store/images.py
+from __future__ import annotations
+
+import atexit
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# عروض النسخ المشتقة (بكسل): مصغّرات السلة، بطاقات القائمة، صفحة المنتج، الشاشات الكثيفة
+WIDTHS = (160, 320, 640, 960)
+WEBP_QUALITY = 78
+PLACEHOLDER_WIDTH = 16
+SRC_WIDTH = 640
+DERIVED_DIR = "products/derived"
+FETCH_TIMEOUT = 20
+
+DEFAULT_WORKERS = 2
+
+# المجمّع يُنشأ كسولًا داخل عامل متعدد الخيوط: fork قد يورث أقفالًا محجوزة فيتجمّد الابن
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _workers() -> int:
+    return int(getattr(settings, "PRODUCT_IMAGE_WORKERS", DEFAULT_WORKERS))
+
+
+# =========================
+#   المعالجة (عملية منفصلة)
+# =========================
+def render_variants(data: bytes, widths=WIDTHS) -> tuple[dict[int, bytes], str]:
+    """
+    دالة نقية تُنفَّذ في ProcessPoolExecutor (Pillow يحجز المعالج ولا يحرّر الـ GIL
+    في كل العمليات). تُرجع {العرض: WebP} بلا تكبير فوق الأصل، وصورة placeholder
+    صغيرة مموّهة كـ data URI.
+    """
+    from PIL import Image, ImageFilter, ImageOps
+
+    with Image.open(io.BytesIO(data)) as src:
+        image = ImageOps.exif_transpose(src)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    variants = {}
+    targets = sorted({min(w, image.width) for w in widths})
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        resized.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        variants[width] = out.getvalue()
+
+    tiny = image.resize(
+        (PLACEHOLDER_WIDTH, max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))), Image.BILINEAR,
+    ).filter(ImageFilter.GaussianBlur(1))
+    out = io.BytesIO()
+    tiny.save(out, "WEBP", quality=40)
+    placeholder = "data:image/webp;base64," + base64.b64encode(out.getvalue()).decode()
+    return variants, placeholder
+
+
+# =========================
+#        المجمّعات
+# =========================
+_lock = threading.Lock()
+_processes: ProcessPoolExecutor | None = None
+_threads: ThreadPoolExecutor | None = None
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _processes
+    with _lock:
+        if _processes is None:
+            _processes = ProcessPoolExecutor(
+                max_workers=_workers(), mp_context=multiprocessing.get_context(_START_METHOD),
+            )
+        return _processes
+
+
+def _thread_pool() -> ThreadPoolExecutor:
+    global _threads
+    with _lock:
+        if _threads is None:
+            _threads = ThreadPoolExecutor(max_workers=1, thread_name_prefix="product-images")
+        return _threads
+
+
+def _shutdown() -> None:
+    for pool in (_threads, _processes):
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+atexit.register(_shutdown)
+
+
+# =========================
+#     المصدر والحفظ
+# =========================
+def _read_source(product) -> bytes:
+    """الملف المحلي (media/products/...) إن وُجد، وإلا تنزيل الأصل من Cloudinary."""
+    value = product.image_value
+    root = str(getattr(settings, "MEDIA_ROOT", "") or "")
+    for name in (value, os.path.join("products", os.path.basename(value))):
+        local = os.path.join(root, name)
+        if root and os.path.isfile(local):
+            with open(local, "rb") as fh:
+                return fh.read()
+    import requests
+
+    response = requests.get(product.image.url, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+def _store(product, key: str, variants: dict[int, bytes], placeholder: str) -> bool:
+    """
+    يحفظ النسخ ثم يثبّت srcset الجاهز على المنتج إن بقي مفتاح صورته كما هو (الصف
+    مقفول): إن تغيّرت الصورة أثناء المعالجة تُحذف النسخ بدل ربطها بصورة أخرى.
+    """
+    from .models import Product
+
+    names = {
+        width: default_storage.save(f"{DERIVED_DIR}/{product.pk}/{key}/{width}.webp", ContentFile(data))
+        for width, data in variants.items()
+    }
+    urls = {width: default_storage.url(name) for width, name in names.items()}
+    # src الافتراضي للمتصفحات بلا srcset: أكبر نسخة حتى SRC_WIDTH
+    src_width = max((w for w in urls if w <= SRC_WIDTH), default=min(urls))
+    payload = {
+        "key": key,
+        "src": urls[src_width],
+        "srcset": ", ".join(f"{url} {width}w" for width, url in sorted(urls.items())),
+        "placeholder": placeholder,
+        "files": sorted(names.values()),
+    }
+    with transaction.atomic():
+        current = Product.objects.select_for_update().only("pk", "image").filter(pk=product.pk).first()
+        updated = 0
+        if current is not None and current.image_key == key:
+            updated = Product.objects.filter(pk=product.pk).update(image_variants=payload)
+    stale = (product.image_variants or {}).get("files", []) if updated else list(names.values())
+    for name in stale:
+        default_storage.delete(name)
+    return bool(updated)
+
+
+# =========================
+#          التوليد
+# =========================
+def build_variants(products, *, force: bool = False) -> int:
+    """
+    يولّد النسخ للمنتجات التي لا تطابق نسخها الحالية صورتها (أو كلها مع force):
+    القراءة والحفظ هنا، وفك الترميز/التصغير/الترميز في مجمّع العمليات.
+    تُرجع عدد المنتجات المحدَّثة.
+    """
+    pending = [p for p in products if p.image and (force or not p.image_variants_current)]
+    if not pending:
+        return 0
+
+    sources = {}
+    for product in pending:
+        try:
+            sources[product.pk] = _read_source(product)
+        except Exception:
+            logger.exception("product image: cannot read source for #%s", product.pk)
+
+    if _workers() <= 0:
+        results = {pk: render_variants(data) for pk, data in sources.items()}
+    else:
+        pool = _process_pool()
+        futures = {pk: pool.submit(render_variants, data) for pk, data in sources.items()}
+        results = {}
+        for pk, future in futures.items():
+            try:
+                results[pk] = future.result()
+            except Exception:
+                logger.exception("product image: cannot render #%s", pk)
+
+    done = 0
+    for product in pending:
+        if product.pk in results:
+            variants, placeholder = results[product.pk]
+            done += _store(product, product.image_key, variants, placeholder)
+    return done
+
+
+def schedule(product) -> None:
+    """بعد نجاح المعاملة: التوليد في خيط خلفي (الطلب لا ينتظر)، أو فورًا مع PRODUCT_IMAGE_WORKERS=0."""
+    pk = product.pk
+
+    def submit():
+        if _workers() <= 0:
+            _build_one(pk)
+        else:
+            _thread_pool().submit(_run, pk)
+
+    transaction.on_commit(submit, robust=True)
+
+
+def _build_one(pk: int) -> int:
+    from .models import Product
+
+    return build_variants(Product.objects.filter(pk=pk).only("pk", "image", "image_variants"))
+
+
+def _run(pk: int) -> None:
+    try:
+        _build_one(pk)
+    except Exception:
+        logger.exception("product image build failed for #%s", pk)
+    finally:
+        connection.close()
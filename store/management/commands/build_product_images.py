@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from store.images import build_variants
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "توليد نسخ WebP المتجاوبة وصورة placeholder لصور المنتجات التي لا نسخ حالية لها."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--force", action="store_true",
+                            help="إعادة التوليد حتى للمنتجات التي نسخها حالية (بعد تغيير العروض أو الجودة).")
+
+    def handle(self, *args, **opts):
+        batch = max(1, opts["batch_size"])
+        products = (
+            Product.objects.exclude(image__isnull=True).exclude(image="")
+            .only("pk", "image", "image_variants")
+        )
+        total = 0
+        last_id = 0
+        while True:
+            chunk = list(products.filter(pk__gt=last_id).order_by("pk")[:batch])
+            if not chunk:
+                break
+            # دفعة واحدة لمجمّع العمليات: المنتجات تُعالج بالتوازي
+            total += build_variants(chunk, force=opts["force"])
+            last_id = chunk[-1].pk
+        self.stdout.write(self.style.SUCCESS(f"تم توليد نسخ {total} صورة."))
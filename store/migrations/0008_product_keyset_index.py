@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_alter_booking_course_alter_booking_stage'),
+        ('teachers', '0006_alter_course_code_alter_resource_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available', 'created_at', 'id'], name='product_avail_created_id_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from __future__ import annotations
+import hashlib
+
 from django.db import models
 from django.urls import reverse
 from cloudinary.models import CloudinaryField
@@ -38,6 +40,8 @@ class Product(models.Model):
     )
     available = models.BooleanField(default=True, verbose_name="متوفر؟")
     image = CloudinaryField(verbose_name="صورة المنتج", blank=True, null=True)
+    # نسخ WebP المشتقة (store.images): src/srcset/placeholder جاهزة مفتاحها نسخة الصورة
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="نسخ الصورة")
     description = models.TextField(blank=True, verbose_name="الوصف")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإضافة")
 
@@ -58,6 +62,8 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=["available"]),
             models.Index(fields=["created_at"]),
+            # يخدم ترقيم المؤشّر في قائمة المنتجات: WHERE available ORDER BY created_at, id
+            models.Index(fields=["available", "created_at", "id"], name="product_avail_created_id_idx"),
         ]
 
     def __str__(self) -> str:
@@ -70,6 +76,42 @@ class Product(models.Model):
     def get_absolute_url(self):
         return reverse("store:product_detail", args=[self.pk])
 
+    # ===== الصورة المتجاوبة =====
+    @property
+    def image_value(self) -> str:
+        """
+        قيمة الصورة بصيغة موحّدة (image/upload/<public_id>.<format>): النص المُسند
+        مباشرة يُحلَّل كما يُحلَّل عند القراءة من القاعدة، فيبقى image_key ثابتًا بعد الحفظ.
+        """
+        field = self._meta.get_field("image")
+        value = self.image
+        if isinstance(value, str) and value:
+            value = field.to_python(value)
+        return field.get_prep_value(value) or ""
+
+    @property
+    def image_key(self) -> str:
+        return hashlib.sha1(self.image_value.encode()).hexdigest()[:12]
+
+    @property
+    def image_variants_current(self) -> bool:
+        """النسخ المحفوظة تخص الصورة الحالية (لا بقايا صورة سابقة)."""
+        return bool(self.image) and (self.image_variants or {}).get("key") == self.image_key
+
+    @property
+    def image_src(self) -> str:
+        if self.image_variants_current:
+            return self.image_variants["src"]
+        return self.image.url if self.image else ""
+
+    @property
+    def image_srcset(self) -> str:
+        return self.image_variants["srcset"] if self.image_variants_current else ""
+
+    @property
+    def image_placeholder(self) -> str:
+        return self.image_variants["placeholder"] if self.image_variants_current else ""
+
 
 # =========================
 #        الحجوزات
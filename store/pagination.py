@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+# =========================
+#        الإعدادات
+# =========================
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+CURSOR_PARAM = "cursor"
+
+
+# =========================
+#      ترميز المؤشّر
+# =========================
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    """يحوّل (created_at, id) إلى نص آمن للاستخدام في الرابط."""
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> Optional[Tuple[datetime, int]]:
+    """فكّ المؤشّر؛ أي مؤشّر تالف يُعامل كأنه الصفحة الأولى."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        ts_str, pk_str = raw.rsplit("|", 1)
+        ts = parse_datetime(ts_str)
+        pk = int(pk_str)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if ts is None:
+        return None
+    return ts, pk
+
+
+# =========================
+#       صفحة المؤشّر
+# =========================
+@dataclass
+class KeysetPage:
+    items: List = field(default_factory=list)
+    cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self) -> bool:
+        return self.cursor is None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+def _page_size(requested: int | None) -> int:
+    size = requested or getattr(settings, "STORE_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    return max(1, min(int(size), MAX_PAGE_SIZE))
+
+
+def keyset_paginate(qs: QuerySet, cursor: str | None, page_size: int | None = None) -> KeysetPage:
+    """
+    ترقيم بالمؤشّر على (created_at, id) تنازليًا:
+    - لا يستخدم OFFSET؛ كل صفحة تبدأ من آخر مفتاح في الصفحة السابقة،
+      فتكلفة الصفحة العميقة تساوي تكلفة الصفحة الأولى.
+    - نجلب عنصرًا إضافيًا واحدًا لمعرفة وجود صفحة تالية بدون COUNT.
+    """
+    size = _page_size(page_size)
+    position = decode_cursor(cursor)
+
+    qs = qs.order_by("-created_at", "-id")
+    if position is not None:
+        ts, pk = position
+        qs = qs.filter(Q(created_at__lt=ts) | Q(created_at=ts, id__lt=pk))
+
+    rows = list(qs[: size + 1])
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.pk)
+
+    return KeysetPage(items=rows, cursor=cursor if position is not None else None, next_cursor=next_cursor)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Mapping, Tuple
+
+from django.conf import settings
+
+from .models import Product
+
+# =========================
+#        الإعدادات
+# =========================
+MINOR_UNITS = 100            # هللة لكل ريال
+DEFAULT_TAX_RATE_BP = 1500   # 15% بنقاط الأساس (1bp = 0.01%)
+MAX_QTY_PER_ITEM = 99
+
+_REQUEST_CACHE_ATTR = "_priced_cart"
+
+
+def to_minor(amount) -> int:
+    """تحويل مبلغ عشري إلى هللات (عدد صحيح) بتقريب نصفي للأعلى."""
+    return int((Decimal(amount or 0) * MINOR_UNITS).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_minor(minor: int) -> Decimal:
+    """تحويل الهللات إلى Decimal بخانتين للعرض والتخزين."""
+    return (Decimal(minor) / MINOR_UNITS).quantize(Decimal("0.01"))
+
+
+def tax_rate_bp() -> int:
+    return int(getattr(settings, "STORE_TAX_RATE_BP", DEFAULT_TAX_RATE_BP))
+
+
+# =========================
+#       نتائج التسعير
+# =========================
+@dataclass(frozen=True)
+class PricedLine:
+    product: Product
+    quantity: int
+    unit_minor: int
+
+    @property
+    def line_minor(self) -> int:
+        return self.unit_minor * self.quantity
+
+    # واجهة Decimal للقوالب والحفظ
+    @property
+    def unit_price(self) -> Decimal:
+        return from_minor(self.unit_minor)
+
+    @property
+    def subtotal(self) -> Decimal:
+        return from_minor(self.line_minor)
+
+    line_total = subtotal
+
+
+@dataclass(frozen=True)
+class PricedCart:
+    lines: Tuple[PricedLine, ...] = ()
+    tax_bp: int = DEFAULT_TAX_RATE_BP
+    subtotal_minor: int = field(init=False)
+    tax_minor: int = field(init=False)
+
+    def __post_init__(self):
+        subtotal = sum(line.line_minor for line in self.lines)
+        # تقريب نصفي للأعلى على مستوى الهللة
+        tax = (subtotal * self.tax_bp + 5000) // 10000
+        object.__setattr__(self, "subtotal_minor", subtotal)
+        object.__setattr__(self, "tax_minor", tax)
+
+    @property
+    def total_minor(self) -> int:
+        return self.subtotal_minor + self.tax_minor
+
+    @property
+    def subtotal(self) -> Decimal:
+        return from_minor(self.subtotal_minor)
+
+    @property
+    def tax(self) -> Decimal:
+        return from_minor(self.tax_minor)
+
+    @property
+    def grand_total(self) -> Decimal:
+        return from_minor(self.total_minor)
+
+    @property
+    def tax_percent(self) -> Decimal:
+        # normalize() وحده يعطي 1E+1 لـ 1000bp؛ الصيغة الثابتة تعيدها 10 (و12.5 لـ 1250bp)
+        return Decimal(f"{(Decimal(self.tax_bp) / 100).normalize():f}")
+
+    @property
+    def items_count(self) -> int:
+        return sum(line.quantity for line in self.lines)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.lines
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __bool__(self) -> bool:
+        return bool(self.lines)
+
+
+# =========================
+#        محرك التسعير
+# =========================
+def normalize_cart(cart: Mapping | None) -> Dict[int, int]:
+    """تنظيف قاموس السلة: مفاتيح/كميات صحيحة موجبة فقط، مع سقف للكمية."""
+    clean: Dict[int, int] = {}
+    if not isinstance(cart, Mapping):
+        return clean
+    for pid, qty in cart.items():
+        try:
+            pid, qty = int(pid), int(qty)
+        except (TypeError, ValueError):
+            continue
+        if pid > 0 and qty > 0:
+            clean[pid] = min(qty, MAX_QTY_PER_ITEM)
+    return clean
+
+
+def price_cart(cart: Mapping | None) -> PricedCart:
+    """
+    تسعير السلة كاملة باستعلام واحد:
+    - المنتجات غير المتوفرة أو المحذوفة تُسقط من النتيجة.
+    - الحساب بالهللات (int) لتفادي أخطاء التقريب، وDecimal للعرض فقط.
+    """
+    quantities = normalize_cart(cart)
+    if not quantities:
+        return PricedCart(tax_bp=tax_rate_bp())
+
+    products = (
+        Product.objects
+        .filter(pk__in=quantities.keys(), available=True)
+        .select_related("course")
+        .order_by("pk")
+    )
+    lines = tuple(
+        PricedLine(product=p, quantity=quantities[p.pk], unit_minor=to_minor(p.price))
+        for p in products
+    )
+    return PricedCart(lines=lines, tax_bp=tax_rate_bp())
+
+
+def price_request_cart(request, cart: Mapping | None) -> PricedCart:
+    """
+    تسعير سلة الطلب الحالي مع تخزين النتيجة على request:
+    أي استدعاء لاحق بنفس محتوى السلة داخل نفس الطلب لا يكرر الاستعلام.
+    """
+    key = tuple(sorted(normalize_cart(cart).items()))
+    cached = getattr(request, _REQUEST_CACHE_ATTR, None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    priced = price_cart(dict(key))
+    setattr(request, _REQUEST_CACHE_ATTR, (key, priced))
+    return priced
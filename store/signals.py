@@ -0,0 +1,18 @@
+# store/signals.py
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import images
+from .models import Product
+
+
+# =========================
+#    نسخ صورة المنتج
+# =========================
+@receiver(post_save, sender=Product, dispatch_uid="store_product_image_variants")
+def _schedule_image_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    # الصورة جديدة أو تغيّرت (مفتاح النسخ لا يطابقها): توليد بعد نجاح المعاملة
+    if raw or (update_fields is not None and "image" not in update_fields):
+        return
+    if instance.image and not instance.image_variants_current:
+        images.schedule(instance)
@@ -1,3 +1,196 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.files.storage import default_storage
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from . import images
+from .images import WIDTHS, render_variants
+from .models import Category, Product
+from .pagination import decode_cursor, encode_cursor, keyset_paginate
+from .pricing import (
+    MAX_QTY_PER_ITEM, PricedCart, PricedLine, from_minor, normalize_cart, price_cart, price_request_cart, to_minor,
+)
+
+
+class PricingArithmeticTests(SimpleTestCase):
+    """الحساب بالهللات مع تقريب نصفي للأعلى، ونسبة الضريبة تُعرض بلا صيغة أُسّية."""
+
+    def test_minor_units_round_half_up(self):
+        self.assertEqual(to_minor("10.005"), 1001)
+        self.assertEqual(to_minor(None), 0)
+        self.assertEqual(from_minor(1001), Decimal("10.01"))
+
+    def test_tax_rounds_half_up_on_the_subtotal(self):
+        line = PricedLine(product=None, quantity=3, unit_minor=333)
+        cart = PricedCart(lines=(line,), tax_bp=1500)
+        # 999 × 15% = 149.85 هللة → 150
+        self.assertEqual((cart.subtotal_minor, cart.tax_minor, cart.total_minor), (999, 150, 1149))
+        self.assertEqual(cart.grand_total, Decimal("11.49"))
+        self.assertEqual(cart.items_count, 3)
+
+    def test_tax_percent_is_plain(self):
+        for bp, shown in ((1000, "10"), (2000, "20"), (1250, "12.5"), (1500, "15"), (0, "0")):
+            self.assertEqual(str(PricedCart(tax_bp=bp).tax_percent), shown)
+
+    def test_normalize_cart_drops_junk_and_caps_quantity(self):
+        cart = {"1": "2", "2": 0, "x": 1, "3": -1, 4: 500, "5": "a"}
+        self.assertEqual(normalize_cart(cart), {1: 2, 4: MAX_QTY_PER_ITEM})
+        self.assertEqual(normalize_cart(None), {})
+
+
+@override_settings(STORE_TAX_RATE_BP=1500)
+class PriceCartTests(TestCase):
+    """السلة كاملة باستعلام واحد، وغير المتوفر يسقط، والنتيجة تُحفظ على الطلب."""
+
+    def setUp(self):
+        category = Category.objects.create(name="قرطاسية")
+        self.pen = Product.objects.create(name="قلم", price="2.50", category=category)
+        self.book = Product.objects.create(name="دفتر", price="12.00", category=category)
+        self.gone = Product.objects.create(name="نافد", price="9.00", category=category, available=False)
+
+    def test_single_query_and_unavailable_dropped(self):
+        with self.assertNumQueries(1):
+            priced = price_cart({self.pen.pk: 4, self.book.pk: 1, self.gone.pk: 2, 9999: 1})
+        self.assertEqual([line.product for line in priced], [self.pen, self.book])
+        self.assertEqual(priced.subtotal, Decimal("22.00"))
+        self.assertEqual(priced.tax, Decimal("3.30"))
+        self.assertEqual(priced.grand_total, Decimal("25.30"))
+
+    def test_empty_cart_runs_no_query(self):
+        with self.assertNumQueries(0):
+            priced = price_cart({})
+        self.assertTrue(priced.is_empty)
+        self.assertEqual(priced.grand_total, Decimal("0.00"))
+
+    def test_request_memoizes_by_cart_contents(self):
+        request = RequestFactory().get("/")
+        first = price_request_cart(request, {str(self.pen.pk): 1})
+        with self.assertNumQueries(0):
+            self.assertIs(price_request_cart(request, {self.pen.pk: 1}), first)
+        with self.assertNumQueries(1):
+            self.assertEqual(price_request_cart(request, {self.pen.pk: 2}).items_count, 2)
+
+
+class KeysetPaginationTests(TestCase):
+    """المؤشّر يُفك كما رُمّز، والتساوي في created_at يُحسم بالمعرّف، والتالف = الصفحة الأولى."""
+
+    def setUp(self):
+        category = Category.objects.create(name="ألعاب")
+        self.products = [Product.objects.create(name=f"لعبة {i}", price=5, category=category) for i in range(5)]
+
+    def _walk(self, size):
+        seen, cursor = [], None
+        while True:
+            page = keyset_paginate(Product.objects.all(), cursor, page_size=size)
+            seen.append([p.pk for p in page])
+            if not page.has_next:
+                return seen
+            cursor = page.next_cursor
+
+    def test_cursor_round_trip(self):
+        ts = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(ts, 42)), (ts, 42))
+
+    def test_ties_on_created_at_are_split_by_id(self):
+        Product.objects.update(created_at=timezone.now())
+        pages = self._walk(2)
+        ids = sorted((p.pk for p in self.products), reverse=True)
+        self.assertEqual(pages, [ids[:2], ids[2:4], ids[4:]])
+
+    def test_newest_first_across_pages(self):
+        base = timezone.now()
+        for i, product in enumerate(self.products):
+            Product.objects.filter(pk=product.pk).update(created_at=base - timedelta(minutes=i))
+        self.assertEqual(sum(self._walk(3), []), [p.pk for p in self.products])
+
+    def test_invalid_cursor_is_first_page(self):
+        first = keyset_paginate(Product.objects.all(), None, page_size=2)
+        for bad in ("!!!", "bm90LWEtY3Vyc29y", encode_cursor(timezone.now(), 1)[:-3]):
+            page = keyset_paginate(Product.objects.all(), bad, page_size=2)
+            self.assertTrue(page.is_first)
+            self.assertEqual(page.items, first.items)
+
+
+_MEDIA_TMP = tempfile.mkdtemp(prefix="store-media-")
+
+_LOCAL_MEDIA = {
+    "STORAGES": {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    "MEDIA_ROOT": _MEDIA_TMP,
+    "PRODUCT_IMAGE_WORKERS": 0,
+}
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(out, "JPEG")
+    return out.getvalue()
+
+
+@override_settings(**_LOCAL_MEDIA)
+class ProductImageVariantsTests(TestCase):
+    """نسخ WebP بعدة عروض بلا تكبير، وsrcset جاهز مرتبط بنسخة الصورة الحالية."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(_MEDIA_TMP, ignore_errors=True)
+
+    def setUp(self):
+        os.makedirs(os.path.join(_MEDIA_TMP, "products"), exist_ok=True)
+        with open(os.path.join(_MEDIA_TMP, "products", "mug.jpeg"), "wb") as fh:
+            fh.write(_jpeg(800, 600))
+        self.category = Category.objects.create(name="أدوات")
+
+    def test_render_skips_upscaling(self):
+        variants, placeholder = render_variants(_jpeg(800, 600))
+        self.assertEqual(sorted(variants), [w for w in WIDTHS if w < 800] + [800])
+        with Image.open(io.BytesIO(variants[320])) as img:
+            self.assertEqual((img.format, img.size), ("WEBP", (320, 240)))
+        self.assertTrue(placeholder.startswith("data:image/webp;base64,"))
+
+    def test_upload_builds_srcset_for_current_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name="كوب", price=10, category=self.category, image="products/mug.jpeg",
+            )
+        product.refresh_from_db()
+        self.assertTrue(product.image_variants_current)
+        self.assertIn("320w", product.image_srcset)
+        for name in product.image_variants["files"]:
+            self.assertTrue(default_storage.exists(name))
+
+        # صورة جديدة: النسخ القديمة لا تُستخدم حتى تُولَّد نسخ الصورة الجديدة
+        product.image = "products/other.jpeg"
+        self.assertFalse(product.image_variants_current)
+        self.assertEqual(product.image_srcset, "")
+
+    def test_replaced_image_discards_late_variants(self):
+        product = Product.objects.create(name="كوب", price=10, category=self.category, image="products/mug.jpeg")
+        variants, placeholder = render_variants(_jpeg(200, 100), widths=(160,))
+        stale_key = product.image_key
+        Product.objects.filter(pk=product.pk).update(image="products/other.jpeg")
+        self.assertFalse(images._store(product, stale_key, variants, placeholder))
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants, {})
+        self.assertFalse(default_storage.exists(f"{images.DERIVED_DIR}/{product.pk}/{stale_key}/160.webp"))
+
+    @override_settings(PRODUCT_IMAGE_WORKERS=1)
+    def test_process_pool_does_not_fork(self):
+        pool = images._process_pool()
+        try:
+            self.assertNotEqual(pool._mp_context.get_start_method(), "fork")
+            variants, _ = pool.submit(render_variants, _jpeg(200, 100), (160,)).result(timeout=60)
+            self.assertEqual(sorted(variants), [160])
+        finally:
+            pool.shutdown(wait=True)
+            images._processes = None
@@ -1,28 +1,17 @@
 from __future__ import annotations
-from typing import Dict
-from decimal import Decimal
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_http_methods
-from django.db import transaction
 
 from .models import Product, Booking
+from .pagination import CURSOR_PARAM, keyset_paginate
+from .pricing import MAX_QTY_PER_ITEM, price_request_cart
+from cart.store import get_cart
 from orders.models import Order
-from students.models import Student, Enrollment
-
-
-# =========================
-#     أدوات السلة (Session)
-# =========================
-def _cart_get(request) -> Dict[str, int]:
-    return request.session.get("cart", {})
-
-
-def _cart_save(request, cart: Dict[str, int]) -> None:
-    request.session["cart"] = cart
-    request.session.modified = True
+from orders.idempotency import idempotent, new_key
+from orders.services import CheckoutError, place_order
 
 
 # =========================
@@ -30,8 +19,11 @@ def _cart_save(request, cart: Dict[str, int]) -> None:
 # =========================
 @require_http_methods(["GET"])
 def product_list(request):
-    products = Product.objects.filter(available=True).order_by("-id")
-    return render(request, "store/product_list.html", {"products": products})
+    page = keyset_paginate(
+        Product.objects.filter(available=True),
+        request.GET.get(CURSOR_PARAM),
+    )
+    return render(request, "store/product_list.html", {"products": page.items, "page": page})
 
 
 # =========================
@@ -50,9 +42,7 @@ def product_detail(request, pk: int):
 @require_http_methods(["POST"])
 def add_to_cart(request, pk: int):
     product = get_object_or_404(Product, pk=pk, available=True)
-    cart = _cart_get(request)
-    cart[str(pk)] = cart.get(str(pk), 0) + 1
-    _cart_save(request, cart)
+    get_cart(request).add(product.pk)
     messages.success(request, f"تمت إضافة {product.name} إلى السلة.")
     return redirect("store:cart_detail")
 
@@ -63,10 +53,7 @@ def add_to_cart(request, pk: int):
 @login_required
 @require_http_methods(["POST"])
 def remove_from_cart(request, pk: int):
-    cart = _cart_get(request)
-    if str(pk) in cart:
-        del cart[str(pk)]
-        _cart_save(request, cart)
+    if get_cart(request).remove(pk):
         messages.info(request, "تمت إزالة المنتج من السلة.")
     return redirect("store:cart_detail")
 
@@ -78,17 +65,14 @@ def remove_from_cart(request, pk: int):
 @require_http_methods(["POST"])
 def update_cart(request, pk: int):
     action = request.POST.get("action")
-    cart = _cart_get(request)
+    cart = get_cart(request)
 
-    if str(pk) in cart:
-        if action == "increase":
-            cart[str(pk)] += 1
-        elif action == "decrease":
-            cart[str(pk)] -= 1
-            if cart[str(pk)] <= 0:
-                del cart[str(pk)]
+    # عبارة UPDATE ذرية على السطر نفسه (لا تزيد سطرًا غير موجود)
+    if action == "increase" and cart.quantity(pk):
+        cart.add(pk, limit=MAX_QTY_PER_ITEM)
+    elif action == "decrease":
+        cart.decrement(pk)
 
-    _cart_save(request, cart)
     return redirect("store:cart_detail")
 
 
@@ -98,30 +82,14 @@ def update_cart(request, pk: int):
 @login_required
 @require_http_methods(["GET"])
 def cart_detail(request):
-    cart = _cart_get(request)
-    products = Product.objects.filter(id__in=cart.keys())
-
-    items, total = [], Decimal("0.00")
-    for product in products:
-        qty = cart.get(str(product.id), 0)
-        subtotal = product.price * qty
-        items.append({
-            "product": product,
-            "quantity": qty,
-            "subtotal": subtotal,
-        })
-        total += subtotal
-
-    # ✅ حساب الضريبة والإجمالي بالـ Decimal
-    tax_rate = Decimal("0.15")
-    tax = (total * tax_rate).quantize(Decimal("0.01"))
-    grand_total = total + tax
-
+    priced = price_request_cart(request, get_cart(request).as_dict())
     return render(request, "store/cart_detail.html", {
-        "items": items,
-        "total": total,
-        "tax": tax,
-        "grand_total": grand_total,
+        "cart": priced,
+        "items": priced.lines,
+        "total": priced.subtotal,
+        "tax": priced.tax,
+        "grand_total": priced.grand_total,
+        "idempotency_key": new_key(),
     })
 
 
@@ -132,8 +100,7 @@ def cart_detail(request):
 @require_http_methods(["POST", "GET"])
 def quick_book(request, pk: int):
     product = get_object_or_404(Product, pk=pk, available=True)
-    cart = {str(product.id): 1}
-    _cart_save(request, cart)
+    get_cart(request).replace({product.id: 1})
     messages.success(request, f"✅ تم حجز {product.name} بنجاح")
     return redirect("store:checkout")
 
@@ -143,54 +110,39 @@ def quick_book(request, pk: int):
 # =========================
 @login_required
 @require_http_methods(["GET", "POST"])
-@transaction.atomic
+@idempotent("store.checkout")
 def checkout(request):
-    cart = _cart_get(request)
+    cart = get_cart(request).as_dict()
     if not cart:
         messages.error(request, "🚫 السلة فارغة.")
         return redirect("store:product_list")
 
-    products = Product.objects.filter(id__in=cart.keys())
-    total = Decimal("0.00")
-
-    for product in products:
-        qty = cart[str(product.id)]
-        total += product.price * qty
-
-    tax_rate = Decimal("0.15")
-    tax = (total * tax_rate).quantize(Decimal("0.01"))
-    grand_total = total + tax
+    # تسعير واحد يُستخدم للعرض (GET) وللحفظ (POST)
+    priced = price_request_cart(request, cart)
+    if priced.is_empty:
+        messages.error(request, "🚫 المنتجات في السلة لم تعد متاحة.")
+        return redirect("store:product_list")
 
     if request.method == "POST":
-        student, _ = Student.objects.get_or_create(user=request.user)
-
-        for product in products:
-            qty = cart[str(product.id)]
-            order = Order.objects.create(
-                user=request.user,
-                product=product,
-                quantity=qty,
-                status=Order.STATUS_CONFIRMED,
-                total_price=product.price * qty,
-            )
-
-            if product.course:
-                Enrollment.objects.get_or_create(
-                    student=student,
-                    course=product.course,
-                )
-
-        request.session["cart"] = {}
-        request.session.modified = True
+        try:
+            place_order(request.user, priced, status=Order.STATUS_CONFIRMED, enroll=True)
+        except CheckoutError as e:
+            messages.error(request, f"🚫 {e}")
+            return redirect("store:cart_detail")
+
+        get_cart(request).clear()
 
         messages.success(request, "🎉 تم تنفيذ الطلب وتفعيل الدورات بنجاح")
         return redirect("students:dashboard")
 
     return render(request, "store/checkout.html", {
-        "products": products,
-        "total": total,
-        "tax": tax,
-        "grand_total": grand_total,
+        "cart": priced,
+        "items": priced.lines,
+        "products": [line.product for line in priced.lines],
+        "total": priced.subtotal,
+        "tax": priced.tax,
+        "grand_total": priced.grand_total,
+        "idempotency_key": new_key(),
     })
 
 
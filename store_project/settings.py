@@ -63,6 +63,7 @@ INSTALLED_APPS = [
     "students.apps.StudentsConfig",
     "teachers.apps.TeachersConfig",
     "adminpanel",
+    "search.apps.SearchConfig",
 
     # Django الأساسي
     "django.contrib.admin",
@@ -90,8 +91,11 @@ MIDDLEWARE = [
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
+    "core.middleware.LegacySessionBackendMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ProfileMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "cart.middleware.CartCookieMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -127,6 +131,10 @@ if DEBUG:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # IMMEDIATE: كل معاملة تحجز قفل الكتابة من بدايتها فتنتظر بدل فشل "database is locked"
+            "OPTIONS": {"timeout": env_int("DB_SQLITE_TIMEOUT", 20), "transaction_mode": "IMMEDIATE"},
+            # قاعدة اختبار على ملف (لا ذاكرة مشتركة) حتى تنتظر الكتابات المتزامنة في اختبارات الخيوط
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 else:
@@ -143,6 +151,29 @@ else:
         }
     }
 
+# =========================
+#            الكاش
+# =========================
+# الملخصات وبيانات الحزم تُبطل من عمليات أخرى (عمّال gunicorn، process_outbox،
+# expire_enrollments، aggregate_progress) فيلزم كاش مشترك بين العمليات:
+# Redis إن ضُبط REDIS_URL، وإلا جدول في قاعدة البيانات (يُنشئه migrate: teachers/migrations/0011).
+REDIS_URL = env_str("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": env_str("CACHE_KEY_PREFIX", "store"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": env_str("CACHE_TABLE", "django_cache"),
+        }
+    }
+
 # =========================
 #     اللغة والتوقيت
 # =========================
@@ -161,11 +192,17 @@ STATICFILES_DIRS = [BASE_DIR / "static"] if (BASE_DIR / "static").exists() else
 if DEBUG:
     STORAGES = {
         "default": {"BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage"},
+        "course_media": {"BACKEND": "teachers.storage.PrivateCloudinaryStorage"},
+        # ملفات المقررات المرفوعة قبل course_media (عامة) حتى ينقلها move_legacy_media
+        "course_media_legacy": {"BACKEND": "teachers.storage.LegacyCloudinaryStorage"},
         "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
     }
 else:
     STORAGES = {
         "default": {"BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage"},
+        "course_media": {"BACKEND": "teachers.storage.PrivateCloudinaryStorage"},
+        # ملفات المقررات المرفوعة قبل course_media (عامة) حتى ينقلها move_legacy_media
+        "course_media_legacy": {"BACKEND": "teachers.storage.LegacyCloudinaryStorage"},
         "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
     }
 
@@ -195,6 +232,13 @@ DEFAULT_FROM_EMAIL = env_str("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER or "noreply@e
 # =========================
 AUTH_USER_MODEL = "core.CustomUser"
 
+# الخلفية تجلب ملف الطالب/المعلّم مع المستخدم في استعلام واحد (يقرؤه request.profile دون استعلام إضافي).
+# خلفية واحدة: كل دخول فاشل يشغّل مُجزّئ كلمة المرور مرة واحدة فقط
+# (جلسات ModelBackend القديمة تُنقل في core.middleware.LegacySessionBackendMiddleware)
+AUTHENTICATION_BACKENDS = [
+    "core.backends.ProfileModelBackend",
+]
+
 # =========================
 #  سياسة كلمات المرور
 # =========================
@@ -231,6 +275,28 @@ LOGOUT_REDIRECT_URL = env_str("LOGOUT_REDIRECT_URL", "/")
 # =========================
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# حجم صفحة المنتجات (ترقيم بالمؤشّر)
+STORE_PAGE_SIZE = env_int("STORE_PAGE_SIZE", 24)
+
+# نسبة الضريبة بنقاط الأساس (1500 = 15%)
+STORE_TAX_RATE_BP = env_int("STORE_TAX_RATE_BP", 1500)
+
+# مفاتيح عدم التكرار للدفع والويبهوك
+IDEMPOTENCY_TTL_SECONDS = env_int("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60)
+IDEMPOTENCY_WAIT_SECONDS = env_int("IDEMPOTENCY_WAIT_SECONDS", 5)
+
+# مدة بقاء ملخص لوحة الطالب في الكاش (يُبطل عند أي تغيير قبلها)
+STUDENT_SUMMARY_TTL_SECONDS = env_int("STUDENT_SUMMARY_TTL_SECONDS", 15 * 60)
+
+# مدة بقاء ملخص لوحة المعلّم في الكاش (يُبطل عند أي تغيير قبلها)
+TEACHER_DASHBOARD_TTL_SECONDS = env_int("TEACHER_DASHBOARD_TTL_SECONDS", 15 * 60)
+
+# مدة بقاء بيان حزمة ملفات المقرر (ZIP) في الكاش (يُبطل عند أي تغيير قبلها)
+COURSE_BUNDLE_TTL_SECONDS = env_int("COURSE_BUNDLE_TTL_SECONDS", 60 * 60)
+
+# عمليات توليد نسخ صور المنتجات (Pillow)؛ 0 يولّدها بعد المعاملة في نفس العملية
+PRODUCT_IMAGE_WORKERS = env_int("PRODUCT_IMAGE_WORKERS", 2)
+
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
@@ -241,6 +307,24 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 FILE_UPLOAD_MAX_MEMORY_SIZE = env_int("FILE_UPLOAD_MAX_MEMORY_SIZE", 25 * 1024 * 1024)
 DATA_UPLOAD_MAX_MEMORY_SIZE = env_int("DATA_UPLOAD_MAX_MEMORY_SIZE", 50 * 1024 * 1024)
 
+# الرفع القابل للاستئناف: مجلد الأجزاء المؤقت والحد الأقصى لحجم الجزء الواحد
+RESUMABLE_UPLOAD_DIR = Path(env_str("RESUMABLE_UPLOAD_DIR", str(BASE_DIR / "tmp" / "uploads")))
+RESUMABLE_MAX_CHUNK_MB = env_int("RESUMABLE_MAX_CHUNK_MB", 16)
+
+# ملفات المحاضرات والمراجع تُحفظ محليًا أولًا ثم تُدفع للتخزين الافتراضي في الخلفية
+# (MEDIA_PUSH_WORKERS=0 يدفعها بعد المعاملة في نفس الخيط)
+MEDIA_STAGING = env_bool("MEDIA_STAGING", True)
+MEDIA_STAGING_DIR = Path(env_str("MEDIA_STAGING_DIR", str(BASE_DIR / "tmp" / "staged")))
+MEDIA_PUSH_WORKERS = env_int("MEDIA_PUSH_WORKERS", 2)
+
+# تسليم ملفات المقررات المحمية: "" (من العملية عبر sendfile)، "nginx" (X-Accel-Redirect
+# إلى MEDIA_ACCEL_PREFIX/media|staged/...)، "apache" (X-Sendfile)
+MEDIA_ACCEL = env_str("MEDIA_ACCEL", "")
+MEDIA_ACCEL_PREFIX = env_str("MEDIA_ACCEL_PREFIX", "/protected/")
+
+# صلاحية رابط التنزيل الموقّع لملفات المقررات على Cloudinary (ثوانٍ)
+MEDIA_SIGNED_URL_TTL = env_int("MEDIA_SIGNED_URL_TTL", 300)
+
 # =========================
 #  إعدادات أمان في الإنتاج
 # =========================
@@ -28,6 +28,9 @@ urlpatterns = [
     path("orders/", include("orders.urls")),
     path("cart/", include("cart.urls")),
 
+    # البحث
+    path("search/", include("search.urls")),
+
     # الطالب
     path("student/", include(("students.urls", "students"), namespace="students")),
 
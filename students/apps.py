@@ -3,3 +3,4 @@ class StudentsConfig(AppConfig):
     name = "students"
     def ready(self):
         import students.signals  # noqa
+        import students.progress  # noqa  (تفريغ مخزن إتمام المحاضرات بعد كل طلب)
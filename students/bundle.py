@@ -0,0 +1,158 @@
+# students/bundle.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import zipfile
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# نسخة شكل البيان: تُرفع عند تغيير محتواه فتُهمل المفاتيح القديمة تلقائيًا
+BUNDLE_VERSION = 1
+
+DEFAULT_TTL_SECONDS = 60 * 60
+READ_CHUNK = 64 * 1024
+
+# مجلد داخل الأرشيف ← (النموذج، حقل الملف). الفيديو مستبعد: يُشاهَد عبر lesson_media
+SOURCES = {
+    "slides": ("teachers.Lesson", "slide_file"),
+    "materials": ("teachers.Resource", "file"),
+    "resources": ("students.Resource", "file"),
+}
+
+# صيغ مضغوطة أصلًا: تُخزَّن كما هي بدل إعادة ضغطها
+STORED_EXTS = {
+    "pdf", "zip", "docx", "pptx", "pptm", "xlsx",
+    "mp4", "mov", "mkv", "webm", "jpg", "jpeg", "png", "webp", "gif",
+}
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "COURSE_BUNDLE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+
+
+def manifest_key(course_id: int) -> str:
+    return f"students:bundle:v{BUNDLE_VERSION}:{course_id}"
+
+
+def _storage(source: str):
+    label, field_name = SOURCES[source]
+    return apps.get_model(label)._meta.get_field(field_name).storage
+
+
+# =========================
+#         البيان
+# =========================
+def _build(course_id: int) -> dict:
+    """قائمة الملفات بأسمائها داخل الأرشيف وأحجامها، وETag مشتق منها."""
+    entries, used = [], set()
+    for source, (label, field_name) in SOURCES.items():
+        model = apps.get_model(label)
+        rows = (
+            model.objects.filter(course_id=course_id)
+            .exclude(**{field_name: ""}).exclude(**{f"{field_name}__isnull": True})
+            .order_by("pk").values_list(field_name, flat=True)
+        )
+        storage = _storage(source)
+        for name in rows:
+            arcname = f"{source}/{os.path.basename(name)}"
+            stem, ext = os.path.splitext(arcname)
+            n = 1
+            while arcname in used:
+                n += 1
+                arcname = f"{stem} ({n}){ext}"
+            used.add(arcname)
+            try:
+                size = storage.size(name)
+            except (OSError, NotImplementedError):
+                logger.warning("bundle: missing %s for course %s", name, course_id)
+                continue
+            entries.append([arcname, source, name, size])
+
+    # تاريخ ثابت لكل نسخة يدخل في ETag: نفس ETag ⇐ نفس البايتات
+    date_time = list(timezone.localtime().timetuple()[:6])
+    digest = hashlib.sha256(json.dumps([entries, date_time], ensure_ascii=False).encode()).hexdigest()
+    return {"entries": entries, "date_time": date_time, "etag": f'"{digest[:32]}"'}
+
+
+def get_manifest(course_id: int) -> dict:
+    """بيان حزمة المقرر: قراءة كاش واحدة عند الإصابة، وإلا يُبنى ويُخزَّن."""
+    key = manifest_key(course_id)
+    manifest = cache.get(key)
+    if manifest is None:
+        manifest = _build(course_id)
+        cache.set(key, manifest, _ttl())
+    return manifest
+
+
+def invalidate_bundles(course_ids) -> None:
+    """يحذف بيانات المقررات المعنية بعد نجاح المعاملة."""
+    keys = [manifest_key(int(pk)) for pk in set(course_ids) if pk]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# =========================
+#       البث كـ ZIP
+# =========================
+class _Sink:
+    """
+    مخرج غير قابل للتنقّل: zipfile يكتب فيه بترويسات وصف البيانات (data descriptor)
+    فلا يحتاج الرجوع لتعديل ترويسة سابقة؛ ما يُكتب يُسحب ويُرسل فورًا.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_bundle(manifest: dict):
+    """
+    مولّد بايتات الأرشيف: كل ملف يُقرأ من تخزينه على أجزاء ويُكتب للأرشيف ثم يُرسل،
+    بلا ملف مؤقت ولا أرشيف كامل في الذاكرة (أقصى ما يُحتجز جزء واحد).
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for arcname, source, name, size in manifest["entries"]:
+            info = zipfile.ZipInfo(arcname, date_time=tuple(manifest["date_time"]))
+            ext = arcname.rsplit(".", 1)[-1].lower() if "." in arcname else ""
+            info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTS else zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            info.file_size = size
+            try:
+                src = _storage(source).open(name, "rb")
+            except OSError:
+                logger.warning("bundle: cannot open %s", name)
+                continue
+            with src, zf.open(info, "w") as dst:
+                for chunk in src.chunks(READ_CHUNK):
+                    dst.write(chunk)
+                    yield from _pending(sink)
+            yield from _pending(sink)
+    # الفهرس المركزي يُكتب عند الإغلاق
+    yield from _pending(sink)
+
+
+def _pending(sink: _Sink):
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from students.progress import aggregate_pending
+
+
+class Command(BaseCommand):
+    help = "تجميع إتمامات المحاضرات الجديدة في Enrollment.progress على دفعات (يُشغَّل دوريًا عبر cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        total = aggregate_pending(batch_size=max(1, opts["batch_size"]))
+        self.stdout.write(self.style.SUCCESS(f"تم تحديث تقدّم {total} تسجيل."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from students.models import Enrollment
+
+
+class Command(BaseCommand):
+    help = "نقل التسجيلات النشطة المنتهية (ends_at مضى) إلى expired على دفعات (يُشغَّل دوريًا عبر cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        total = Enrollment.objects.expire_lapsed(batch_size=max(1, opts["batch_size"]))
+        self.stdout.write(self.style.SUCCESS(f"تم إنهاء {total} تسجيل."))
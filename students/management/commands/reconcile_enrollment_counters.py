@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from students.models import Course
+
+
+class Command(BaseCommand):
+    help = "تصحيح عدّادات التسجيل المخزّنة (الكل والنشط) لكل المقررات على دفعات حسب id."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        batch = max(1, opts["batch_size"])
+        last_id, total = 0, 0
+        while True:
+            ids = list(
+                Course.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch]
+            )
+            if not ids:
+                break
+            total += Course.objects.filter(pk__in=ids).refresh_enrollment_counts()
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"تمت مطابقة عدّادات {total} مقرر."))
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0005_enrollment_status_ends_at_idx'),
+        ('teachers', '0006_alter_course_code_alter_resource_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('aggregated', models.BooleanField(default=False)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='students.enrollment')),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='teachers.lesson')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['aggregated', 'enrollment'], name='students_le_aggrega_e496de_idx')],
+                'constraints': [models.UniqueConstraint(fields=('enrollment', 'lesson'), name='uq_completion_enrollment_lesson')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model('students', 'Course')
+    Enrollment = apps.get_model('students', 'Enrollment')
+    rows = Enrollment.objects.filter(course_id=OuterRef('pk')).order_by().values('course_id')
+
+    def _count(qs):
+        return Coalesce(Subquery(qs.annotate(c=Count('id')).values('c')[:1], output_field=IntegerField()), 0)
+
+    Course.objects.update(
+        enrollments_total=_count(rows),
+        enrollments_active=_count(rows.filter(status='active')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_lesson_completion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrollments_active',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='enrollments_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:17
+
+import teachers.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0007_course_enrollment_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resource',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=teachers.storage.course_media_storage, upload_to='resources/files/'),
+        ),
+    ]
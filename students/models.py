@@ -5,11 +5,14 @@ from urllib.parse import urlparse
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import Q, CheckConstraint, UniqueConstraint
+from django.db import models, transaction
+from django.db.models import Q, CheckConstraint, Count, ExpressionWrapper, IntegerField, OuterRef, Subquery, UniqueConstraint
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.text import slugify
 
+from teachers.storage import course_media_storage, media_names
+
 # =========================
 #     متغير المستخدم
 # =========================
@@ -58,7 +61,30 @@ class Student(models.Model):
 # =========================
 #           الدورة
 # =========================
+class CourseQuerySet(models.QuerySet):
+    def refresh_enrollment_counts(self) -> int:
+        """
+        إعادة حساب عدّادَي التسجيل (الكل والنشط) من Enrollment بعبارة UPDATE واحدة
+        (استعلامات فرعية مترابطة) لكل المقررات في الـ QuerySet.
+        """
+        rows = Enrollment.objects.filter(course_id=OuterRef("pk")).order_by().values("course_id")
+
+        def _count(qs):
+            return Coalesce(
+                Subquery(qs.annotate(c=Count("id")).values("c")[:1], output_field=IntegerField()),
+                0,
+            )
+
+        return self.update(
+            enrollments_total=_count(rows),
+            enrollments_active=_count(rows.filter(status=Enrollment.STATUS_ACTIVE)),
+        )
+
+
 class Course(models.Model):
+    # عدّادات مخزّنة تُحدَّث بالفرق في نفس معاملة التسجيل (students.signals)
+    COUNTER_FIELDS = ("enrollments_total", "enrollments_active")
+
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, db_index=True, allow_unicode=True, blank=True)
 
@@ -71,6 +97,11 @@ class Course(models.Model):
     teams_link = models.URLField(blank=True, validators=[validate_https])
     cover_image_url = models.URLField(blank=True, validators=[validate_https])
 
+    enrollments_total = models.PositiveIntegerField(default=0, editable=False)
+    enrollments_active = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CourseQuerySet.as_manager()
+
     class Meta:
         ordering = ("title",)
         indexes = [
@@ -105,12 +136,136 @@ class Course(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug and self.title:
             self.slug = unique_slugify(self, self.title, slug_field_name="slug", max_length=64)
+        if not self._state.adding and not args and kwargs.get("update_fields") is None:
+            # لا نكتب عدّادات قد تكون قديمة في الذاكرة فوق القيم المحدَّثة بالفرق
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
 
 
 # =========================
 #      التسجيل في الدورة
 # =========================
+def _active_now_q(now=None) -> Q:
+    """شرط «نشط الآن» في SQL: الحالة active ونافذتا التسجيل والدورة تشملان اللحظة."""
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    return (
+        Q(status=Enrollment.STATUS_ACTIVE)
+        & (Q(starts_at__isnull=True) | Q(starts_at__lte=now))
+        & (Q(ends_at__isnull=True) | Q(ends_at__gte=now))
+        & (Q(course__start_date__isnull=True) | Q(course__start_date__lte=today))
+        & (Q(course__end_date__isnull=True) | Q(course__end_date__gte=today))
+    )
+
+
+class EnrollmentQuerySet(models.QuerySet):
+    def active_now(self, now=None):
+        """التسجيلات السارية الآن فقط (بديل is_within_window صفًّا صفًّا في بايثون)."""
+        return self.filter(_active_now_q(now))
+
+    def with_active_now(self, now=None):
+        """يضيف is_active_now محسوبًا في قاعدة البيانات دون استبعاد أي صف."""
+        return self.annotate(
+            is_active_now=ExpressionWrapper(_active_now_q(now), output_field=models.BooleanField())
+        )
+
+    def expire_lapsed(self, now=None, batch_size: int = 1000) -> int:
+        """
+        نقل التسجيلات النشطة التي انتهت ends_at إلى expired بتحديثات UPDATE على دفعات
+        (فهرس status, ends_at). تعيد عدّ مقرراتها وتُبطل ملخصات الطلاب. تُرجع عدد الصفوف.
+        """
+        from .summary import invalidate_students
+
+        now = now or timezone.now()
+        total = 0
+        while True:
+            rows = list(
+                self.filter(status=self.model.STATUS_ACTIVE, ends_at__lt=now)
+                .order_by()
+                .values_list("pk", "student_id", "course_id")[:batch_size]
+            )
+            if not rows:
+                return total
+            with transaction.atomic():
+                total += self.filter(
+                    pk__in=[pk for pk, _, _ in rows], status=self.model.STATUS_ACTIVE,
+                ).update(status=self.model.STATUS_EXPIRED)
+                Course.objects.filter(pk__in={c for _, _, c in rows}).refresh_enrollment_counts()
+                invalidate_students(s for _, s, _ in rows)
+
+    def activate_bulk(self, pairs) -> int:
+        """
+        تفعيل تسجيلات (student_id, course_id) دفعة واحدة بدون get_or_create لكل زوج:
+        - bulk_create(ignore_conflicts) للأزواج غير الموجودة.
+        - bulk_update واحد لتثبيت starts_at/ends_at/status للبقية.
+        الدورات غير الموجودة تُتجاهل. العملية idempotent. تُرجع عدد التسجيلات المفعّلة.
+        يُبطل ملخص لوحة كل طالب ومعلّم معني (students.summary, teachers.summary).
+        """
+        pairs = {(int(s), int(c)) for s, c in pairs if s and c}
+        if not pairs:
+            return 0
+
+        durations = dict(
+            Course.objects
+            .filter(pk__in={c for _, c in pairs})
+            .values_list("pk", "duration_days")
+        )
+        pairs = {(s, c) for s, c in pairs if c in durations}
+        if not pairs:
+            return 0
+
+        now = timezone.now()
+
+        def _window(course_id):
+            return now + timedelta(days=durations[course_id] or 30)
+
+        self.bulk_create(
+            [
+                self.model(
+                    student_id=s, course_id=c,
+                    status=self.model.STATUS_ACTIVE,
+                    starts_at=now, ends_at=_window(c),
+                )
+                for s, c in pairs
+            ],
+            ignore_conflicts=True,
+        )
+
+        rows = [
+            e for e in self.filter(
+                student_id__in={s for s, _ in pairs},
+                course_id__in={c for _, c in pairs},
+            )
+            if (e.student_id, e.course_id) in pairs
+        ]
+        stale = []
+        for e in rows:
+            lapsed = e.ends_at is not None and e.ends_at <= now
+            if e.status == self.model.STATUS_ACTIVE and e.starts_at and e.ends_at and not lapsed:
+                continue
+            if lapsed:
+                # شراء جديد لتسجيل منتهٍ: نافذة جديدة تبدأ الآن
+                e.starts_at, e.ends_at = now, _window(e.course_id)
+            else:
+                e.starts_at = e.starts_at or now
+                e.ends_at = e.ends_at or (e.starts_at + timedelta(days=durations[e.course_id] or 30))
+            e.status = self.model.STATUS_ACTIVE
+            stale.append(e)
+        if stale:
+            self.bulk_update(stale, ["starts_at", "ends_at", "status"])
+
+        # bulk_create/bulk_update لا تُطلق post_save: نعيد العدّ ونُبطل الملخصات يدويًا
+        from .summary import invalidate_students
+        from teachers.summary import invalidate_courses
+        Course.objects.filter(pk__in={c for _, c in pairs}).refresh_enrollment_counts()
+        invalidate_students(s for s, _ in pairs)
+        invalidate_courses(c for _, c in pairs)
+        return len(rows)
+
+
 class Enrollment(models.Model):
     STATUS_ACTIVE = "active"
     STATUS_PENDING = "pending"
@@ -135,6 +290,8 @@ class Enrollment(models.Model):
 
     teams_link = models.URLField(blank=True, validators=[validate_https])
 
+    objects = EnrollmentQuerySet.as_manager()
+
     class Meta:
         constraints = [
             UniqueConstraint(fields=["student", "course"], name="uq_enrollment_student_course"),
@@ -145,6 +302,7 @@ class Enrollment(models.Model):
             models.Index(fields=["course"]),
             models.Index(fields=["status"]),
             models.Index(fields=["joined_at"]),
+            models.Index(fields=["status", "ends_at"]),
         ]
         ordering = ("-joined_at",)
 
@@ -164,6 +322,19 @@ class Enrollment(models.Model):
             return False
         return True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # نحفظ الحالة والمقرر كما قُرئا لتعرف إشارات العدّادات ما تغيّر عند الحفظ/الحذف
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get("status")
+        instance._loaded_course_id = instance.__dict__.get("course_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        # الحفظ وتحديث عدّادات المقرر (post_save) في معاملة واحدة
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def activate_with_defaults(self) -> None:
         if not self.starts_at:
             self.starts_at = timezone.now()
@@ -174,6 +345,31 @@ class Enrollment(models.Model):
             self.status = self.STATUS_ACTIVE
 
 
+# =========================
+#       إتمام المحاضرات
+# =========================
+class LessonCompletion(models.Model):
+    """
+    سجل إتمام محاضرة (إضافة فقط). يُكتب عبر students.progress.record_completion،
+    ويُجمَّع لاحقًا في Enrollment.progress؛ aggregated=False يعني أنه لم يُحتسب بعد.
+    """
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name="completions")
+    lesson = models.ForeignKey("teachers.Lesson", on_delete=models.CASCADE, related_name="completions")
+    completed_at = models.DateTimeField(default=timezone.now)
+    aggregated = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["enrollment", "lesson"], name="uq_completion_enrollment_lesson"),
+        ]
+        indexes = [
+            models.Index(fields=["aggregated", "enrollment"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.enrollment_id} ✓ {self.lesson_id}"
+
+
 # =========================
 #          الاختبارات
 # =========================
@@ -253,7 +449,8 @@ class Resource(models.Model):
     title = models.CharField(max_length=200)
     kind = models.CharField(max_length=10, choices=KINDS, default=KIND_FILE)
 
-    file = models.FileField(upload_to="resources/files/", blank=True, null=True)
+    # نفس تخزين ملفات المعلّم: كتل خاصة برابط تنزيل موقّع (core.media.serve_file) لا رابط عام
+    file = models.FileField(upload_to="resources/files/", storage=course_media_storage, blank=True, null=True)
     external_link = models.URLField(blank=True, validators=[validate_https])
     note = models.TextField(blank=True)
 
@@ -269,3 +466,10 @@ class Resource(models.Model):
 
     def __str__(self) -> str:
         return f"{self.title} ({self.course})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # كما في teachers.Resource: الاسم المقروء لحساب فروق مراجع MediaBlob
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_media = media_names(instance)
+        return instance
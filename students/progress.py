@@ -0,0 +1,96 @@
+# students/progress.py
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+# =========================
+#      تسجيل الإتمام
+# =========================
+def record_completion(enrollment_id: int, lesson_id: int) -> None:
+    """
+    تسجيل إتمام محاضرة: إدراج واحد في LessonCompletion (INSERT ... ON CONFLICT DO NOTHING)
+    بلا قراءة مسبقة ولا إعادة حساب. السجل دائم منذ لحظة الإدراج، وaggregate_pending
+    يحتسبه في Enrollment.progress لاحقًا؛ تكرار الزيارة لا يضيف صفًّا ولا يعيد التجميع.
+    """
+    from .models import LessonCompletion
+
+    LessonCompletion.objects.bulk_create(
+        [LessonCompletion(enrollment_id=enrollment_id, lesson_id=lesson_id)],
+        ignore_conflicts=True,
+    )
+
+
+# =========================
+#   التجميع في progress
+# =========================
+def aggregate_pending(batch_size: int = 500) -> int:
+    """
+    يعيد حساب Enrollment.progress للتسجيلات ذات إتمامات غير مُحتسبة، على دفعات.
+    كل دفعة: استعلام مجمَّع واحد (عدد المُتمَّ / عدد محاضرات الدورة) ثم bulk_update.
+    تُرجع عدد التسجيلات المحدَّثة.
+    """
+    from .models import Enrollment, LessonCompletion
+    from .summary import invalidate_students
+    from teachers.models import Lesson
+
+    done_sq = (
+        LessonCompletion.objects
+        .filter(enrollment_id=OuterRef("pk"), lesson__course_id=OuterRef("course_id"))
+        .order_by()
+        .values("enrollment_id")
+        .annotate(c=Count("lesson_id", distinct=True))
+        .values("c")[:1]
+    )
+    total_sq = (
+        Lesson.objects
+        .filter(course_id=OuterRef("course_id"))
+        .order_by()
+        .values("course_id")
+        .annotate(c=Count("id"))
+        .values("c")[:1]
+    )
+
+    total = 0
+    while True:
+        pending = LessonCompletion.objects.filter(aggregated=False)
+        # حدّ أعلى ثابت: ما يصل بعده يُحتسب في الجولة التالية ولا يُعلَّم خطأً
+        high_water = pending.order_by("-pk").values_list("pk", flat=True).first()
+        if high_water is None:
+            return total
+        ids = list(
+            pending.filter(pk__lte=high_water)
+            .order_by("enrollment_id")
+            .values_list("enrollment_id", flat=True)
+            .distinct()[:batch_size]
+        )
+
+        with transaction.atomic():
+            rows = list(
+                Enrollment.objects
+                .filter(pk__in=ids)
+                .only("pk", "student_id", "course_id", "progress")
+                .annotate(
+                    done=Coalesce(Subquery(done_sq, output_field=IntegerField()), Value(0)),
+                    lessons=Coalesce(Subquery(total_sq, output_field=IntegerField()), Value(0)),
+                )
+            )
+            changed = []
+            for e in rows:
+                value = Decimal(0)
+                if e.lessons:
+                    value = (Decimal(100) * min(e.done, e.lessons) / e.lessons).quantize(Decimal("0.01"))
+                if value != e.progress:
+                    e.progress = value
+                    changed.append(e)
+            if changed:
+                Enrollment.objects.bulk_update(changed, ["progress"])
+                invalidate_students(e.student_id for e in changed)
+            LessonCompletion.objects.filter(
+                enrollment_id__in=ids, aggregated=False, pk__lte=high_water,
+            ).update(aggregated=True)
+        total += len(changed)
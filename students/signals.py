@@ -1,25 +1,143 @@
 # students/signals.py
-from django.db.models.signals import post_save
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Student
+from teachers.models import Lesson, Resource as TeacherResource
+from .bundle import invalidate_bundles
+from .models import Certificate, Course, Enrollment, Exam, ExamResult, Resource, Student
+from .summary import invalidate_students, students_for_course
 
 User = get_user_model()
 
 @receiver(post_save, sender=User)
-def ensure_student_profile(sender, instance, created, **kwargs):
+def ensure_student_profile(sender, instance, created, update_fields=None, raw=False, **kwargs):
     """
     ينشئ سجل Student تلقائياً للمستخدمين بدور 'student'.
     - عند الإنشاء لأول مرة.
     - وأيضاً إذا تغير الدور لاحقاً إلى 'student' ولا يوجد سجل Student.
-    يستعمل get_or_create لتجنب التكرار.
+    الحفظات التي لا تغيّر الدور (مثل تحديث last_login عند كل دخول) لا تلمس قاعدة البيانات.
     """
-    is_student = getattr(instance, "role", None) == "student"
+    if raw:
+        return
+    if update_fields is not None and "role" not in update_fields:
+        return
 
-    if created and is_student:
-        Student.objects.get_or_create(user=instance)
+    role = getattr(instance, "role", None)
+    if not created and getattr(instance, "_loaded_role", None) == role:
         return
+    instance._loaded_role = role
 
-    # في حفظات لاحقة: لو صار الدور طالب ولا يوجد سجل
-    if not created and is_student:
+    if role == "student":
         Student.objects.get_or_create(user=instance)
+
+
+# =========================
+#   إبطال ملخص لوحة الطالب
+# =========================
+@receiver(post_save, sender=Enrollment, dispatch_uid="summary_enrollment_save")
+@receiver(post_delete, sender=Enrollment, dispatch_uid="summary_enrollment_delete")
+@receiver(post_save, sender=ExamResult, dispatch_uid="summary_examresult_save")
+@receiver(post_delete, sender=ExamResult, dispatch_uid="summary_examresult_delete")
+@receiver(post_save, sender=Certificate, dispatch_uid="summary_certificate_save")
+@receiver(post_delete, sender=Certificate, dispatch_uid="summary_certificate_delete")
+def _invalidate_owner(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_students([instance.student_id])
+
+
+@receiver(post_save, sender=Course, dispatch_uid="summary_course_save")
+def _invalidate_course(sender, instance, created=False, raw=False, **kwargs):
+    # الحذف يمرّ بحذف التسجيلات المتتالي فيُبطل عبر _invalidate_owner
+    if raw or created:
+        return
+    invalidate_students(students_for_course(instance.pk))
+
+
+@receiver(post_save, sender=Exam, dispatch_uid="summary_exam_save")
+def _invalidate_exam(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    invalidate_students(instance.results.values_list("student_id", flat=True))
+
+
+@receiver(pre_save, sender=Resource, dispatch_uid="summary_resource_pre_save")
+def _remember_resource_course(sender, instance, raw=False, **kwargs):
+    # نقل المورد لمقرر آخر يجب أن يُبطل طلاب المقرر السابق أيضًا
+    if raw or not instance.pk:
+        return
+    instance._previous_course_id = (
+        Resource.objects.filter(pk=instance.pk).values_list("course_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Resource, dispatch_uid="summary_resource_save")
+@receiver(post_delete, sender=Resource, dispatch_uid="summary_resource_delete")
+def _invalidate_resource(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    course_ids = {instance.course_id, getattr(instance, "_previous_course_id", None)} - {None}
+    if not course_ids:
+        return
+    invalidate_students(
+        Enrollment.objects.filter(course_id__in=course_ids).values_list("student_id", flat=True)
+    )
+
+
+# =========================
+#   عدّادات تسجيل المقرر
+# =========================
+def _bump(course_id, total: int = 0, active: int = 0) -> None:
+    """تعديل العدّادين بالفرق (UPDATE ذرّي بـ F، لا ينزل تحت الصفر)."""
+    changes = {}
+    if total:
+        changes["enrollments_total"] = Greatest(F("enrollments_total") + total, Value(0))
+    if active:
+        changes["enrollments_active"] = Greatest(F("enrollments_active") + active, Value(0))
+    if course_id and changes:
+        Course.objects.filter(pk=course_id).update(**changes)
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid="counters_enrollment_save")
+def _count_enrollment_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    is_active = int(instance.status == Enrollment.STATUS_ACTIVE)
+    if created:
+        _bump(instance.course_id, total=1, active=is_active)
+    else:
+        old_course = getattr(instance, "_loaded_course_id", instance.course_id)
+        was_active = int(getattr(instance, "_loaded_status", instance.status) == Enrollment.STATUS_ACTIVE)
+        if old_course != instance.course_id:
+            _bump(old_course, total=-1, active=-was_active)
+            _bump(instance.course_id, total=1, active=is_active)
+        elif was_active != is_active:
+            _bump(instance.course_id, active=is_active - was_active)
+    instance._loaded_status = instance.status
+    instance._loaded_course_id = instance.course_id
+
+
+@receiver(post_delete, sender=Enrollment, dispatch_uid="counters_enrollment_delete")
+def _count_enrollment_delete(sender, instance, origin=None, **kwargs):
+    # عند حذف المقرر نفسه (حذف متسلسل) لا داعي لتعديل عدّاداته
+    if isinstance(origin, Course) or getattr(origin, "model", None) is Course:
+        return
+    status = getattr(instance, "_loaded_status", instance.status)
+    _bump(instance.course_id, total=-1, active=-int(status == Enrollment.STATUS_ACTIVE))
+
+
+# =========================
+#   إبطال بيان حزمة المقرر
+# =========================
+@receiver(post_save, sender=Resource, dispatch_uid="bundle_resource_save")
+@receiver(post_delete, sender=Resource, dispatch_uid="bundle_resource_delete")
+@receiver(post_save, sender=TeacherResource, dispatch_uid="bundle_teacher_resource_save")
+@receiver(post_delete, sender=TeacherResource, dispatch_uid="bundle_teacher_resource_delete")
+@receiver(post_save, sender=Lesson, dispatch_uid="bundle_lesson_save")
+@receiver(post_delete, sender=Lesson, dispatch_uid="bundle_lesson_delete")
+def _invalidate_bundle(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_bundles([instance.course_id, getattr(instance, "_previous_course_id", None)])
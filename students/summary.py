@@ -0,0 +1,105 @@
+# students/summary.py
+from __future__ import annotations
+
+import math
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+# نسخة شكل الحمولة: تُرفع عند تغيير محتواها فتُهمل المفاتيح القديمة تلقائيًا
+SUMMARY_VERSION = 2
+
+DEFAULT_TTL_SECONDS = 15 * 60
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "STUDENT_SUMMARY_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+
+
+def summary_key(student_id: int) -> str:
+    return f"students:summary:v{SUMMARY_VERSION}:{student_id}"
+
+
+def _window_ttl(enrollments, now=None) -> int:
+    """
+    مدة الكاش حتى أقرب حد نافذة قادم بين تسجيلات الطالب النشطة (starts_at/ends_at
+    وتاريخا بداية/نهاية الدورة): is_active_now وactive_enrollments والموارد المحسوبة
+    عند البناء لا تبقى بعد أن يتغيّر سريانها. الحد الأعلى STUDENT_SUMMARY_TTL_SECONDS.
+    """
+    now = now or timezone.now()
+    edges = []
+    for e in enrollments:
+        if e.status != e.STATUS_ACTIVE:
+            continue
+        edges += [e.starts_at, e.ends_at]
+        course = e.course
+        if course.start_date:
+            edges.append(timezone.make_aware(datetime.combine(course.start_date, time.min)))
+        if course.end_date:
+            # end_date شامل: التسجيل يسري حتى نهاية ذلك اليوم
+            edges.append(timezone.make_aware(datetime.combine(course.end_date + timedelta(days=1), time.min)))
+    ttl = _ttl()
+    for edge in edges:
+        if edge and edge > now:
+            ttl = min(ttl, math.ceil((edge - now).total_seconds()) + 1)
+    return max(1, ttl)
+
+
+def _build(student) -> dict:
+    """الحمولة كاملة بقوائم مُقيَّمة (كائنات مع علاقاتها) لتُخزَّن كما هي في الكاش."""
+    from .models import Certificate, Enrollment, ExamResult, Resource
+
+    mine = Enrollment.objects.filter(student_id=student.pk).select_related("course")
+    enrollments = list(mine.with_active_now())
+    active_enrollments = list(mine.active_now())
+    # موارد المقررات السارية فقط؛ التسجيلات المنتهية لا تفتح المراجع
+    course_ids = {e.course_id for e in active_enrollments}
+    resources = list(
+        Resource.objects.filter(course_id__in=course_ids).select_related("course")
+    ) if course_ids else []
+    certs = list(Certificate.objects.filter(student_id=student.pk).select_related("course"))
+    exams = list(
+        ExamResult.objects.filter(student_id=student.pk).select_related("exam", "exam__course")
+    )
+    return {
+        "enrollments": enrollments,
+        "active_enrollments": active_enrollments,
+        "resources": resources,
+        "certs": certs,
+        "exams": exams,
+    }
+
+
+def get_summary(student) -> dict:
+    """
+    ملخص لوحة الطالب: قراءة كاش واحدة عند الإصابة، وإلا يُبنى ويُخزَّن.
+    المفاتيح: enrollments (كلها مع is_active_now), active_enrollments, resources, certs, exams.
+    """
+    key = summary_key(student.pk)
+    payload = cache.get(key)
+    if payload is None:
+        payload = _build(student)
+        cache.set(key, payload, _window_ttl(payload["enrollments"]))
+    return payload
+
+
+def invalidate_students(student_ids) -> None:
+    """يحذف ملخصات الطلاب المعنيين بعد نجاح المعاملة (لا نُبطل لتغيير قد يُلغى)."""
+    keys = [summary_key(int(pk)) for pk in set(student_ids) if pk]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def students_for_course(course_id) -> set[int]:
+    """كل من يظهر المقرر في ملخصه: مسجَّل فيه، أو له شهادة فيه، أو نتيجة امتحان من امتحاناته."""
+    from .models import Certificate, Enrollment, ExamResult
+
+    if not course_id:
+        return set()
+    ids = set(Enrollment.objects.filter(course_id=course_id).values_list("student_id", flat=True))
+    ids.update(Certificate.objects.filter(course_id=course_id).values_list("student_id", flat=True))
+    ids.update(ExamResult.objects.filter(exam__course_id=course_id).values_list("student_id", flat=True))
+    return ids
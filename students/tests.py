@@ -1,3 +1,363 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import CustomUser
+from core.testing import LOCMEM_CACHE
+
+from teachers.models import Course as TeacherCourse, Lesson, Subject, TeacherProfile
+
+from teachers.models import MediaBlob, Resource as TeacherResource
+from teachers.storage import course_media_storage
+
+from .bundle import manifest_key
+from .models import Course, Enrollment, Exam, ExamResult, LessonCompletion, Resource
+from .progress import aggregate_pending, record_completion
+from .summary import get_summary, summary_key
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class StudentSummaryCacheTests(TestCase):
+    """ملخص لوحة الطالب: إصابة الكاش بلا استعلامات محتوى، وإبطال عند التغيير."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user("learner", password="pass-12345", role="student")
+        self.student = self.user.student_profile
+        self.course = Course.objects.create(title="رياضيات")
+        Enrollment.objects.create(student=self.student, course=self.course)
+
+    def test_warm_hit_runs_no_queries(self):
+        get_summary(self.student)
+        with self.assertNumQueries(0):
+            summary = get_summary(self.student)
+        self.assertEqual([e.course_id for e in summary["enrollments"]], [self.course.pk])
+
+    def test_writes_invalidate_after_commit(self):
+        get_summary(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            Resource.objects.create(course=self.course, title="ملخص")
+        self.assertIsNone(cache.get(summary_key(self.student.pk)))
+        self.assertEqual(len(get_summary(self.student)["resources"]), 1)
+
+        exam = Exam.objects.create(course=self.course, title="نهائي", date=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            ExamResult.objects.create(student=self.student, exam=exam, score="90")
+        self.assertEqual(len(get_summary(self.student)["exams"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = "رياضيات ١"
+            self.course.save()
+        self.assertEqual(get_summary(self.student)["enrollments"][0].course.title, "رياضيات ١")
+
+    def test_entry_expires_at_next_window_edge(self):
+        Enrollment.objects.filter(student=self.student).update(ends_at=timezone.now() + timedelta(seconds=60))
+        with mock.patch("students.summary.cache", wraps=cache) as spy:
+            get_summary(self.student)
+        self.assertLessEqual(spy.set.call_args.args[2], 61)
+
+        Enrollment.objects.filter(student=self.student).update(ends_at=None)
+        self.course.end_date = timezone.localdate()
+        self.course.save()
+        cache.clear()
+        with mock.patch("students.summary.cache", wraps=cache) as spy:
+            get_summary(self.student)
+        self.assertLessEqual(spy.set.call_args.args[2], 24 * 60 * 60 + 1)
+
+    def test_bulk_activation_invalidates(self):
+        other = Course.objects.create(title="فيزياء")
+        get_summary(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.activate_bulk([(self.student.pk, other.pk)])
+        self.assertEqual(len(get_summary(self.student)["enrollments"]), 2)
+
+
+class EnrollmentExpiryTests(TestCase):
+    """الكنس يُنهي التسجيلات المنتهية بتحديث جماعي، و active_now يطابق is_within_window."""
+
+    def setUp(self):
+        user = CustomUser.objects.create_user("sweeper", password="pass-12345", role="student")
+        self.student = user.student_profile
+        now = timezone.now()
+        self.live = Enrollment.objects.create(
+            student=self.student, course=Course.objects.create(title="حي"), ends_at=now + timedelta(days=3),
+        )
+        self.lapsed = Enrollment.objects.create(
+            student=self.student, course=Course.objects.create(title="منتهٍ"), ends_at=now - timedelta(days=1),
+        )
+
+    def test_active_now_filters_in_sql(self):
+        self.assertEqual(list(Enrollment.objects.active_now()), [self.live])
+        flags = dict(Enrollment.objects.with_active_now().values_list("pk", "is_active_now"))
+        self.assertEqual(flags, {self.live.pk: True, self.lapsed.pk: False})
+
+    def test_expire_lapsed_in_batches(self):
+        self.assertEqual(Enrollment.objects.expire_lapsed(batch_size=1), 1)
+        self.lapsed.refresh_from_db()
+        self.live.refresh_from_db()
+        self.assertEqual(self.lapsed.status, Enrollment.STATUS_EXPIRED)
+        self.assertEqual(self.live.status, Enrollment.STATUS_ACTIVE)
+        self.assertEqual(Enrollment.objects.expire_lapsed(), 0)
+
+
+class LessonProgressTests(TestCase):
+    """الإتمام يُدرج مباشرة (إدراج واحد بلا قراءة)، والتجميع يحدّث progress مرة لكل دفعة."""
+
+    def setUp(self):
+        teacher = CustomUser.objects.create_user("teacher", password="pass-12345", role="teacher")
+        taught = TeacherCourse.objects.create(
+            teacher=TeacherProfile.objects.create(user=teacher),
+            subject=Subject.objects.create(name="رياضيات", stage="ثانوي"),
+            title="جبر",
+        )
+        # Lesson يرتبط بدورة المعلّم و Enrollment بدورة الطالب؛ الربط بينهما بالمعرّف
+        course = Course.objects.create(pk=taught.pk, title="جبر", slug="algebra")
+        self.lessons = [Lesson.objects.create(course=taught, order=i, title=f"درس {i}") for i in (1, 2, 3, 4)]
+        self.user = CustomUser.objects.create_user("reader", password="pass-12345", role="student")
+        self.enrollment = Enrollment.objects.create(student=self.user.student_profile, course=course)
+
+    def test_record_is_buffered_then_aggregated(self):
+        with self.assertNumQueries(1):
+            record_completion(self.enrollment.pk, self.lessons[0].pk)
+        record_completion(self.enrollment.pk, self.lessons[0].pk)
+        record_completion(self.enrollment.pk, self.lessons[1].pk)
+        self.assertEqual(LessonCompletion.objects.count(), 2)
+
+        self.assertEqual(aggregate_pending(), 1)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(str(self.enrollment.progress), "50.00")
+        self.assertFalse(LessonCompletion.objects.filter(aggregated=False).exists())
+        self.assertEqual(aggregate_pending(), 0)
+
+        # زيارة محاضرة محتسبة لا تعيد فتح التجميع
+        record_completion(self.enrollment.pk, self.lessons[0].pk)
+        self.assertFalse(LessonCompletion.objects.filter(aggregated=False).exists())
+
+    def test_lesson_page_requires_active_enrollment(self):
+        self.client.force_login(self.user)
+        url = reverse("students:lesson_detail", args=["algebra", self.lessons[0].pk])
+        with mock.patch("students.views.record_completion") as record:
+            self.assertEqual(self.client.get(url).status_code, 200)
+            record.assert_called_once_with(self.enrollment.pk, self.lessons[0].pk)
+
+            # تسجيل منتهٍ (بالحالة أو بالنافذة) لا يفتح المحاضرة ولا يُحتسب له إتمام
+            record.reset_mock()
+            for changes in (
+                {"status": Enrollment.STATUS_EXPIRED},
+                {"status": Enrollment.STATUS_ACTIVE, "ends_at": timezone.now() - timedelta(days=1)},
+            ):
+                Enrollment.objects.filter(pk=self.enrollment.pk).update(**changes)
+                self.assertEqual(self.client.get(url).status_code, 404)
+            record.assert_not_called()
+
+
+class EnrollmentCounterTests(TestCase):
+    """عدّادات المقرر تتبع الإنشاء والحذف وتغيير الحالة، والمطابقة تصلح الانحراف."""
+
+    def setUp(self):
+        self.course = Course.objects.create(title="كيمياء")
+        self.students = [
+            CustomUser.objects.create_user(f"c{i}", password="pass-12345", role="student").student_profile
+            for i in range(3)
+        ]
+
+    def _counts(self):
+        self.course.refresh_from_db()
+        return self.course.enrollments_total, self.course.enrollments_active
+
+    def test_counters_follow_changes(self):
+        enrollments = [Enrollment.objects.create(student=s, course=self.course) for s in self.students]
+        self.assertEqual(self._counts(), (3, 3))
+
+        enrollments[0].status = Enrollment.STATUS_EXPIRED
+        enrollments[0].save()
+        self.assertEqual(self._counts(), (3, 2))
+
+        Enrollment.objects.get(pk=enrollments[0].pk).delete()
+        enrollments[1].delete()
+        self.assertEqual(self._counts(), (1, 1))
+
+        # حفظ المقرر بنسخة قديمة في الذاكرة لا يكتب فوق العدّادات
+        stale = Course.objects.get(pk=self.course.pk)
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        stale.title = "كيمياء عضوية"
+        stale.save()
+        self.assertEqual(self._counts(), (2, 2))
+
+    def test_refresh_repairs_drift(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        Course.objects.filter(pk=self.course.pk).update(enrollments_total=9, enrollments_active=0)
+        Course.objects.filter(pk=self.course.pk).refresh_enrollment_counts()
+        self.assertEqual(self._counts(), (1, 1))
+
+
+_MEDIA_TMP = tempfile.mkdtemp(prefix="student-media-")
+
+
+_LOCAL_MEDIA = {
+    "STORAGES": {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    "MEDIA_ROOT": _MEDIA_TMP,
+    "MEDIA_STAGING": False,
+    "MEDIA_ACCEL": "",
+}
+
+
+@override_settings(**_LOCAL_MEDIA)
+class ProtectedMediaTests(TestCase):
+    """ملفات المحاضرة لطالب مسجّل فقط، مع Range/If-Range أو تسليمها للوكيل الأمامي."""
+
+    CONTENT = bytes(range(256)) * 8
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(_MEDIA_TMP, ignore_errors=True)
+
+    def setUp(self):
+        teacher = CustomUser.objects.create_user("lecturer", password="pass-12345", role="teacher")
+        taught = TeacherCourse.objects.create(
+            teacher=TeacherProfile.objects.create(user=teacher),
+            subject=Subject.objects.create(name="فيزياء", stage="ثانوي"),
+            title="موجات",
+        )
+        course = Course.objects.create(pk=taught.pk, title="موجات", slug="waves")
+        self.lesson = Lesson.objects.create(
+            course=taught, order=1, title="مقدمة", video_file=SimpleUploadedFile("intro.mp4", self.CONTENT),
+        )
+        self.user = CustomUser.objects.create_user("viewer", password="pass-12345", role="student")
+        Enrollment.objects.create(student=self.user.student_profile, course=course)
+        self.url = reverse("students:lesson_media", args=["waves", self.lesson.pk, "video"])
+
+    def test_requires_enrollment(self):
+        outsider = CustomUser.objects.create_user("outsider", password="pass-12345", role="student")
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_requires_active_enrollment(self):
+        self.client.force_login(self.user)
+        for status in (Enrollment.STATUS_PENDING, Enrollment.STATUS_EXPIRED):
+            Enrollment.objects.filter(student=self.user.student_profile).update(status=status)
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+        bundle = reverse("students:course_bundle", args=["waves"])
+        self.assertEqual(self.client.get(bundle).status_code, 404)
+
+    def test_range_and_if_range(self):
+        self.client.force_login(self.user)
+        full = self.client.get(self.url)
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(full["Accept-Ranges"], "bytes")
+        self.assertEqual(b"".join(full.streaming_content), self.CONTENT)
+
+        partial = self.client.get(self.url, HTTP_RANGE="bytes=100-199", HTTP_IF_RANGE=full["ETag"])
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial["Content-Range"], f"bytes 100-199/{len(self.CONTENT)}")
+        self.assertEqual(b"".join(partial.streaming_content), self.CONTENT[100:200])
+
+        stale = self.client.get(self.url, HTTP_RANGE="bytes=100-199", HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(b"".join(stale.streaming_content), self.CONTENT)
+
+        beyond = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.CONTENT)}-")
+        self.assertEqual(beyond.status_code, 416)
+
+    def test_signed_remote_url_redirects(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(type(self.lesson.video_file.storage), "has_signed_url", return_value=True), \
+                mock.patch.object(type(self.lesson.video_file.storage), "path", side_effect=NotImplementedError), \
+                mock.patch.object(type(self.lesson.video_file.storage), "url", return_value="https://cdn.test/signed?x=1"):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], "https://cdn.test/signed?x=1")
+        self.assertIn("no-store", response["Cache-Control"])
+
+    def test_unsigned_remote_storage_is_not_proxied(self):
+        self.client.force_login(self.user)
+        storage = type(self.lesson.video_file.storage)
+        with mock.patch.object(storage, "has_signed_url", return_value=False), \
+                mock.patch.object(storage, "path", side_effect=NotImplementedError), \
+                self.assertRaises(ImproperlyConfigured):
+            self.client.get(self.url)
+
+    def test_student_resource_files_are_private_blobs(self):
+        resource = Resource.objects.create(
+            course_id=self.lesson.course_id, title="ملخص", file=SimpleUploadedFile("summary.pdf", b"%PDF-1.4\nsum"),
+        )
+        self.assertIs(resource.file.storage, course_media_storage())
+        blob = MediaBlob.objects.get(name=resource.file.name)
+        self.assertEqual(blob.refs, 1)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("students:resource_file", args=["waves", resource.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4\nsum")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resource.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refs, 0)
+
+    @override_settings(MEDIA_ACCEL="nginx")
+    def test_hands_off_to_proxy(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/media/{self.lesson.video_file.name}")
+        self.assertEqual(response.content, b"")
+
+
+@override_settings(**_LOCAL_MEDIA)
+class CourseBundleTests(TestCase):
+    """حزمة ZIP تُبث أثناء بنائها، PDF مخزّن كما هو، وETag من البيان المخزّن."""
+
+    def setUp(self):
+        cache.clear()
+        teacher = CustomUser.objects.create_user("author", password="pass-12345", role="teacher")
+        self.taught = TeacherCourse.objects.create(
+            teacher=TeacherProfile.objects.create(user=teacher),
+            subject=Subject.objects.create(name="لغة", stage="ثانوي"),
+            title="نحو",
+        )
+        self.course = Course.objects.create(pk=self.taught.pk, title="نحو", slug="grammar")
+        Lesson.objects.create(
+            course=self.taught, order=1, title="الجملة",
+            slide_file=SimpleUploadedFile("intro.pdf", b"%PDF-1.4\n" + b"p" * 3000),
+        )
+        Resource.objects.create(
+            course=self.course, title="ملاحظات", file=SimpleUploadedFile("notes.txt", b"line\n" * 2000),
+        )
+        user = CustomUser.objects.create_user("bundler", password="pass-12345", role="student")
+        Enrollment.objects.create(student=user.student_profile, course=self.course)
+        self.client.force_login(user)
+        self.url = reverse("students:course_bundle", args=["grammar"])
+
+    def test_streams_zip_and_short_circuits_on_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        infos = {i.filename.split("/")[0]: i for i in archive.infolist()}
+        self.assertEqual(infos["slides"].compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(infos["resources"].compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(archive.read(infos["resources"]), b"line\n" * 2000)
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TeacherResource.objects.create(
+                course=self.taught, title="تمارين", file=SimpleUploadedFile("drill.pdf", b"%PDF-1.4\n"),
+            )
+        self.assertIsNone(cache.get(manifest_key(self.course.pk)))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
@@ -42,6 +42,13 @@ urlpatterns = [
     path("course/<slug:code>/", views.course_detail, name="course_detail"),
     # مسار إضافي (اختياري) للـ id - يستخدم فقط للـ admin/debug
     path("course/id/<int:pk>/", views.course_detail_by_id, name="course_detail_by_id"),
+    # صفحة محاضرة داخل المقرر (تسجّل الإتمام)
+    path("course/<slug:code>/lesson/<int:lesson_id>/", views.lesson_detail, name="lesson_detail"),
+    # ملفات المقرر المحمية (تحقق من التسجيل ثم تسليم عبر الوكيل أو sendfile)
+    path("course/<slug:code>/lesson/<int:lesson_id>/<str:kind>/", views.lesson_media, name="lesson_media"),
+    path("course/<slug:code>/resource/<int:resource_id>/", views.resource_file, name="resource_file"),
+    # كل ملفات المقرر في ZIP واحد يُبث أثناء بنائه
+    path("course/<slug:code>/bundle.zip", views.course_bundle, name="course_bundle"),
 
     # ======================
     #       الانضمام للمقرر
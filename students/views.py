@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+from urllib.parse import quote
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.http import Http404, HttpResponseNotModified, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 
-from .models import Student, Enrollment, ExamResult, Certificate, Resource
+from .models import Student, Enrollment, Resource
 from teachers.models import Lesson, Course
 from .permissions import student_required
+from core.media import serve_file
+from core.profiles import student_for
+from .bundle import get_manifest, stream_bundle
+from .summary import get_summary
+from .progress import record_completion
 
 
 # =========================
@@ -15,10 +23,10 @@ from .permissions import student_required
 def _get_student(request) -> Student:
     """
     إرجاع/إنشاء سجل Student للمستخدم الحالي.
-    يمنع الأخطاء إذا الطالب أول مرة يدخل.
+    يمنع الأخطاء إذا الطالب أول مرة يدخل. يُقرأ من الملف المحمّل مع المستخدم
+    (core.backends) فلا استعلام إضافي في الحالة المعتادة.
     """
-    student, _ = Student.objects.get_or_create(user=request.user)
-    return student
+    return student_for(request.user, create=True)
 
 
 # =========================
@@ -27,20 +35,18 @@ def _get_student(request) -> Student:
 @student_required
 @require_http_methods(["GET"])
 def dashboard(request):
-    """لوحة الطالب: المقررات + الموارد + الشهادات + الامتحانات"""
+    """
+    لوحة الطالب: المقررات + الموارد + الشهادات + الامتحانات.
+    تُقرأ من ملخص الطالب المخزّن (students.summary): قراءة كاش واحدة عند الإصابة.
+    """
     student = _get_student(request)
-
-    enrollments = student.enrollments.select_related("course")
-    resources = Resource.objects.filter(course__in=enrollments.values("course_id"))
-    certs = student.certificates.select_related("course")
-    exams = ExamResult.objects.filter(student=student).select_related("exam", "exam__course")
-
+    summary = get_summary(student)
     return render(request, "students/dashboard.html", {
         "student": student,
-        "enrollments": enrollments,
-        "resources": resources,
-        "certs": certs,
-        "exams": exams,
+        "enrollments": summary["active_enrollments"],
+        "resources": summary["resources"],
+        "certs": summary["certs"],
+        "exams": summary["exams"],
     })
 
 
@@ -50,8 +56,7 @@ def dashboard(request):
 @student_required
 def my_courses(request):
     student = _get_student(request)
-    enrollments = student.enrollments.select_related("course")
-    return render(request, "students/my_courses.html", {"enrollments": enrollments})
+    return render(request, "students/my_courses.html", {"enrollments": get_summary(student)["enrollments"]})
 
 
 # =========================
@@ -60,8 +65,7 @@ def my_courses(request):
 @student_required
 def my_exams(request):
     student = _get_student(request)
-    results = ExamResult.objects.filter(student=student).select_related("exam", "exam__course")
-    return render(request, "students/my_exams.html", {"results": results})
+    return render(request, "students/my_exams.html", {"results": get_summary(student)["exams"]})
 
 
 # =========================
@@ -70,8 +74,7 @@ def my_exams(request):
 @student_required
 def my_certs(request):
     student = _get_student(request)
-    certs = student.certificates.select_related("course")
-    return render(request, "students/my_certs.html", {"certs": certs})
+    return render(request, "students/my_certs.html", {"certs": get_summary(student)["certs"]})
 
 
 # =========================
@@ -80,9 +83,7 @@ def my_certs(request):
 @student_required
 def my_resources(request):
     student = _get_student(request)
-    enrollments = student.enrollments.select_related("course")
-    resources = Resource.objects.filter(course__in=enrollments.values("course_id"))
-    return render(request, "students/my_resources.html", {"resources": resources})
+    return render(request, "students/my_resources.html", {"resources": get_summary(student)["resources"]})
 
 
 # =========================
@@ -147,6 +148,108 @@ def course_detail_by_id(request, pk: int):
     })
 
 
+# =========================
+#      صفحة المحاضرة
+# =========================
+@student_required
+@require_http_methods(["GET"])
+def lesson_detail(request, code: str, lesson_id: int):
+    """
+    عرض محاضرة لطالب تسجيله في دورتها سارٍ الآن (لا pending ولا expired ولا خارج النافذة).
+    يُسجَّل الإتمام بإدراج واحد (students.progress) ولا يُعاد حساب progress هنا؛
+    يُحدَّث لاحقًا بالتجميع.
+    """
+    student = _get_student(request)
+    enrollment = get_object_or_404(
+        Enrollment.objects.active_now().select_related("course"),
+        course__slug=code,
+        student=student,
+    )
+    lesson = get_object_or_404(Lesson, pk=lesson_id, course_id=enrollment.course_id)
+    record_completion(enrollment.pk, lesson.pk)
+
+    return render(request, "students/lesson_detail.html", {
+        "enrollment": enrollment,
+        "course": enrollment.course,
+        "lesson": lesson,
+    })
+
+
+# =========================
+#     ملفات المقرر المحمية
+# =========================
+# الجزء في الرابط ← حقل الملف في Lesson
+LESSON_MEDIA_FIELDS = {"video": "video_file", "slides": "slide_file"}
+
+
+def _enrolled_course_ids(student, code: str):
+    """
+    استعلام فرعي: يُدمج في استعلام الملف فيكون التحقق من التسجيل والجلب استعلامًا واحدًا.
+    التسجيلات السارية الآن فقط (لا pending ولا expired ولا خارج نافذة الدورة).
+    """
+    return Enrollment.objects.active_now().filter(student=student, course__slug=code).values("course_id")
+
+
+@student_required
+@require_http_methods(["GET", "HEAD"])
+def lesson_media(request, code: str, lesson_id: int, kind: str):
+    """
+    فيديو/شرائح محاضرة لطالب مسجّل فقط. التسليم عبر core.media.serve_file:
+    الوكيل الأمامي (X-Accel-Redirect/X-Sendfile) أو sendfile مع Range للتنقّل في الفيديو.
+    """
+    field = LESSON_MEDIA_FIELDS.get(kind)
+    if field is None:
+        raise Http404
+    lesson = get_object_or_404(
+        Lesson.objects.only("pk", field),
+        pk=lesson_id, course_id__in=_enrolled_course_ids(_get_student(request), code),
+    )
+    fieldfile = getattr(lesson, field)
+    if not fieldfile:
+        raise Http404
+    return serve_file(request, fieldfile, as_attachment=(kind == "slides"))
+
+
+@student_required
+@require_http_methods(["GET", "HEAD"])
+def resource_file(request, code: str, resource_id: int):
+    resource = get_object_or_404(
+        Resource.objects.only("pk", "file"),
+        pk=resource_id, course_id__in=_enrolled_course_ids(_get_student(request), code),
+    )
+    if not resource.file:
+        raise Http404
+    return serve_file(request, resource.file, as_attachment=True)
+
+
+@student_required
+@require_http_methods(["GET", "HEAD"])
+def course_bundle(request, code: str):
+    """
+    كل شرائح ومراجع المقرر في ZIP يُبنى أثناء الإرسال (students.bundle).
+    البيان مخزّن لكل مقرر، وETag منه يعيد 304 دون فتح أي ملف.
+    """
+    course_id = (
+        _enrolled_course_ids(_get_student(request), code)
+        .values_list("course_id", flat=True).first()
+    )
+    if course_id is None:
+        raise Http404
+    manifest = get_manifest(course_id)
+    if not manifest["entries"]:
+        raise Http404("لا توجد ملفات في هذا المقرر.")
+
+    etag = manifest["etag"]
+    if etag in (request.headers.get("If-None-Match") or ""):
+        return HttpResponseNotModified(headers={"ETag": etag})
+
+    response = StreamingHttpResponse(stream_bundle(manifest), content_type="application/zip")
+    response["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(code)}.zip"
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
 # =========================
 #        انضمام لمقرر
 # =========================
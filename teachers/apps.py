@@ -4,3 +4,7 @@ class TeachersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "teachers"
     verbose_name = "لوحة المعلم"
+
+    def ready(self):
+        import teachers.checks  # noqa
+        import teachers.signals  # noqa
@@ -0,0 +1,148 @@
+# teachers/blobs.py
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import MediaBlob
+from .storage import course_media_storage
+from .upload_handlers import file_ext
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = "blobs"
+# مهلة الحجز: الكتلة المُعاد استخدامها خلالها لا تُجمع ولو كان refs=0 (حفظ كائنها جارٍ)
+REUSE_GRACE = timedelta(minutes=15)
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}")
+
+
+def blob_name(digest: str, filename: str) -> str:
+    """اسم معنون بالمحتوى: blobs/ab/<sha256>.<ext> (الامتداد من اسم الرفع للعرض والتحقق)."""
+    ext = file_ext(filename)
+    return f"{BLOB_DIR}/{digest[:2]}/{digest}{'.' + ext if ext else ''}"
+
+
+def digest_from_name(name: str | None) -> str | None:
+    match = _DIGEST_RE.match(os.path.basename(name or ""))
+    return match.group(0) if match else None
+
+
+def content_digest(content) -> str:
+    """
+    sha256 المحسوب أثناء الاستقبال (ValidatingUploadHandler / UploadSession) إن وُجد،
+    وإلا قراءة واحدة للملف المؤقت المحلي.
+    """
+    digest = getattr(content, "sha256", None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+# =========================
+#           الحفظ
+# =========================
+def store(storage, name: str, content, max_length=None) -> str:
+    """
+    يُرجع اسم كتلة المحتوى: الموجودة مسبقًا بلا أي كتابة أو نقل، أو الجديدة بعد كتابتها.
+    المراجع (refs) لا تُعدّ هنا بل عند حفظ الكائن (teachers.signals) فالرفع الملغى لا يُحتسب؛
+    بدلها تُحجز الكتلة بتحديث last_used_at ذرّيًا فلا يحذفها الكنس قبل زيادة refs.
+    """
+    digest = content_digest(content)
+    if MediaBlob.objects.filter(sha256=digest).update(last_used_at=timezone.now()):
+        existing = MediaBlob.objects.filter(sha256=digest).values_list("name", flat=True).first()
+        if existing:
+            return existing
+
+    saved = storage.write(blob_name(digest, name), content, max_length=max_length)
+    blob, created = MediaBlob.objects.get_or_create(
+        sha256=digest, defaults={"name": saved, "size": content.size or 0},
+    )
+    if not created:
+        # رفع متزامن لنفس المحتوى سبقنا: نُبقي كتلته (محجوزة) ونحذف نسختنا
+        MediaBlob.objects.filter(pk=blob.pk).update(last_used_at=timezone.now())
+        storage.delete(saved)
+    return blob.name
+
+
+# =========================
+#      عدّ المراجع والجمع
+# =========================
+def _resolve(names) -> dict[str, int]:
+    """اسم الملف ← معرّف الكتلة (بالاسم، أو بالبصمة في الاسم المرحلي بعد دفعه)."""
+    names = {n for n in names if n}
+    digests = {d for d in map(digest_from_name, names) if d}
+    if not names:
+        return {}
+    rows = MediaBlob.objects.filter(Q(name__in=names) | Q(sha256__in=digests)).values_list("pk", "name", "sha256")
+    by_name = {name: pk for pk, name, _ in rows}
+    by_digest = {sha: pk for pk, _, sha in rows}
+    resolved = {}
+    for n in names:
+        pk = by_name.get(n) or by_digest.get(digest_from_name(n))
+        if pk:
+            resolved[n] = pk
+    return resolved
+
+
+def adjust_refs(deltas: Counter) -> None:
+    """
+    يطبّق فروق المراجع (اسم ← +n/-n) بتحديث ذرّي لكل كتلة، ثم يجمع ما وصل للصفر
+    بعد نجاح المعاملة. الملفات القديمة غير المسجّلة ككتل لا تُلمس.
+    """
+    resolved = _resolve(name for name, delta in deltas.items() if delta)
+    per_blob = Counter()
+    for name, pk in resolved.items():
+        per_blob[pk] += deltas[name]
+    released = []
+    for pk, delta in per_blob.items():
+        if not delta:
+            continue
+        MediaBlob.objects.filter(pk=pk).update(refs=Greatest(F("refs") + delta, Value(0)))
+        if delta < 0:
+            released.append(pk)
+    if released:
+        transaction.on_commit(lambda: collect_garbage(released))
+
+
+def collect_garbage(blob_ids=None, used_before=None) -> int:
+    """
+    يحذف الكتل التي لا يشير إليها شيء مع ملفاتها. الحذف مشروط بـ refs=0 وبأن آخر
+    استخدام (إنشاء أو إعادة استخدام في store) أقدم من used_before لحظة التنفيذ:
+    مرجع جديد أو حجز بعد القرار يُبقي الكتلة. الافتراضي now - REUSE_GRACE.
+    تُرجع عدد الكتل المحذوفة.
+    """
+    if used_before is None:
+        used_before = timezone.now() - REUSE_GRACE
+    orphans = MediaBlob.objects.filter(refs=0, last_used_at__lt=used_before)
+    if blob_ids is not None:
+        orphans = orphans.filter(pk__in=list(blob_ids))
+    storage = course_media_storage()
+    removed = 0
+    for pk, name in orphans.values_list("pk", "name"):
+        deleted, _ = MediaBlob.objects.filter(pk=pk, refs=0, last_used_at__lt=used_before).delete()
+        if not deleted:
+            continue
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception("blob gc: cannot delete %s", name)
+        removed += 1
+    return removed
+
+
+def blob_for(name: str) -> MediaBlob | None:
+    pk = _resolve([name]).get(name)
+    return MediaBlob.objects.filter(pk=pk).first() if pk else None
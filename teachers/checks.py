@@ -0,0 +1,29 @@
+# teachers/checks.py
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# كاش داخل العملية: ما يُحذف في عملية لا يصل لغيرها
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """
+    ملخص لوحة المعلّم يُبطَل من عمليات أخرى (process_outbox عند تفعيل التسجيل،
+    عمّال gunicorn الآخرين)، فالكاش الافتراضي يجب أن يكون مشتركًا (Redis/قاعدة البيانات).
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            "الكاش الافتراضي خاص بكل عملية؛ إبطال ملخصات اللوحات من العمّال الآخرين لن يصل.",
+            hint="اضبط REDIS_URL أو استخدم DatabaseCache (انظر CACHES في الإعدادات).",
+            id="teachers.W001",
+        )
+    ]
@@ -1,35 +1,21 @@
 from __future__ import annotations
 
+import uuid
+
 from django import forms
 from django.core.exceptions import ValidationError
 
-from .models import Subject, Course, Lesson, Resource
+from .models import MAX_FILE_MB, MAX_VIDEO_MB, Subject, Course, Lesson, Resource, UploadSession
+from .resumable import attach_upload
+from .upload_handlers import sniff_file
 
 # =========================
 #        ثوابت مشتركة
 # =========================
-MAX_VIDEO_MB = 500   # حد أقصى لملف الفيديو (يتوافق مع models)
-MAX_FILE_MB = 100    # حد أقصى لباقي الملفات (يتوافق مع models)
-
 VIDEO_ACCEPT = ".mp4,.mov,.mkv,.webm"
 SLIDE_ACCEPT = ".pdf,.ppt,.pptx,.pptm"
 DOC_ACCEPT = ".pdf,.doc,.docx,.ppt,.pptx,.xlsx,.zip"
 
-VIDEO_CT_PREFIX = "video/"
-ALLOWED_SLIDE_CT = {"application/pdf",
-                    "application/vnd.ms-powerpoint",
-                    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-                    "application/vnd.ms-powerpoint.presentation.macroEnabled.12"}
-
-ALLOWED_DOC_CT = {"application/pdf",
-                  "application/msword",
-                  "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                  "application/vnd.ms-powerpoint",
-                  "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-                  "application/vnd.ms-excel",
-                  "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                  "application/zip"}
-
 def _require_https(url: str, field_label: str) -> str:
     url = (url or "").strip()
     if not url:
@@ -42,8 +28,69 @@ def _validate_filesize(uploaded_file, max_mb: int, field_label: str) -> None:
     if uploaded_file and hasattr(uploaded_file, "size") and uploaded_file.size > max_mb * 1024 * 1024:
         raise ValidationError(f"حجم {field_label} يتجاوز {max_mb}MB")
 
-def _ct(uploaded_file) -> str:
-    return getattr(uploaded_file, "content_type", "") or ""
+
+def _signature_ok(uploaded) -> bool:
+    """التوقيع فُحص أثناء الاستقبال (ValidatingUploadHandler) وإلا نفحصه الآن."""
+    return getattr(uploaded, "sniffed", False) or sniff_file(uploaded)
+
+
+# =========================
+#   ملفات نماذج المعلّم
+# =========================
+class TeacherUploadsMixin:
+    """
+    - upload_errors: أسباب رفض معالج الرفع المتدفق (request.upload_errors) تُعرض على حقولها.
+    - حقول مخفية تحمل معرّف UploadSession مكتمل (teachers.resumable) بدل رفع الملف
+      ضمن الطلب نفسه. upload_fields: اسم الحقل المخفي ← (حقل الملف في الموديل، الهدف).
+    """
+    upload_fields: dict = {}
+
+    def __init__(self, *args, uploader=None, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.uploader = uploader
+        self.upload_errors = upload_errors or {}
+        self._uploads = {}
+
+    def _resolve_upload(self, name: str, target: str):
+        raw = (self.cleaned_data.get(name) or "").strip()
+        if not raw:
+            return None
+        try:
+            pk = uuid.UUID(raw)
+        except ValueError:
+            raise ValidationError("معرّف الرفع غير صالح.")
+        upload = UploadSession.objects.filter(
+            pk=pk, owner=self.uploader, target=target, status=UploadSession.STATUS_COMPLETE,
+        ).first() if self.uploader is not None else None
+        if upload is None:
+            raise ValidationError("الملف المرفوع غير مكتمل أو غير متاح.")
+        return upload
+
+    def clean(self):
+        cleaned = super().clean()
+        for field_name, message in self.upload_errors.items():
+            self.add_error(field_name if field_name in self.fields else None, message)
+        for name, (field_name, target) in self.upload_fields.items():
+            try:
+                upload = self._resolve_upload(name, target)
+            except ValidationError as e:
+                self.add_error(name, e)
+                continue
+            if upload is not None:
+                if cleaned.get(field_name):
+                    self.add_error(field_name, "اختر طريقة واحدة: رفع مباشر أو رفع مجزّأ.")
+                self._uploads[field_name] = upload
+        return cleaned
+
+    def _post_clean(self):
+        # تحقق الموديل (Lesson/Resource.clean) يجري قبل attach_uploads: يُعلَم بالرفع المنتظر
+        self.instance._pending_uploads = frozenset(self._uploads)
+        super()._post_clean()
+
+    def attach_uploads(self, obj) -> None:
+        """يُستدعى بعد تعيين course (مسار الرفع يعتمد عليه) وقبل obj.save()."""
+        for field_name, upload in self._uploads.items():
+            attach_upload(upload, obj, field_name)
 
 
 # =========================
@@ -215,7 +262,14 @@ class CourseForm(forms.ModelForm):
 # =========================
 #        LessonForm
 # =========================
-class LessonForm(forms.ModelForm):
+class LessonForm(TeacherUploadsMixin, forms.ModelForm):
+    upload_fields = {
+        "video_upload": ("video_file", UploadSession.TARGET_LESSON_VIDEO),
+        "slide_upload": ("slide_file", UploadSession.TARGET_LESSON_SLIDE),
+    }
+    video_upload = forms.CharField(required=False, widget=forms.HiddenInput)
+    slide_upload = forms.CharField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Lesson
         fields = [
@@ -240,9 +294,15 @@ class LessonForm(forms.ModelForm):
             "order": forms.NumberInput(attrs={"min": 1, "class": "form-control", "aria-label": "ترتيب المحاضرة"}),
             "title": forms.TextInput(attrs={"class": "form-control", "placeholder": "مثال: مقدمة في الشبكات"}),
             "content": forms.Textarea(attrs={"rows": 4, "class": "form-control", "placeholder": "ملخص أو نقاط الدرس"}),
-            "video_file": forms.ClearableFileInput(attrs={"class": "form-control", "accept": VIDEO_ACCEPT}),
+            "video_file": forms.ClearableFileInput(attrs={
+                "class": "form-control", "accept": VIDEO_ACCEPT,
+                "data-resumable": UploadSession.TARGET_LESSON_VIDEO, "data-upload-field": "video_upload",
+            }),
             "recording_url": forms.URLInput(attrs={"class": "form-control", "placeholder": "https://..."}),
-            "slide_file": forms.ClearableFileInput(attrs={"class": "form-control", "accept": SLIDE_ACCEPT}),
+            "slide_file": forms.ClearableFileInput(attrs={
+                "class": "form-control", "accept": SLIDE_ACCEPT,
+                "data-resumable": UploadSession.TARGET_LESSON_SLIDE, "data-upload-field": "slide_upload",
+            }),
             "slide_url": forms.URLInput(attrs={"class": "form-control", "placeholder": "https://..."}),
         }
 
@@ -273,27 +333,30 @@ class LessonForm(forms.ModelForm):
         slide_file = cleaned.get("slide_file")
         slide_url = cleaned.get("slide_url")
 
+        # الرفع المجزّأ المكتمل يقوم مقام الملف (تحقق حجمه وامتداده تم عند الإنشاء)
+        video_ready = bool(video_file) or "video_file" in self._uploads
+        slide_ready = bool(slide_file) or "slide_file" in self._uploads
+
         # فيديو: ملف XOR رابط
-        if not video_file and not recording_url:
+        if not video_ready and not recording_url:
             raise ValidationError("يجب رفع ملف فيديو أو إدخال رابط للتسجيل.")
-        if video_file and recording_url:
+        if video_ready and recording_url:
             raise ValidationError("اختر طريقة واحدة للفيديو: ملف أو رابط.")
 
-        # تحقق نوع المحتوى للفيديو
+        # تحقق نوع المحتوى للفيديو من توقيع الملف لا من content_type المتصفح
         if video_file:
-            if not _ct(video_file).startswith(VIDEO_CT_PREFIX):
-                raise ValidationError("ملف الفيديو يجب أن يكون من نوع video/* (mp4/mov/mkv/webm).")
+            if not _signature_ok(video_file):
+                raise ValidationError("ملف الفيديو يجب أن يكون mp4/mov/mkv/webm فعليًا.")
             _validate_filesize(video_file, MAX_VIDEO_MB, "ملف الفيديو")
 
         # شرائح: اختياري لكن لا تجمع بينهما
-        if slide_file and slide_url:
+        if slide_ready and slide_url:
             raise ValidationError("اختر طريقة واحدة للشرائح: ملف أو رابط.")
 
         if slide_file:
-            # السماح بـ PDF/PPT/PPTX
-            if _ct(slide_file) not in ALLOWED_SLIDE_CT:
-                # بعض المتصفحات ترسل content_type غير دقيق؛ نكتفي بالحجم إن فشل النوع
-                pass
+            # السماح بـ PDF/PPT/PPTX: التوقيع بدل content_type غير الدقيق من بعض المتصفحات
+            if not _signature_ok(slide_file):
+                raise ValidationError("محتوى ملف الشرائح لا يطابق امتداده.")
             _validate_filesize(slide_file, MAX_FILE_MB, "ملف الشرائح")
 
         return cleaned
@@ -302,7 +365,12 @@ class LessonForm(forms.ModelForm):
 # =========================
 #       ResourceForm
 # =========================
-class ResourceForm(forms.ModelForm):
+class ResourceForm(TeacherUploadsMixin, forms.ModelForm):
+    upload_fields = {
+        "file_upload": ("file", UploadSession.TARGET_RESOURCE_FILE),
+    }
+    file_upload = forms.CharField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Resource
         fields = ["title", "file", "external_link", "kind", "note"]
@@ -315,7 +383,10 @@ class ResourceForm(forms.ModelForm):
         }
         widgets = {
             "title": forms.TextInput(attrs={"class": "form-control", "placeholder": "مثال: الكتاب المرجعي للوحدة 1"}),
-            "file": forms.ClearableFileInput(attrs={"class": "form-control", "accept": DOC_ACCEPT}),
+            "file": forms.ClearableFileInput(attrs={
+                "class": "form-control", "accept": DOC_ACCEPT,
+                "data-resumable": UploadSession.TARGET_RESOURCE_FILE, "data-upload-field": "file_upload",
+            }),
             "external_link": forms.URLInput(attrs={"class": "form-control", "placeholder": "https://..."}),
             "kind": forms.Select(attrs={"class": "form-select"}),
             "note": forms.Textarea(attrs={"rows": 2, "class": "form-control", "placeholder": "ملاحظات/وصف مختصر"}),
@@ -334,13 +405,13 @@ class ResourceForm(forms.ModelForm):
         cleaned = super().clean()
         file = cleaned.get("file")
         link = cleaned.get("external_link")
-        if not file and not link:
+        file_ready = bool(file) or "file" in self._uploads
+        if not file_ready and not link:
             raise ValidationError("يجب إرفاق ملف أو إدخال رابط خارجي.")
-        if file and link:
+        if file_ready and link:
             raise ValidationError("اختر طريقة واحدة: ملف أو رابط.")
         if file:
-            if _ct(file) and _ct(file) not in ALLOWED_DOC_CT:
-                # إن كان content_type غير دقيق لا نفشل؛ نعتمد على الامتداد/الفلتر في الموديل
-                pass
+            if not _signature_ok(file):
+                raise ValidationError("محتوى الملف لا يطابق امتداده.")
             _validate_filesize(file, MAX_FILE_MB, "الملف")
         return cleaned
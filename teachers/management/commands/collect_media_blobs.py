@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from teachers.blobs import collect_garbage
+
+
+class Command(BaseCommand):
+    help = "حذف كتل الملفات التي لا تشير إليها أي محاضرة أو مرجع (رفع لم يُحفظ كائنه مثلًا) مع ملفاتها."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--minutes", type=int, default=60,
+                            help="تجاهل الكتل المُنشأة أو المُعاد استخدامها خلال هذه المدة (قد يكون حفظ كائنها جاريًا).")
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(minutes=max(1, opts["minutes"]))
+        total = collect_garbage(used_before=cutoff)
+        self.stdout.write(self.style.SUCCESS(f"تم حذف {total} كتلة."))
@@ -0,0 +1,58 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from teachers.media_push import move_legacy_name
+from teachers.models import MediaBlob
+from teachers.storage import MEDIA_FIELDS, STAGED_PREFIX, legacy_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "نقل ملفات المحاضرات والمراجع المرفوعة قبل course_media (روابط عامة) إلى التخزين الخاص "
+        "ككتل MediaBlob. يُشغَّل مرة بعد النشر؛ حتى ذلك تُقرأ الملفات القديمة من course_media_legacy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", action="store_true", help="إبقاء النسخة العامة بعد النقل.")
+        parser.add_argument("--dry-run", action="store_true", help="عرض الأسماء فقط.")
+
+    def handle(self, *args, **opts):
+        if legacy_storage() is None:
+            raise CommandError('STORAGES["course_media_legacy"] غير مضبوط.')
+
+        registered = MediaBlob.objects.values("name")
+        names = {}
+        for label, fields in MEDIA_FIELDS.items():
+            model = apps.get_model(label)
+            for field_name in fields:
+                max_length = model._meta.get_field(field_name).max_length
+                rows = (
+                    model.objects.exclude(**{f"{field_name}__isnull": True})
+                    .exclude(**{field_name: ""})
+                    .exclude(**{f"{field_name}__startswith": STAGED_PREFIX})
+                    .exclude(**{f"{field_name}__in": registered})
+                    .values_list(field_name, flat=True)
+                    .distinct()
+                )
+                for name in rows:
+                    names[name] = min(max_length, names.get(name, max_length))
+
+        moved = failed = 0
+        for name, max_length in sorted(names.items()):
+            if opts["dry_run"]:
+                self.stdout.write(name)
+                continue
+            try:
+                new_name = move_legacy_name(name, keep=opts["keep"], max_length=max_length)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{name}: {exc}")
+                continue
+            if new_name:
+                moved += 1
+                self.stdout.write(f"{name} → {new_name}")
+
+        if opts["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"{len(names)} ملف بانتظار النقل."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"تم نقل {moved} ملف، وفشل {failed}."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from teachers.resumable import purge_stale
+
+
+class Command(BaseCommand):
+    help = "حذف جلسات الرفع المجزّأ القديمة (المتروكة أو المربوطة) وأجزائها المؤقتة (يُشغَّل دوريًا عبر cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24)
+
+    def handle(self, *args, **opts):
+        total = purge_stale(hours=max(1, opts["hours"]))
+        self.stdout.write(self.style.SUCCESS(f"تم حذف {total} جلسة رفع."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from teachers.media_push import push
+from teachers.models import Lesson, Resource
+from teachers.storage import MEDIA_FIELDS, STAGED_PREFIX
+
+
+class Command(BaseCommand):
+    help = "دفع ملفات المحاضرات والمراجع العالقة على القرص المحلي (بعد إعادة تشغيل أو فشل) للتخزين البعيد."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **opts):
+        batch = max(1, opts["batch_size"])
+        total = 0
+        for model in (Lesson, Resource):
+            label = model._meta.label
+            pending = model.objects.none()
+            for field_name in MEDIA_FIELDS[label]:
+                pending |= model.objects.filter(**{f"{field_name}__startswith": STAGED_PREFIX})
+            last_id = 0
+            while True:
+                ids = list(
+                    pending.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch]
+                )
+                if not ids:
+                    break
+                for pk in ids:
+                    try:
+                        total += push(label, pk)
+                    except Exception as exc:
+                        self.stderr.write(f"{label} #{pk}: {exc}")
+                last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"تم دفع {total} ملف."))
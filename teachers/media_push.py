@@ -0,0 +1,175 @@
+# teachers/media_push.py
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+
+from students.bundle import invalidate_bundles
+from .blobs import adjust_refs, blob_for
+from .models import MediaBlob
+from .storage import (
+    MEDIA_FIELDS, STAGED_PREFIX, course_media_storage, is_registered, is_staged, legacy_storage, remote_storage,
+    staging_storage,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+
+
+def _workers() -> int:
+    return int(getattr(settings, "MEDIA_PUSH_WORKERS", DEFAULT_WORKERS))
+
+
+# =========================
+#       مجمّع الخيوط
+# =========================
+_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="media-push")
+        return _executor
+
+
+def _shutdown() -> None:
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+
+
+atexit.register(_shutdown)
+
+
+def staged_fields(instance) -> list[str]:
+    label = instance._meta.label
+    return [f for f in MEDIA_FIELDS.get(label, ()) if is_staged(getattr(instance, f).name)]
+
+
+def schedule(instance) -> None:
+    """
+    يجدول دفع الملفات المرحلية بعد نجاح المعاملة. MEDIA_PUSH_WORKERS=0 يدفعها
+    داخل نفس الخيط (الاختبارات وبيئات بلا خيوط خلفية).
+    """
+    label, pk = instance._meta.label, instance.pk
+
+    def submit():
+        if _workers() <= 0:
+            push(label, pk)
+        else:
+            _pool().submit(_run, label, pk)
+
+    transaction.on_commit(submit, robust=True)
+
+
+def _run(label: str, pk: int) -> None:
+    try:
+        push(label, pk)
+    except Exception:
+        logger.exception("media push failed for %s #%s", label, pk)
+    finally:
+        # خيوط المجمّع خارج دورة الطلب فلا يُغلق اتصالها تلقائيًا
+        connection.close()
+
+
+# =========================
+#          الدفع
+# =========================
+def push(label: str, pk: int) -> int:
+    """يدفع كل حقل مرحلي في الكائن (انظر push_name). تُرجع عدد الملفات المدفوعة."""
+    model = apps.get_model(label)
+    obj = model.objects.filter(pk=pk).only(*MEDIA_FIELDS[label]).first()
+    if obj is None:
+        return 0
+    pushed = 0
+    for field_name in staged_fields(obj):
+        max_length = model._meta.get_field(field_name).max_length
+        if push_name(getattr(obj, field_name).name, max_length=max_length):
+            pushed += 1
+    return pushed
+
+
+def push_name(staged_name: str, max_length: int | None = None) -> bool:
+    """
+    يرفع الملف المرحلي للتخزين البعيد ثم يستبدل اسمه في كتلته وفي كل حقل يشير إليه
+    (الملف المكرر قد تشترك فيه عدة محاضرات ومراجع)، بتحديثات مشروطة على الاسم القديم.
+    عاملان على نفس الكتلة: الأول يثبّت اسمه والثاني يحذف نسخته ويستعمل اسم الأول.
+    """
+    local, remote = staging_storage(), remote_storage()
+    local_name = staged_name[len(STAGED_PREFIX):]
+    blob = blob_for(staged_name)
+
+    if blob is not None and not is_staged(blob.name):
+        remote_name = blob.name
+    elif local.exists(local_name):
+        with local.open(local_name, "rb") as fh:
+            remote_name = remote.save(local_name, fh, max_length=max_length)
+        if blob is not None and not MediaBlob.objects.filter(pk=blob.pk, name=staged_name).update(name=remote_name):
+            remote.delete(remote_name)
+            remote_name = MediaBlob.objects.filter(pk=blob.pk).values_list("name", flat=True).first()
+            if remote_name is None or is_staged(remote_name):
+                # جُمعت الكتلة أثناء الرفع (لا مراجع)
+                return False
+    else:
+        logger.warning("staged file missing: %s", staged_name)
+        return False
+
+    course_ids, _ = _swap_references(staged_name, remote_name)
+    if blob is None and not course_ids:
+        # ملف مرحلي بلا كتلة ولم يعد أحد يشير إليه
+        remote.delete(remote_name)
+    local.delete(local_name)
+    if course_ids:
+        # التحديث المباشر لا يرسل post_save: بيان حزمة المقرر يحمل الاسم القديم
+        invalidate_bundles(course_ids)
+    return bool(course_ids)
+
+
+def _swap_references(old: str, new: str) -> tuple[set[int], int]:
+    """يستبدل الاسم في كل حقول الوسائط؛ تُرجع (مقررات الصفوف المتأثرة، عدد الحقول المستبدلة)."""
+    course_ids, swapped = set(), 0
+    for label, fields in MEDIA_FIELDS.items():
+        model = apps.get_model(label)
+        for field_name in fields:
+            rows = model.objects.filter(**{field_name: old})
+            course_ids.update(rows.values_list("course_id", flat=True))
+            swapped += rows.update(**{field_name: new})
+    return course_ids, swapped
+
+
+# =========================
+#   نقل الملفات القديمة (العامة)
+# =========================
+def move_legacy_name(name: str, *, keep: bool = False, max_length: int | None = None) -> str | None:
+    """
+    ينقل ملفًا رُفع قبل course_media من legacy_storage() إلى التخزين الخاص ككتلة
+    (نفس مسار الحفظ: sha256 والتكرار والمرحلي)، ثم يستبدل اسمه في كل الحقول ويحتسب
+    مراجعه، ويحذف النسخة العامة بعد نجاح المعاملة (إلا مع keep). تُرجع الاسم الجديد.
+    """
+    legacy = legacy_storage()
+    if legacy is None or not name or is_staged(name) or is_registered(name):
+        return None
+    with legacy.open(name, "rb") as fh:
+        new_name = course_media_storage().save(os.path.basename(fh.name or name), fh, max_length=max_length)
+
+    with transaction.atomic():
+        course_ids, swapped = _swap_references(name, new_name)
+        adjust_refs(Counter({new_name: swapped}))
+        if course_ids:
+            invalidate_bundles(course_ids)
+        if not keep:
+            transaction.on_commit(lambda: legacy.delete(name))
+    if is_staged(new_name):
+        push_name(new_name, max_length=max_length)
+    return new_name
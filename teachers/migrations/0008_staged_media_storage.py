@@ -0,0 +1,29 @@
+import django.core.validators
+import teachers.models
+import teachers.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers', '0007_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='slide_file',
+            field=models.FileField(blank=True, null=True, storage=teachers.storage.course_media_storage, upload_to=teachers.models.lecture_upload_to, validators=[django.core.validators.FileExtensionValidator(['pdf', 'ppt', 'pptx', 'pptm'])]),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='video_file',
+            field=models.FileField(blank=True, null=True, storage=teachers.storage.course_media_storage, upload_to=teachers.models.lecture_upload_to, validators=[django.core.validators.FileExtensionValidator(['mp4', 'mov', 'mkv', 'webm'])]),
+        ),
+        migrations.AlterField(
+            model_name='resource',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=teachers.storage.course_media_storage, upload_to=teachers.models.material_upload_to, validators=[django.core.validators.FileExtensionValidator(['pdf', 'doc', 'docx', 'ppt', 'pptx', 'xlsx', 'zip', 'pdf', 'ppt', 'pptx', 'pptm'])]),
+        ),
+    ]
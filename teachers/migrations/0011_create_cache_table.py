@@ -0,0 +1,20 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # CACHES الافتراضي جدول في قاعدة البيانات ما لم يُضبط REDIS_URL؛ ملخص لوحة المعلّم
+    # يعتمد عليه، فيُنشأ مع migrate بدل خطوة createcachetable منفصلة تُنسى عند النشر.
+    # الأمر لا يفعل شيئًا إن كان الجدول موجودًا أو لم يكن الكاش DatabaseCache.
+    call_command("createcachetable", database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers', '0010_mediablob_last_used_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import os
+import uuid
+
 from django.db import models
+from django.db.models import IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator, FileExtensionValidator
 from django.utils.text import slugify
 from django.utils import timezone
 
+from students.models import Course as StudentCourse
+from .storage import course_media_storage, is_staged, media_names
+
 ALLOWED_VIDEO_EXTS = ["mp4", "mov", "mkv", "webm"]
 ALLOWED_SLIDE_EXTS = ["pdf", "ppt", "pptx", "pptm"]
 ALLOWED_DOC_EXTS = ["pdf", "doc", "docx", "ppt", "pptx", "xlsx", "zip"]
@@ -27,16 +35,23 @@ def _validate_filesize(f, max_mb: int, field_name: str):
         raise ValidationError({field_name: f"حجم الملف يتجاوز {max_mb}MB"})
 
 
+def _has_media(instance, field_name: str) -> bool:
+    """ملف مرفق، أو رفع مجزّأ مكتمل سيُربط بعد التحقق (TeacherUploadsMixin)."""
+    return bool(getattr(instance, field_name)) or field_name in getattr(instance, "_pending_uploads", ())
+
+
+def _ext_only(filename: str) -> str:
+    # الاسم النهائي blobs/ab/<sha256>.<ext> يحدده teachers.blobs: لا يُستخدم من اسم الرفع إلا امتداده
+    ext = os.path.splitext(os.path.basename(filename or ""))[1].lower()
+    return f"upload{ext}"
+
+
 def lecture_upload_to(instance: "Lesson", filename: str) -> str:
-    code = getattr(instance.course, "code", "") or slugify(instance.course.title)[:64]
-    ts = timezone.now().strftime("%Y-%m-%d")
-    return f"lectures/{code}/{ts}_{filename}"
+    return _ext_only(filename)
 
 
 def material_upload_to(instance: "Resource", filename: str) -> str:
-    code = getattr(instance.course, "code", "") or slugify(instance.course.title)[:64]
-    ts = timezone.now().strftime("%Y-%m-%d")
-    return f"materials/{code}/{ts}_{filename}"
+    return _ext_only(filename)
 
 
 class TeacherProfile(models.Model):
@@ -65,6 +80,16 @@ class CourseQuerySet(models.QuerySet):
     def active(self):
         return self.filter(is_active=True)
 
+    def with_students_total(self):
+        """
+        students_total من العدّاد المخزّن في students.Course (نفس المعرّف)
+        بدل عدّ التسجيلات لكل مقرر.
+        """
+        counter = StudentCourse.objects.filter(pk=OuterRef("pk")).values("enrollments_total")[:1]
+        return self.annotate(
+            students_total=Coalesce(Subquery(counter, output_field=IntegerField()), Value(0))
+        )
+
 
 class Course(models.Model):
     teacher = models.ForeignKey(TeacherProfile, on_delete=models.CASCADE, related_name="courses")
@@ -103,11 +128,15 @@ class Course(models.Model):
 
     @property
     def students_count(self) -> int:
-        rel = getattr(self, "enrollments", None)
-        try:
-            return rel.count() if rel is not None else 0
-        except Exception:
-            return 0
+        """من تعليق with_students_total إن وُجد، وإلا قراءة العدّاد المخزّن (لا عدّ)."""
+        annotated = getattr(self, "students_total", None)
+        if annotated is not None:
+            return annotated
+        return (
+            StudentCourse.objects.filter(pk=self.pk)
+            .values_list("enrollments_total", flat=True)
+            .first()
+        ) or 0
 
     def clean(self):
         _validate_https(self.teams_link, "teams_link")
@@ -130,13 +159,13 @@ class Lesson(models.Model):
     content = models.TextField(blank=True)
 
     video_file = models.FileField(
-        upload_to=lecture_upload_to, blank=True, null=True,
+        upload_to=lecture_upload_to, storage=course_media_storage, blank=True, null=True,
         validators=[FileExtensionValidator(ALLOWED_VIDEO_EXTS)],
     )
     recording_url = models.URLField(blank=True)
 
     slide_file = models.FileField(
-        upload_to=lecture_upload_to, blank=True, null=True,
+        upload_to=lecture_upload_to, storage=course_media_storage, blank=True, null=True,
         validators=[FileExtensionValidator(ALLOWED_SLIDE_EXTS)],
     )
     slide_url = models.URLField(blank=True)
@@ -154,16 +183,29 @@ class Lesson(models.Model):
     def __str__(self) -> str:
         return f"{self.course.title} — {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # أسماء الملفات كما قُرئت لتحسب الإشارات فروق مراجع MediaBlob عند الحفظ/الحذف
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_media = media_names(instance)
+        return instance
+
+    @property
+    def media_pending(self) -> bool:
+        """الملف ما زال على القرص المحلي بانتظار دفعه للتخزين البعيد."""
+        return is_staged(self.video_file.name) or is_staged(self.slide_file.name)
+
     def clean(self):
-        if not self.video_file and not self.recording_url:
+        video_ready = _has_media(self, "video_file")
+        if not video_ready and not self.recording_url:
             raise ValidationError({"recording_url": "يجب رفع ملف فيديو أو إدخال رابط للمحاضرة."})
-        if self.video_file and self.recording_url:
+        if video_ready and self.recording_url:
             raise ValidationError({"recording_url": "اختر طريقة واحدة للفيديو: ملف أو رابط."})
         if self.recording_url:
             _validate_https(self.recording_url, "recording_url")
         _validate_filesize(self.video_file, MAX_VIDEO_MB, "video_file")
 
-        if self.slide_file and self.slide_url:
+        if _has_media(self, "slide_file") and self.slide_url:
             raise ValidationError({"slide_url": "اختر طريقة واحدة للشرائح: ملف أو رابط."})
         if self.slide_url:
             _validate_https(self.slide_url, "slide_url")
@@ -185,7 +227,7 @@ class Resource(models.Model):
     title = models.CharField(max_length=150)
 
     file = models.FileField(
-        upload_to=material_upload_to, blank=True, null=True,
+        upload_to=material_upload_to, storage=course_media_storage, blank=True, null=True,
         validators=[FileExtensionValidator(ALLOWED_DOC_EXTS + ALLOWED_SLIDE_EXTS)],
     )
     external_link = models.URLField(blank=True)
@@ -202,11 +244,91 @@ class Resource(models.Model):
     def __str__(self) -> str:
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_media = media_names(instance)
+        return instance
+
+    @property
+    def media_pending(self) -> bool:
+        return is_staged(self.file.name)
+
     def clean(self):
-        if not self.file and not self.external_link:
+        file_ready = _has_media(self, "file")
+        if not file_ready and not self.external_link:
             raise ValidationError({"external_link": "يجب إرفاق ملف أو إدخال رابط خارجي."})
-        if self.file and self.external_link:
+        if file_ready and self.external_link:
             raise ValidationError({"external_link": "اختر طريقة واحدة: ملف أو رابط."})
         if self.external_link:
             _validate_https(self.external_link, "external_link")
         _validate_filesize(self.file, MAX_FILE_MB, "file")
+
+
+class MediaBlob(models.Model):
+    """
+    ملف واحد لكل محتوى (sha256) تتشاركه المحاضرات والمراجع؛ refs عدد الحقول التي
+    تشير إليه (teachers.blobs). يُحذف الملف مع الصف حين يصل العدد للصفر.
+    last_used_at حجز: يُحدَّث كلما أعاد الحفظ استخدام الكتلة فلا يجمعها الكنس قبل
+    أن يُحفظ الكائن الذي سيشير إليها.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    refs = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["name"])]
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.refs})"
+
+
+class UploadSession(models.Model):
+    """
+    رفع قابل للاستئناف (بروتوكول على نمط tus: إنشاء/PATCH/HEAD). الأجزاء تُكتب
+    في مجلد مؤقت محلي (teachers.resumable)، وعند اكتمالها يُجمَّع الملف ويبقى
+    بانتظار نموذج المحاضرة/المرجع الذي يربطه بالحقل.
+    """
+    TARGET_LESSON_VIDEO = "lesson_video"
+    TARGET_LESSON_SLIDE = "lesson_slide"
+    TARGET_RESOURCE_FILE = "resource_file"
+    TARGET_CHOICES = (
+        (TARGET_LESSON_VIDEO, "فيديو محاضرة"),
+        (TARGET_LESSON_SLIDE, "شرائح محاضرة"),
+        (TARGET_RESOURCE_FILE, "ملف مرجع"),
+    )
+
+    STATUS_UPLOADING = "uploading"
+    STATUS_COMPLETE = "complete"
+    STATUS_CONSUMED = "consumed"
+    STATUS_CHOICES = (
+        (STATUS_UPLOADING, "قيد الرفع"),
+        (STATUS_COMPLETE, "مكتمل"),
+        (STATUS_CONSUMED, "مرتبط"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions")
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    filename = models.CharField(max_length=255)
+    length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_UPLOADING)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "updated_at"])]
+
+    def __str__(self) -> str:
+        return f"{self.filename} ({self.offset}/{self.length})"
+
+    @property
+    def is_complete(self) -> bool:
+        return self.status == self.STATUS_COMPLETE
@@ -0,0 +1,204 @@
+# teachers/resumable.py
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    ALLOWED_DOC_EXTS, ALLOWED_SLIDE_EXTS, ALLOWED_VIDEO_EXTS,
+    MAX_FILE_MB, MAX_VIDEO_MB, UploadSession,
+)
+from .upload_handlers import SNIFF_BYTES, file_ext, matches_signature
+
+TUS_VERSION = "1.0.0"
+READ_CHUNK = 64 * 1024
+
+# الهدف ← (الحد الأقصى بالميغابايت، الامتدادات المسموحة)
+TARGET_RULES = {
+    UploadSession.TARGET_LESSON_VIDEO: (MAX_VIDEO_MB, ALLOWED_VIDEO_EXTS),
+    UploadSession.TARGET_LESSON_SLIDE: (MAX_FILE_MB, ALLOWED_SLIDE_EXTS),
+    UploadSession.TARGET_RESOURCE_FILE: (MAX_FILE_MB, ALLOWED_DOC_EXTS + ALLOWED_SLIDE_EXTS),
+}
+
+
+class UploadError(Exception):
+    """خطأ بروتوكول الرفع مع رمز HTTP المناسب."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+# =========================
+#       المجلد المؤقت
+# =========================
+def _root() -> Path:
+    return Path(getattr(settings, "RESUMABLE_UPLOAD_DIR", settings.BASE_DIR / "tmp" / "uploads"))
+
+
+def _max_chunk_bytes() -> int:
+    return int(getattr(settings, "RESUMABLE_MAX_CHUNK_MB", 16)) * 1024 * 1024
+
+
+def session_dir(upload: UploadSession) -> Path:
+    return _root() / str(upload.id)
+
+
+def assembled_path(upload: UploadSession) -> Path:
+    return session_dir(upload) / "assembled"
+
+
+def discard_files(upload: UploadSession) -> None:
+    shutil.rmtree(session_dir(upload), ignore_errors=True)
+
+
+# =========================
+#        الترويسات
+# =========================
+def parse_metadata(header: str) -> dict:
+    """Upload-Metadata: أزواج "key base64value" مفصولة بفواصل."""
+    meta = {}
+    for pair in (header or "").split(","):
+        parts = pair.strip().split(" ", 1)
+        if not parts[0]:
+            continue
+        try:
+            meta[parts[0]] = base64.b64decode(parts[1]).decode() if len(parts) == 2 else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError("Upload-Metadata غير صالح.")
+    return meta
+
+
+def parse_checksum(header: str) -> bytes:
+    """Upload-Checksum: "sha256 <base64>" (امتداد checksum في tus)."""
+    algo, _, value = (header or "").strip().partition(" ")
+    if algo.lower() != "sha256":
+        raise UploadError("يلزم Upload-Checksum بخوارزمية sha256.", status=400)
+    try:
+        return base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise UploadError("Upload-Checksum غير صالح.")
+
+
+# =========================
+#          العمليات
+# =========================
+def create_upload(owner, target: str, filename: str, length: int) -> UploadSession:
+    if target not in TARGET_RULES:
+        raise UploadError("نوع الرفع غير معروف.")
+    max_mb, exts = TARGET_RULES[target]
+    filename = os.path.basename(filename or "").strip()
+    if file_ext(filename) not in exts:
+        raise UploadError("امتداد الملف غير مسموح.", status=415)
+    if length <= 0:
+        raise UploadError("Upload-Length مطلوب.")
+    if length > max_mb * 1024 * 1024:
+        raise UploadError(f"حجم الملف يتجاوز {max_mb}MB", status=413)
+    upload = UploadSession.objects.create(owner=owner, target=target, filename=filename[:255], length=length)
+    session_dir(upload).mkdir(parents=True, exist_ok=True)
+    return upload
+
+
+def append_chunk(upload: UploadSession, offset: int, stream, size: int, checksum: bytes) -> UploadSession:
+    """
+    يكتب الجزء لملف مؤقت مع حساب sha256 أثناء القراءة، ثم يثبّته تحت قفل قصير
+    على الصف (لا نحجز القاعدة أثناء استقبال البايتات). إن اكتمل الطول يُجمَّع الملف.
+    """
+    if upload.status != UploadSession.STATUS_UPLOADING:
+        raise UploadError("الرفع مكتمل مسبقًا.", status=409)
+    if offset != upload.offset:
+        raise UploadError("Upload-Offset لا يطابق.", status=409)
+    if size <= 0 or size > _max_chunk_bytes() or offset + size > upload.length:
+        raise UploadError("حجم الجزء غير صالح.", status=413)
+
+    folder = session_dir(upload)
+    folder.mkdir(parents=True, exist_ok=True)
+    staging = folder / f"{uuid.uuid4().hex}.tmp"
+    digest = hashlib.sha256()
+    received = 0
+    with open(staging, "wb") as out:
+        while received < size:
+            piece = stream.read(min(READ_CHUNK, size - received))
+            if not piece:
+                break
+            digest.update(piece)
+            out.write(piece)
+            received += len(piece)
+
+    if received != size:
+        staging.unlink(missing_ok=True)
+        raise UploadError("الجزء ناقص.", status=400)
+    if digest.digest() != checksum:
+        staging.unlink(missing_ok=True)
+        raise UploadError("Checksum Mismatch", status=460)
+    if offset == 0:
+        # أول جزء: التوقيع يجب أن يطابق الامتداد قبل قبول بقية الملف
+        with open(staging, "rb") as fh:
+            if not matches_signature(file_ext(upload.filename), fh.read(SNIFF_BYTES)):
+                staging.unlink(missing_ok=True)
+                raise UploadError("محتوى الملف لا يطابق امتداده.", status=415)
+
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=upload.pk)
+        if locked.status != UploadSession.STATUS_UPLOADING or locked.offset != offset:
+            staging.unlink(missing_ok=True)
+            raise UploadError("Upload-Offset لا يطابق.", status=409)
+        staging.rename(folder / f"{offset:020d}.part")
+        locked.offset = offset + size
+        if locked.offset == locked.length:
+            locked.sha256 = _assemble(locked)
+            locked.status = UploadSession.STATUS_COMPLETE
+        locked.save(update_fields=["offset", "sha256", "status", "updated_at"])
+    return locked
+
+
+def _assemble(upload: UploadSession) -> str:
+    """ضم الأجزاء بترتيب الإزاحة في ملف واحد وحذفها. تُرجع sha256 الملف كاملًا."""
+    folder = session_dir(upload)
+    parts = sorted(folder.glob("*.part"))
+    digest = hashlib.sha256()
+    with open(assembled_path(upload), "wb") as out:
+        for part in parts:
+            with open(part, "rb") as src:
+                while True:
+                    piece = src.read(READ_CHUNK)
+                    if not piece:
+                        break
+                    digest.update(piece)
+                    out.write(piece)
+    for part in parts:
+        part.unlink(missing_ok=True)
+    return digest.hexdigest()
+
+
+def attach_upload(upload: UploadSession, instance, field_name: str) -> None:
+    """يربط الملف المُجمَّع بحقل الملف (دون حفظ الكائن) ويعلّم الجلسة مستهلكة."""
+    with open(assembled_path(upload), "rb") as fh:
+        content = File(fh)
+        content.sha256 = upload.sha256  # محسوب عند التجميع: التخزين المعنون لا يعيد القراءة
+        getattr(instance, field_name).save(upload.filename, content, save=False)
+    UploadSession.objects.filter(pk=upload.pk).update(
+        status=UploadSession.STATUS_CONSUMED, updated_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: discard_files(upload))
+
+
+def purge_stale(hours: int = 24) -> int:
+    """حذف الجلسات غير المكتملة/غير المربوطة القديمة والمستهلكة مع ملفاتها المؤقتة."""
+    cutoff = timezone.now() - timedelta(hours=hours)
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for upload in stale:
+        discard_files(upload)
+    UploadSession.objects.filter(pk__in=[u.pk for u in stale]).delete()
+    return len(stale)
@@ -0,0 +1,84 @@
+# teachers/signals.py
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from students.models import Enrollment, Resource as StudentResource
+from . import media_push
+from .blobs import adjust_refs
+from .models import Course, Lesson, Resource, Subject
+from .storage import media_names
+from .summary import invalidate_courses, invalidate_teachers
+
+
+# =========================
+#   إبطال ملخص لوحة المعلّم
+# =========================
+@receiver(post_save, sender=Course, dispatch_uid="teacher_summary_course_save")
+@receiver(post_delete, sender=Course, dispatch_uid="teacher_summary_course_delete")
+def _invalidate_course(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_teachers([instance.teacher_id])
+
+
+@receiver(post_save, sender=Lesson, dispatch_uid="teacher_summary_lesson_save")
+@receiver(post_delete, sender=Lesson, dispatch_uid="teacher_summary_lesson_delete")
+@receiver(post_save, sender=Resource, dispatch_uid="teacher_summary_resource_save")
+@receiver(post_delete, sender=Resource, dispatch_uid="teacher_summary_resource_delete")
+@receiver(post_save, sender=Enrollment, dispatch_uid="teacher_summary_enrollment_save")
+@receiver(post_delete, sender=Enrollment, dispatch_uid="teacher_summary_enrollment_delete")
+def _invalidate_course_owner(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_courses([instance.course_id])
+
+
+@receiver(post_save, sender=Subject, dispatch_uid="teacher_summary_subject_save")
+def _invalidate_subject(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    invalidate_teachers(instance.courses.values_list("teacher_id", flat=True))
+
+
+# =========================
+#  دفع الوسائط المرحلية
+# =========================
+@receiver(post_save, sender=Lesson, dispatch_uid="media_push_lesson_save")
+@receiver(post_save, sender=Resource, dispatch_uid="media_push_resource_save")
+@receiver(post_save, sender=StudentResource, dispatch_uid="media_push_student_resource_save")
+def _schedule_media_push(sender, instance, raw=False, **kwargs):
+    if raw or not media_push.staged_fields(instance):
+        return
+    media_push.schedule(instance)
+
+
+# =========================
+#   مراجع الكتل (MediaBlob)
+# =========================
+@receiver(post_save, sender=Lesson, dispatch_uid="media_refs_lesson_save")
+@receiver(post_save, sender=Resource, dispatch_uid="media_refs_resource_save")
+@receiver(post_save, sender=StudentResource, dispatch_uid="media_refs_student_resource_save")
+def _count_media_refs(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, "_loaded_media", {})
+    current = media_names(instance)
+    deltas = Counter()
+    for field_name, name in current.items():
+        old = loaded.get(field_name, "")
+        if name != old:
+            deltas[name] += 1
+            deltas[old] -= 1
+    deltas.pop("", None)
+    adjust_refs(deltas)
+    instance._loaded_media = current
+
+
+@receiver(post_delete, sender=Lesson, dispatch_uid="media_refs_lesson_delete")
+@receiver(post_delete, sender=Resource, dispatch_uid="media_refs_resource_delete")
+@receiver(post_delete, sender=StudentResource, dispatch_uid="media_refs_student_resource_delete")
+def _release_media_refs(sender, instance, **kwargs):
+    names = {**media_names(instance), **getattr(instance, "_loaded_media", {})}
+    adjust_refs(Counter({name: -1 for name in names.values() if name}))
@@ -0,0 +1,270 @@
+# teachers/storage.py
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+
+import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.uploader
+import cloudinary.utils
+from cloudinary_storage.storage import MediaCloudinaryStorage
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, InvalidStorageError, Storage, storages
+from django.core.files.uploadedfile import UploadedFile
+
+# اسم الملف المرحلي يحمل هذه البادئة حتى يُدفع للتخزين البعيد (teachers.media_push)
+STAGED_PREFIX = "staged/"
+
+# النموذج ← حقول الملفات المخزّنة هنا (مرحلية، ومعدودة المراجع في MediaBlob)
+MEDIA_FIELDS = {
+    "teachers.Lesson": ("video_file", "slide_file"),
+    "teachers.Resource": ("file",),
+    "students.Resource": ("file",),
+}
+
+
+def is_staged(name: str | None) -> bool:
+    return bool(name) and name.startswith(STAGED_PREFIX)
+
+
+def media_names(instance) -> dict[str, str]:
+    """أسماء ملفات الوسائط المحمّلة على الكائن (الحقول المؤجَّلة تُتجاهل)."""
+    names = {}
+    for field_name in MEDIA_FIELDS.get(instance._meta.label, ()):
+        if field_name in instance.__dict__:
+            value = instance.__dict__[field_name]
+            names[field_name] = getattr(value, "name", value) or ""
+    return names
+
+
+def is_registered(name: str | None) -> bool:
+    """الاسم كتلة في MediaBlob (كُتبت عبر course_media)، لا ملف قديم من التخزين العام."""
+    from .models import MediaBlob
+
+    return bool(name) and MediaBlob.objects.filter(name=name).exists()
+
+
+def staging_enabled() -> bool:
+    return bool(getattr(settings, "MEDIA_STAGING", True))
+
+
+def remote_storage() -> Storage:
+    """التخزين الخاص لملفات المقررات (STORAGES["course_media"]) وإلا الافتراضي."""
+    try:
+        return storages["course_media"]
+    except InvalidStorageError:
+        return storages["default"]
+
+
+def legacy_storage() -> Storage | None:
+    """
+    التخزين العام الذي رُفعت إليه الملفات قبل course_media (STORAGES["course_media_legacy"]):
+    الأسماء غير المسجّلة ككتل تُقرأ منه حتى ينقلها الأمر move_legacy_media.
+    """
+    try:
+        return storages["course_media_legacy"]
+    except InvalidStorageError:
+        return None
+
+
+# =========================
+#   Cloudinary بلا روابط عامة
+# =========================
+VIDEO_EXTS = {"mp4", "mov", "mkv", "webm"}
+
+
+class PrivateCloudinaryStorage(MediaCloudinaryStorage):
+    """
+    ملفات المقررات على Cloudinary بنوع authenticated: لا رابط توصيل عام دائم، وurl()
+    رابط تنزيل موقّع ينتهي بعد MEDIA_SIGNED_URL_TTL ثانية (core.media.serve_file
+    يحوّل إليه بعد التحقق من التسجيل). الفيديو بنوع video، وبقية الملفات raw.
+    الاسم المحفوظ يحمل الامتداد دائمًا (public_id للفيديو بدونه).
+    """
+
+    DELIVERY_TYPE = "authenticated"
+    signed_urls = True
+
+    def _get_resource_type(self, name):
+        ext = os.path.splitext(name)[1].lstrip(".").lower()
+        return "video" if ext in VIDEO_EXTS else "raw"
+
+    def _split(self, name: str) -> tuple[str, str, str]:
+        """(public_id، الصيغة، نوع المورد): raw يحتفظ بالامتداد في public_id."""
+        name = self._prepend_prefix(self._normalise_name(name))
+        resource_type = self._get_resource_type(name)
+        if resource_type == "raw":
+            return name, "", resource_type
+        public_id, ext = os.path.splitext(name)
+        return public_id, ext.lstrip("."), resource_type
+
+    def _save(self, name, content):
+        name = self._prepend_prefix(self._normalise_name(name))
+        resource_type = self._get_resource_type(name)
+        options = {
+            "use_filename": True, "unique_filename": False, "overwrite": False,
+            "resource_type": resource_type, "type": self.DELIVERY_TYPE, "tags": self.TAG,
+        }
+        folder = os.path.dirname(name)
+        if folder:
+            options["folder"] = folder
+        response = cloudinary.uploader.upload(UploadedFile(content, name), **options)
+        saved = response["public_id"]
+        if resource_type != "raw" and response.get("format"):
+            saved = f"{saved}.{response['format']}"
+        return saved
+
+    def delete(self, name):
+        public_id, _, resource_type = self._split(name)
+        response = cloudinary.uploader.destroy(
+            public_id, invalidate=True, resource_type=resource_type, type=self.DELIVERY_TYPE,
+        )
+        return response.get("result") == "ok"
+
+    def _get_url(self, name):
+        public_id, fmt, resource_type = self._split(name)
+        ttl = int(getattr(settings, "MEDIA_SIGNED_URL_TTL", 300))
+        return cloudinary.utils.private_download_url(
+            public_id, fmt, resource_type=resource_type, type=self.DELIVERY_TYPE,
+            expires_at=int(time.time()) + ttl,
+        )
+
+    def _resource(self, name) -> dict | None:
+        public_id, _, resource_type = self._split(name)
+        try:
+            return cloudinary.api.resource(public_id, resource_type=resource_type, type=self.DELIVERY_TYPE)
+        except cloudinary.exceptions.NotFound:
+            return None
+
+    def exists(self, name):
+        return self._resource(name) is not None
+
+    def size(self, name):
+        resource = self._resource(name)
+        if resource is None:
+            raise FileNotFoundError(name)
+        return int(resource["bytes"])
+
+
+class LegacyCloudinaryStorage(PrivateCloudinaryStorage):
+    """
+    ملفات المقررات القديمة على Cloudinary العام (MediaCloudinaryStorage: نوع image وupload،
+    والاسم public_id بلا امتداد). للقراءة والحذف فقط: url() رابط تنزيل موقّع مؤقت عبر
+    الـ API كالملفات الخاصة، والفتح يُنزّل لملف مؤقت بدل الذاكرة (فيديوهات كبيرة).
+    """
+
+    DELIVERY_TYPE = "upload"
+
+    def _split(self, name: str) -> tuple[str, str, str]:
+        return self._prepend_prefix(self._normalise_name(name)), "", "image"
+
+    def _save(self, name, content):
+        raise NotImplementedError("الكتابة تتم على course_media فقط.")
+
+    def _open(self, name, mode="rb"):
+        import requests
+
+        tmp = tempfile.TemporaryFile()
+        with requests.get(self.url(name), stream=True, timeout=60) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(name)
+            response.raise_for_status()
+            for chunk in response.iter_content(1024 * 1024):
+                tmp.write(chunk)
+        tmp.seek(0)
+        return File(tmp, name=self.original_filename(name))
+
+    def original_filename(self, name) -> str:
+        """اسم الملف بامتداده الأصلي (الصيغة من Cloudinary) ليُحفظ ككتلة بنفس النوع."""
+        base = os.path.basename(name)
+        resource = self._resource(name) or {}
+        fmt = resource.get("format")
+        return f"{base}.{fmt}" if fmt and not base.lower().endswith(f".{fmt.lower()}") else base
+
+
+def staging_storage() -> FileSystemStorage:
+    # يُبنى عند الطلب ليتبع override_settings في الاختبارات
+    return FileSystemStorage(
+        location=getattr(settings, "MEDIA_STAGING_DIR", settings.BASE_DIR / "tmp" / "staged"),
+        base_url=f"{settings.MEDIA_URL}{STAGED_PREFIX}",
+    )
+
+
+class StagedMediaStorage(Storage):
+    """
+    تخزين ملفات المحاضرات والمراجع: الحفظ معنون بالمحتوى (sha256) فالملف المكرر لا يُكتب
+    مرتين، والجديد يُكتب على القرص المحلي تحت STAGED_PREFIX فيعود الطلب فورًا، ثم يدفعه
+    العامل للتخزين الافتراضي (Cloudinary) ويستبدل الاسم. بقية العمليات تُوجَّه حسب الاسم:
+    مرحلي → محلي، كتلة مسجّلة → البعيد، غير ذلك (ملف قديم لم يُنقل بعد) → legacy_storage()
+    إن كان مضبوطًا. مع MEDIA_STAGING=False تُكتب الكتل على البعيد مباشرة.
+    """
+
+    def _pick(self, name: str) -> tuple[Storage, str]:
+        if is_staged(name):
+            return staging_storage(), name[len(STAGED_PREFIX):]
+        legacy = legacy_storage()
+        if legacy is not None and not is_registered(name):
+            return legacy, name
+        return remote_storage(), name
+
+    def generate_filename(self, filename):
+        return remote_storage().generate_filename(filename)
+
+    def save(self, name, content, max_length=None):
+        # المحتوى نفسه محفوظ مسبقًا؟ يُعاد اسم الكتلة بلا كتابة ولا نقل (teachers.blobs)
+        from .blobs import store
+        return store(self, name, content, max_length)
+
+    def write(self, name, content, max_length=None):
+        """الكتابة الفعلية: مرحليًا على القرص المحلي، أو مباشرة على البعيد."""
+        if not staging_enabled():
+            return remote_storage().save(name, content, max_length=max_length)
+        if max_length:
+            max_length -= len(STAGED_PREFIX)
+        return STAGED_PREFIX + staging_storage().save(name, content, max_length=max_length)
+
+    def _open(self, name, mode="rb"):
+        storage, name = self._pick(name)
+        return storage.open(name, mode)
+
+    def delete(self, name):
+        storage, name = self._pick(name)
+        storage.delete(name)
+
+    def exists(self, name):
+        storage, name = self._pick(name)
+        return storage.exists(name)
+
+    def size(self, name):
+        storage, name = self._pick(name)
+        return storage.size(name)
+
+    def url(self, name):
+        storage, name = self._pick(name)
+        return storage.url(name)
+
+    def has_signed_url(self, name) -> bool:
+        """عنوان الملف موقّع ومؤقت (آمن لتسليمه للطالب بتحويل) وليس رابطًا عامًا دائمًا."""
+        storage, _ = self._pick(name)
+        return bool(getattr(storage, "signed_urls", False))
+
+    def path(self, name):
+        storage, name = self._pick(name)
+        return storage.path(name)
+
+    def listdir(self, path):
+        return remote_storage().listdir(path)
+
+    def get_modified_time(self, name):
+        storage, name = self._pick(name)
+        return storage.get_modified_time(name)
+
+
+_course_media_storage = StagedMediaStorage()
+
+
+def course_media_storage() -> StagedMediaStorage:
+    """مرجع قابل للتسلسل في الهجرات (storage=callable)."""
+    return _course_media_storage
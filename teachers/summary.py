@@ -0,0 +1,98 @@
+# teachers/summary.py
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+
+# نسخة شكل الحمولة: تُرفع عند تغيير محتواها فتُهمل المفاتيح القديمة تلقائيًا
+SUMMARY_VERSION = 1
+
+DEFAULT_TTL_SECONDS = 15 * 60
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "TEACHER_DASHBOARD_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+
+
+def summary_key(teacher_id: int) -> str:
+    return f"teachers:dashboard:v{SUMMARY_VERSION}:{teacher_id}"
+
+
+def _count_sq(queryset, ref: str = "pk"):
+    return Coalesce(
+        Subquery(
+            queryset.filter(course_id=OuterRef(ref))
+            .order_by()
+            .values("course_id")
+            .annotate(c=Count("id"))
+            .values("c")[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def _build(tp) -> dict:
+    """استعلام واحد للمقررات مع عدّاداتها، ثم تُشتق الإجماليات من القائمة نفسها."""
+    from .models import Course, Lesson
+
+    courses = list(
+        Course.objects.filter(teacher=tp)
+        .select_related("subject")
+        .with_students_total()
+        .annotate(lessons_total=_count_sq(Lesson.objects))
+        .order_by("-id")
+    )
+    return {
+        "courses": courses,
+        "courses_data": [
+            {
+                "id": c.id,
+                "title": c.title,
+                "subject": c.subject.name if c.subject_id else "",
+                "stage": c.subject.stage if c.subject_id else "",
+                "students": c.students_total,
+                "cover": c.cover_image_url or "",
+                "detailUrl": reverse("teachers:course_detail", kwargs={"course_id": c.id}),
+            }
+            for c in courses
+        ],
+        "total_courses": len(courses),
+        "total_lessons": sum(c.lessons_total for c in courses),
+        "total_students": sum(c.students_total for c in courses),
+    }
+
+
+def get_summary(tp) -> dict:
+    """
+    ملخص لوحة المعلّم: قراءة كاش واحدة عند الإصابة، وإلا استعلام واحد ثم التخزين.
+    المفاتيح: courses, courses_data, total_courses, total_lessons, total_students.
+    """
+    key = summary_key(tp.pk)
+    payload = cache.get(key)
+    if payload is None:
+        payload = _build(tp)
+        cache.set(key, payload, _ttl())
+    return payload
+
+
+def invalidate_teachers(teacher_ids) -> None:
+    """يحذف ملخصات المعلّمين المعنيين بعد نجاح المعاملة."""
+    keys = [summary_key(int(pk)) for pk in set(teacher_ids) if pk]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_courses(course_ids) -> None:
+    """إبطال ملخصات أصحاب المقررات (Enrollment/Lesson/Resource تشير للمقرر بالمعرّف)."""
+    from .models import Course
+
+    course_ids = {int(pk) for pk in course_ids if pk}
+    if course_ids:
+        invalidate_teachers(
+            Course.objects.filter(pk__in=course_ids).values_list("teacher_id", flat=True)
+        )
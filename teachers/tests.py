@@ -0,0 +1,388 @@
+import base64
+import hashlib
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+import cloudinary
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import CustomUser
+from core.testing import LOCMEM_CACHE
+from students.models import Course as StudentCourse, Enrollment
+
+from .blobs import REUSE_GRACE, collect_garbage
+from .models import (
+    Course, Lesson, MediaBlob, Resource, Subject, TeacherProfile, UploadSession, lecture_upload_to, material_upload_to,
+)
+from .checks import shared_cache_check
+from .storage import (
+    STAGED_PREFIX, LegacyCloudinaryStorage, PrivateCloudinaryStorage, course_media_storage, is_staged, legacy_storage,
+    staging_storage,
+)
+from .summary import get_summary, summary_key
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TeacherDashboardSummaryTests(TestCase):
+    """ملخص لوحة المعلّم: استعلام واحد عند البناء، لا شيء عند الإصابة، وإبطال عند التغيير."""
+
+    def setUp(self):
+        cache.clear()
+        user = CustomUser.objects.create_user("teacher", password="pass-12345", role="teacher")
+        self.tp = TeacherProfile.objects.create(user=user)
+        subject = Subject.objects.create(name="فيزياء", stage="ثانوي")
+        self.courses = [
+            Course.objects.create(teacher=self.tp, subject=subject, title=f"مقرر {i}") for i in range(3)
+        ]
+
+    def test_single_query_then_cache_hit(self):
+        with self.assertNumQueries(1):
+            summary = get_summary(self.tp)
+        self.assertEqual(summary["total_courses"], 3)
+        with self.assertNumQueries(0):
+            get_summary(self.tp)
+
+    @override_settings(DEBUG=False)
+    def test_process_local_cache_is_flagged(self):
+        self.assertEqual([w.id for w in shared_cache_check(None)], ["teachers.W001"])
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                                                   "LOCATION": "django_cache"}}):
+            self.assertEqual(shared_cache_check(None), [])
+
+    def test_lesson_and_enrollment_invalidate(self):
+        course = self.courses[0]
+        get_summary(self.tp)
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.create(course=course, order=1, title="مقدمة")
+        self.assertIsNone(cache.get(summary_key(self.tp.pk)))
+        self.assertEqual(get_summary(self.tp)["total_lessons"], 1)
+
+        # Enrollment يشير لدورة الطالب بنفس المعرّف
+        student = CustomUser.objects.create_user("s1", password="pass-12345", role="student").student_profile
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=student, course=StudentCourse.objects.create(pk=course.pk, title="x"))
+        self.assertEqual(get_summary(self.tp)["total_students"], 1)
+
+
+_TMP = tempfile.mkdtemp(prefix="store-tests-")
+_LOCAL_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+# FileSystemStorage بدل Cloudinary كتخزين "بعيد"، والدفع في نفس الخيط بعد المعاملة
+_LOCAL_MEDIA = {
+    "STORAGES": _LOCAL_STORAGES,
+    "MEDIA_ROOT": f"{_TMP}/media",
+    "MEDIA_STAGING_DIR": f"{_TMP}/staged",
+    "MEDIA_PUSH_WORKERS": 0,
+}
+
+
+@override_settings(**_LOCAL_MEDIA, RESUMABLE_UPLOAD_DIR=f"{_TMP}/uploads")
+class ResumableUploadTests(TestCase):
+    """بروتوكول الرفع المجزّأ: إنشاء، أجزاء بتحقق sha256، استئناف عبر HEAD، ثم ربط بالنموذج."""
+
+    PAYLOAD = b"%PDF-1.4\n" + b"x" * 5000
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(_TMP, ignore_errors=True)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("uploader", password="pass-12345", role="teacher")
+        self.course = Course.objects.create(
+            teacher=TeacherProfile.objects.create(user=self.user),
+            subject=Subject.objects.create(name="أحياء", stage="ثانوي"),
+            title="خلية",
+        )
+        self.client.force_login(self.user)
+
+    def _create(self, name="notes.pdf", target=UploadSession.TARGET_RESOURCE_FILE, length=None):
+        meta = f"filename {base64.b64encode(name.encode()).decode()},target {base64.b64encode(target.encode()).decode()}"
+        return self.client.post(
+            reverse("teachers:upload_create"),
+            HTTP_UPLOAD_LENGTH=str(len(self.PAYLOAD) if length is None else length),
+            HTTP_UPLOAD_METADATA=meta,
+        )
+
+    def _patch(self, url, offset, chunk, checksum=None):
+        digest = checksum or hashlib.sha256(chunk).digest()
+        return self.client.generic(
+            "PATCH", url, chunk, content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+            HTTP_UPLOAD_CHECKSUM="sha256 " + base64.b64encode(digest).decode(),
+        )
+
+    def test_rejects_bad_extension_and_size(self):
+        self.assertEqual(self._create(name="virus.exe").status_code, 415)
+        self.assertEqual(self._create(length=101 * 1024 * 1024).status_code, 413)
+
+    def test_chunks_resume_and_attach(self):
+        created = self._create()
+        self.assertEqual(created.status_code, 201)
+        url = created["Location"]
+        first, rest = self.PAYLOAD[:4096], self.PAYLOAD[4096:]
+
+        self.assertEqual(self._patch(url, 0, first, checksum=b"\0" * 32).status_code, 460)
+        self.assertEqual(self._patch(url, 0, first).status_code, 204)
+        self.assertEqual(self._patch(url, 0, first).status_code, 409)
+        self.assertEqual(self.client.head(url)["Upload-Offset"], str(len(first)))
+        done = self._patch(url, len(first), rest)
+        self.assertEqual(done["Upload-Offset"], str(len(self.PAYLOAD)))
+
+        upload = UploadSession.objects.get()
+        self.assertEqual(upload.status, UploadSession.STATUS_COMPLETE)
+        self.assertEqual(upload.sha256, hashlib.sha256(self.PAYLOAD).hexdigest())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("teachers:add_resource", args=[self.course.pk]),
+                {"title": "ملزمة", "kind": "sheet", "file_upload": str(upload.pk)},
+            )
+        self.assertEqual(response.status_code, 302)
+        resource = Resource.objects.get()
+        with resource.file.open("rb") as fh:
+            self.assertEqual(fh.read(), self.PAYLOAD)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, UploadSession.STATUS_CONSUMED)
+
+
+@override_settings(**_LOCAL_MEDIA)
+class StreamingUploadValidationTests(TestCase):
+    """المعالج المتدفق يرفض الملف من أول جزء إن لم يطابق توقيعه امتداده."""
+
+    def setUp(self):
+        user = CustomUser.objects.create_user("streamer", password="pass-12345", role="teacher")
+        self.course = Course.objects.create(
+            teacher=TeacherProfile.objects.create(user=user),
+            subject=Subject.objects.create(name="كيمياء", stage="ثانوي"),
+            title="روابط",
+        )
+        self.client.force_login(user)
+
+    def _post(self, name, content):
+        return self.client.post(
+            reverse("teachers:add_resource", args=[self.course.pk]),
+            {"title": "ملف", "kind": "book", "file": SimpleUploadedFile(name, content)},
+        )
+
+    def test_wrong_magic_is_rejected(self):
+        response = self._post("notes.pdf", b"MZ\x90\x00" + b"\0" * 70000)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("file", response.context["form"].errors)
+        self.assertFalse(Resource.objects.exists())
+
+    def test_valid_file_is_hashed_and_saved(self):
+        content = b"%PDF-1.7\n" + b"y" * 70000
+        self.assertEqual(self._post("notes.pdf", content).status_code, 302)
+        with Resource.objects.get().file.open("rb") as fh:
+            self.assertEqual(hashlib.sha256(fh.read()).hexdigest(), hashlib.sha256(content).hexdigest())
+
+
+@override_settings(**_LOCAL_MEDIA)
+class StagedMediaPushTests(TestCase):
+    """الحفظ يكتب محليًا ويعود فورًا؛ الدفع بعد المعاملة ينقل الملف ويستبدل اسم الحقل."""
+
+    CONTENT = b"%PDF-1.4\n" + b"z" * 2048
+
+    def setUp(self):
+        self.course = Course.objects.create(
+            teacher=TeacherProfile.objects.create(
+                user=CustomUser.objects.create_user("stager", password="pass-12345", role="teacher"),
+            ),
+            subject=Subject.objects.create(name="تاريخ", stage="ثانوي"),
+            title="حضارات",
+        )
+
+    def test_saved_locally_then_swapped_to_remote(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            resource = Resource.objects.create(
+                course=self.course, title="ملزمة", file=SimpleUploadedFile("notes.pdf", self.CONTENT),
+            )
+        staged = resource.file.name
+        self.assertTrue(staged.startswith(STAGED_PREFIX))
+        self.assertTrue(resource.media_pending)
+        self.assertFalse(default_storage.exists(staged[len(STAGED_PREFIX):]))
+
+        for callback in callbacks:
+            callback()
+        resource.refresh_from_db()
+        self.assertFalse(resource.media_pending)
+        self.assertFalse(staging_storage().exists(staged[len(STAGED_PREFIX):]))
+        with default_storage.open(resource.file.name, "rb") as fh:
+            self.assertEqual(fh.read(), self.CONTENT)
+
+    @override_settings(MEDIA_STAGING=False)
+    def test_staging_disabled_saves_directly(self):
+        resource = Resource.objects.create(
+            course=self.course, title="مباشر", file=SimpleUploadedFile("direct.pdf", self.CONTENT + b"direct"),
+        )
+        self.assertFalse(resource.media_pending)
+        self.assertTrue(default_storage.exists(resource.file.name))
+
+
+@override_settings(**_LOCAL_MEDIA)
+class ContentAddressedStorageTests(TestCase):
+    """نفس المحتوى في عدة مقررات = كتلة واحدة بعدّاد مراجع، تُحذف مع آخر مرجع فقط."""
+
+    CONTENT = b"%PDF-1.5\n" + b"shared" * 1000
+
+    def setUp(self):
+        tp = TeacherProfile.objects.create(
+            user=CustomUser.objects.create_user("sharer", password="pass-12345", role="teacher"),
+        )
+        subject = Subject.objects.create(name="جغرافيا", stage="ثانوي")
+        self.courses = [Course.objects.create(teacher=tp, subject=subject, title=f"خرائط {i}") for i in range(3)]
+
+    def _add(self, course):
+        with self.captureOnCommitCallbacks(execute=True):
+            resource = Resource.objects.create(
+                course=course, title="أطلس", file=SimpleUploadedFile("atlas.pdf", self.CONTENT),
+            )
+        resource.refresh_from_db()
+        return resource
+
+    def test_duplicates_share_one_blob(self):
+        resources = [self._add(course) for course in self.courses]
+        self.assertEqual(len({r.file.name for r in resources}), 1)
+        blob = MediaBlob.objects.get()
+        self.assertEqual((blob.name, blob.refs), (resources[0].file.name, 3))
+        self.assertEqual(blob.sha256, hashlib.sha256(self.CONTENT).hexdigest())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resources[0].delete()
+            self.courses[1].delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refs, 1)
+        self.assertTrue(default_storage.exists(blob.name))
+
+        # آخر مرجع: الكتلة مُعاد استخدامها للتو فتبقى محجوزة حتى تنقضي المهلة
+        with self.captureOnCommitCallbacks(execute=True):
+            resources[2].delete()
+        self.assertTrue(MediaBlob.objects.filter(pk=blob.pk, refs=0).exists())
+        self.assertEqual(collect_garbage(used_before=timezone.now() + timedelta(seconds=1)), 1)
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
+    def test_reuse_reserves_unreferenced_blob(self):
+        resource = self._add(self.courses[0])
+        name = resource.file.name
+        old = timezone.now() - REUSE_GRACE - timedelta(minutes=1)
+        MediaBlob.objects.update(refs=0, last_used_at=old)
+
+        # حفظ جديد لنفس المحتوى يعيد الكتلة ويحجزها قبل أن تزيد الإشارة refs
+        reused = course_media_storage().save("again.pdf", SimpleUploadedFile("again.pdf", self.CONTENT))
+        self.assertEqual(reused, name)
+        self.assertEqual(collect_garbage(), 0)
+        self.assertTrue(default_storage.exists(name))
+
+        MediaBlob.objects.update(last_used_at=old)
+        self.assertEqual(collect_garbage(), 1)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_upload_to_keeps_only_the_extension(self):
+        self.assertEqual(material_upload_to(None, "ملف الفصل الأول.PDF"), "upload.pdf")
+        self.assertEqual(lecture_upload_to(None, "intro"), "upload")
+
+
+class PrivateCloudinaryStorageTests(SimpleTestCase):
+    """ملفات المقررات على Cloudinary تُسلَّم برابط تنزيل موقّع مؤقت لا برابط عام."""
+
+    @override_settings(MEDIA_SIGNED_URL_TTL=120)
+    def test_url_is_signed_and_expires(self):
+        config = cloudinary.config()
+        with mock.patch.multiple(config, cloud_name="demo", api_key="key", api_secret="secret", create=True):
+            url = PrivateCloudinaryStorage().url("blobs/ab/abc.mp4")
+        query = parse_qs(urlsplit(url).query)
+        self.assertIn("/video/download", url)
+        self.assertEqual(query["type"], ["authenticated"])
+        self.assertTrue(query["public_id"][0].endswith("blobs/ab/abc"))
+        self.assertEqual(query["format"], ["mp4"])
+        self.assertIn("signature", query)
+        self.assertLessEqual(int(query["expires_at"][0]) - int(query["timestamp"][0]), 120)
+
+    def test_legacy_public_files_get_signed_download_urls(self):
+        config = cloudinary.config()
+        with mock.patch.multiple(config, cloud_name="demo", api_key="key", api_secret="secret", create=True):
+            url = LegacyCloudinaryStorage().url("media/lectures/intro/2024-01-01_slides_x1y2")
+        query = parse_qs(urlsplit(url).query)
+        self.assertIn("/image/download", url)
+        self.assertEqual(query["type"], ["upload"])
+        self.assertTrue(query["public_id"][0].endswith("lectures/intro/2024-01-01_slides_x1y2"))
+        self.assertIn("expires_at", query)
+        self.assertIn("signature", query)
+
+
+_LEGACY_MEDIA = {
+    **_LOCAL_MEDIA,
+    "STORAGES": {
+        **_LOCAL_STORAGES,
+        "course_media_legacy": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": f"{_TMP}/legacy"},
+        },
+    },
+}
+
+
+@override_settings(**_LEGACY_MEDIA)
+class LegacyMediaTests(TestCase):
+    """ملفات ما قبل course_media تُقرأ من التخزين القديم حتى ينقلها move_legacy_media ككتل."""
+
+    CONTENT = b"%PDF-1.4\n" + b"legacy" * 500
+    NAME = "lectures/physics/2024-01-01_waves.pdf"
+
+    def setUp(self):
+        course = Course.objects.create(
+            teacher=TeacherProfile.objects.create(
+                user=CustomUser.objects.create_user("veteran", password="pass-12345", role="teacher"),
+            ),
+            subject=Subject.objects.create(name="فيزياء", stage="ثانوي"),
+            title="موجات",
+        )
+        legacy_storage().save(self.NAME, ContentFile(self.CONTENT))
+        self.lessons = [
+            Lesson.objects.create(course=course, order=i, title=f"درس {i}", slide_file=self.NAME) for i in (1, 2)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(f"{_TMP}/legacy", ignore_errors=True)
+
+    def test_unregistered_names_fall_back_to_legacy_storage(self):
+        fieldfile = self.lessons[0].slide_file
+        self.assertTrue(fieldfile.storage.exists(self.NAME))
+        self.assertEqual(fieldfile.size, len(self.CONTENT))
+        with fieldfile.open("rb") as fh:
+            self.assertEqual(fh.read(), self.CONTENT)
+        self.assertFalse(default_storage.exists(self.NAME))
+
+    def test_command_moves_files_into_blobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("move_legacy_media", stdout=StringIO())
+
+        names = set(Lesson.objects.values_list("slide_file", flat=True))
+        self.assertEqual(len(names), 1)
+        blob = MediaBlob.objects.get()
+        self.assertEqual((blob.name, blob.refs), (names.pop(), 2))
+        self.assertTrue(blob.name.endswith(".pdf"))
+        self.assertFalse(is_staged(blob.name))
+        with default_storage.open(blob.name, "rb") as fh:
+            self.assertEqual(fh.read(), self.CONTENT)
+        self.assertFalse(legacy_storage().exists(self.NAME))
+
+        # تشغيل ثانٍ لا يجد ما ينقله
+        out = StringIO()
+        call_command("move_legacy_media", "--dry-run", stdout=out)
+        self.assertIn("0", out.getvalue())
@@ -0,0 +1,136 @@
+# teachers/upload_handlers.py
+from __future__ import annotations
+
+import hashlib
+import os
+from functools import wraps
+
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from .models import (
+    ALLOWED_DOC_EXTS, ALLOWED_SLIDE_EXTS, ALLOWED_VIDEO_EXTS,
+    MAX_FILE_MB, MAX_VIDEO_MB,
+)
+
+# =========================
+#      التواقيع (magic)
+# =========================
+SNIFF_BYTES = 16
+
+_PDF = (b"%PDF-",)
+_OLE2 = (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",)            # doc/ppt/xls القديمة
+_ZIP = (b"PK\x03\x04", b"PK\x05\x06")                      # docx/pptx/xlsx/zip
+_EBML = (b"\x1a\x45\xdf\xa3",)                              # mkv/webm
+_ISO_BOX = (b"ftyp", b"moov", b"mdat", b"wide", b"free")   # mp4/mov: النوع عند الإزاحة 4
+
+EXT_SIGNATURES = {
+    "pdf": _PDF,
+    "doc": _OLE2, "ppt": _OLE2,
+    "docx": _ZIP, "pptx": _ZIP, "pptm": _ZIP, "xlsx": _ZIP, "zip": _ZIP,
+    "mkv": _EBML, "webm": _EBML,
+}
+ISO_EXTS = {"mp4", "mov"}
+
+
+def file_ext(name: str) -> str:
+    name = os.path.basename(name or "")
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def matches_signature(ext: str, head: bytes) -> bool:
+    """هل تطابق البايتات الأولى توقيع الامتداد؟ (لا نثق بـ content_type القادم من المتصفح)."""
+    if ext in ISO_EXTS:
+        return head[4:8] in _ISO_BOX
+    signatures = EXT_SIGNATURES.get(ext)
+    return bool(signatures) and head.startswith(signatures)
+
+
+def sniff_file(uploaded) -> bool:
+    """فحص ملف مستلم بالفعل (مسار بلا المعالج أدناه): يقرأ البايتات الأولى ثم يعيد المؤشر."""
+    pos = uploaded.tell()
+    uploaded.seek(0)
+    head = uploaded.read(SNIFF_BYTES)
+    uploaded.seek(pos)
+    return matches_signature(file_ext(uploaded.name), head)
+
+
+# اسم الحقل في نماذج المعلّم ← (الحد الأقصى بالميغابايت، الامتدادات المسموحة)
+FIELD_RULES = {
+    "video_file": (MAX_VIDEO_MB, ALLOWED_VIDEO_EXTS),
+    "slide_file": (MAX_FILE_MB, ALLOWED_SLIDE_EXTS),
+    "file": (MAX_FILE_MB, ALLOWED_DOC_EXTS + ALLOWED_SLIDE_EXTS),
+}
+
+
+# =========================
+#     معالج الرفع المتدفق
+# =========================
+class ValidatingUploadHandler(TemporaryFileUploadHandler):
+    """
+    يتحقق أثناء الاستقبال: الامتداد عند بدء الملف، التوقيع من أول جزء، والحجم
+    مع كل جزء؛ المخالفة توقف قراءة الطلب فورًا (StopUpload) بدل تخزين الملف كاملًا.
+    يحسب sha256 أثناء الكتابة ويضعه على الملف الناتج (uploaded.sha256).
+    سبب الرفض يُحفظ في request.upload_errors[field_name] ليعرضه النموذج.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        if request is not None:
+            request.upload_errors = {}
+
+    def _reject(self, message: str):
+        if self.request is not None:
+            self.request.upload_errors[self.field_name] = message
+        raise StopUpload(connection_reset=True)
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.rules = FIELD_RULES.get(field_name)
+        self.digest = hashlib.sha256()
+        self.received = 0
+        self.head = b""
+        if self.rules and file_ext(file_name) not in self.rules[1]:
+            self._reject("امتداد الملف غير مسموح.")
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.rules:
+            max_mb, _ = self.rules
+            if self.received > max_mb * 1024 * 1024:
+                self._reject(f"حجم الملف يتجاوز {max_mb}MB")
+            if len(self.head) < SNIFF_BYTES:
+                self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+                if len(self.head) >= SNIFF_BYTES and not matches_signature(file_ext(self.file_name), self.head):
+                    self._reject("محتوى الملف لا يطابق امتداده.")
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.rules and len(self.head) < SNIFF_BYTES and not matches_signature(file_ext(self.file_name), self.head):
+            # ملف أقصر من نافذة الفحص: نُسقطه (لا نرفع StopUpload بعد انتهاء القراءة)
+            self.request.upload_errors[self.field_name] = "محتوى الملف لا يطابق امتداده."
+            self.file.close()
+            return None
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.digest.hexdigest()
+        uploaded.sniffed = bool(self.rules)
+        return uploaded
+
+
+def validated_uploads(view):
+    """
+    يركّب ValidatingUploadHandler قبل أي قراءة لـ request.POST/FILES.
+    CsrfViewMiddleware يقرأ POST في process_view، لذا يُعفى الغلاف ويُحمى العرض الداخلي
+    (النمط الموثّق في Django لتغيير upload_handlers).
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method == "POST":
+            request.upload_handlers = [ValidatingUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+
+    return wrapped
@@ -18,6 +18,12 @@ urlpatterns = [
     path("course/<int:course_id>/lesson/add/", views.add_lesson, name="add_lesson"),
     path("course/<int:course_id>/resource/add/", views.add_resource, name="add_resource"),
 
+    # =========================
+    #   رفع قابل للاستئناف (tus)
+    # =========================
+    path("uploads/", views.upload_create, name="upload_create"),
+    path("uploads/<uuid:upload_id>/", views.upload_detail, name="upload_detail"),
+
     # =========================
     #   روابط Teams (للمعلّم)
     # =========================
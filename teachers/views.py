@@ -4,7 +4,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Count, OuterRef, Subquery, Prefetch
+from django.db.models import Prefetch
 
 from django.http import HttpRequest, HttpResponse
 from django.http.response import HttpResponseForbidden
@@ -12,10 +12,14 @@ from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 
+from core.profiles import teacher_profile_for
 from students.models import Enrollment
 from store.models import Booking
-from .models import TeacherProfile, Course, Lesson, Resource, Subject
+from . import resumable
+from .models import TeacherProfile, Course, Lesson, Resource, Subject, UploadSession
 from .forms import LessonForm, ResourceForm, SubjectForm, CourseForm
+from .summary import get_summary
+from .upload_handlers import validated_uploads
 
 # (اختياري) Cloudinary Errors
 try:
@@ -29,11 +33,8 @@ except Exception:
 #  أدوات مساعدة
 # =========================
 def _get_teacher_profile(user) -> TeacherProfile | None:
-    """إرجاع TeacherProfile للمستخدم الحالي."""
-    tp = getattr(user, "teacher_profile", None) or getattr(user, "teacherprofile", None)
-    if tp:
-        return tp
-    return TeacherProfile.objects.filter(user=user).first()
+    """إرجاع TeacherProfile للمستخدم الحالي (مخزّن على المستخدم لبقية الطلب)."""
+    return teacher_profile_for(user)
 
 
 def _ensure_teacher(user) -> bool:
@@ -64,52 +65,16 @@ def teacher_dashboard(request: HttpRequest) -> HttpResponse:
     if not tp:
         return HttpResponseForbidden("غير مصرّح")
 
-    # عدّ الطلاب لكل كورس
-    enroll_count_sq = (
-        Enrollment.objects
-        .filter(course_id=OuterRef("pk"))
-        .values("course_id")
-        .annotate(c=Count("id"))
-        .values("c")[:1]
-    )
-
-    courses_qs = (
-        Course.objects.filter(teacher=tp)
-        .select_related("subject")
-        .prefetch_related(
-            Prefetch("lessons", queryset=Lesson.objects.only("id", "title", "order").order_by("order")),
-            Prefetch("resources", queryset=Resource.objects.only("id", "title", "created_at", "kind").order_by("-id")),
-        )
-        .annotate(students_total=Subquery(enroll_count_sq))
-        .order_by("-id")
-    )
-
-    # إحصائيات عامة
-    total_courses = courses_qs.count()
-    total_lessons = Lesson.objects.filter(course__teacher=tp).count()
-    total_students = sum(c.students_total or 0 for c in courses_qs)
-
-    courses_data = [
-        {
-            "id": c.id,
-            "title": c.title,
-            "subject": c.subject.name if c.subject_id else "",
-            "stage": c.subject.stage if c.subject_id else "",
-            "students": c.students_total or 0,
-            "cover": getattr(c, "cover_image_url", "") or "",
-            "detailUrl": reverse("teachers:course_detail", kwargs={"course_id": c.id}),
-        }
-        for c in courses_qs
-    ]
-
+    # ملخص مخزّن: المقررات وعدّاداتها والإجماليات محسوبة بتقييم واحد (teachers.summary)
+    summary = get_summary(tp)
     ctx = {
         "tp": tp,
         "teacher_name": request.user.get_full_name() or request.user.username,
-        "courses": courses_qs,
-        "courses_data": courses_data,
-        "total_courses": total_courses,
-        "total_lessons": total_lessons,
-        "total_students": total_students,
+        "courses": summary["courses"],
+        "courses_data": summary["courses_data"],
+        "total_courses": summary["total_courses"],
+        "total_lessons": summary["total_lessons"],
+        "total_students": summary["total_students"],
     }
     return render(request, "teachers/dashboard.html", ctx)
 
@@ -203,6 +168,7 @@ def update_teams_link(request: HttpRequest, course_id: int) -> HttpResponse:
 # =========================
 #  إضافة محاضرة
 # =========================
+@validated_uploads
 @login_required
 @require_http_methods(["GET", "POST"])
 def add_lesson(request: HttpRequest, course_id: int) -> HttpResponse:
@@ -212,16 +178,20 @@ def add_lesson(request: HttpRequest, course_id: int) -> HttpResponse:
     course = get_object_or_404(Course, pk=course_id, teacher=tp)
 
     if request.method == "POST":
-        form = LessonForm(request.POST, request.FILES)
+        form = LessonForm(
+            request.POST, request.FILES,
+            uploader=request.user, upload_errors=getattr(request, "upload_errors", None),
+        )
         if form.is_valid():
             obj = form.save(commit=False)
             obj.course = course
+            form.attach_uploads(obj)
             obj.save()
             messages.success(request, "✅ تم إضافة المحاضرة.")
             return redirect("teachers:course_detail", course_id=course.id)
         messages.error(request, "تحقّقي من الحقول.")
     else:
-        form = LessonForm()
+        form = LessonForm(uploader=request.user)
 
     return render(request, "teachers/lesson_form.html", {"form": form, "course": course})
 
@@ -229,6 +199,7 @@ def add_lesson(request: HttpRequest, course_id: int) -> HttpResponse:
 # =========================
 #  إضافة مرجع
 # =========================
+@validated_uploads
 @login_required
 @require_http_methods(["GET", "POST"])
 def add_resource(request: HttpRequest, course_id: int) -> HttpResponse:
@@ -238,16 +209,20 @@ def add_resource(request: HttpRequest, course_id: int) -> HttpResponse:
     course = get_object_or_404(Course, pk=course_id, teacher=tp)
 
     if request.method == "POST":
-        form = ResourceForm(request.POST, request.FILES)
+        form = ResourceForm(
+            request.POST, request.FILES,
+            uploader=request.user, upload_errors=getattr(request, "upload_errors", None),
+        )
         if form.is_valid():
             obj = form.save(commit=False)
             obj.course = course
+            form.attach_uploads(obj)
             obj.save()
             messages.success(request, "✅ تم إضافة المرجع.")
             return redirect("teachers:course_detail", course_id=course.id)
         messages.error(request, "تحقّقي من الحقول.")
     else:
-        form = ResourceForm()
+        form = ResourceForm(uploader=request.user)
 
     return render(request, "teachers/resource_form.html", {"form": form, "course": course})
 
@@ -323,3 +298,69 @@ def teacher_bookings(request: HttpRequest) -> HttpResponse:
     )
 
     return render(request, "teachers/bookings.html", {"bookings": bookings})
+
+
+# =========================
+#  رفع قابل للاستئناف (tus)
+# =========================
+def _tus_response(status: int, upload: UploadSession | None = None, message: str = "") -> HttpResponse:
+    response = HttpResponse(message, status=status, content_type="text/plain; charset=utf-8")
+    response["Tus-Resumable"] = resumable.TUS_VERSION
+    response["Cache-Control"] = "no-store"
+    if upload is not None:
+        response["Upload-Offset"] = str(upload.offset)
+        response["Upload-Length"] = str(upload.length)
+    return response
+
+
+def _header_int(request: HttpRequest, name: str) -> int:
+    try:
+        return int(request.headers.get(name, ""))
+    except ValueError:
+        raise resumable.UploadError(f"{name} مطلوب.")
+
+
+@login_required
+@require_http_methods(["POST"])
+def upload_create(request: HttpRequest) -> HttpResponse:
+    """
+    إنشاء رفع: Upload-Length و Upload-Metadata (filename, target).
+    يُرجع 201 مع Location لمسار PATCH/HEAD.
+    """
+    if not _ensure_teacher(request.user):
+        return HttpResponseForbidden("غير مصرّح")
+    try:
+        meta = resumable.parse_metadata(request.headers.get("Upload-Metadata", ""))
+        upload = resumable.create_upload(
+            request.user, meta.get("target", ""), meta.get("filename", ""),
+            _header_int(request, "Upload-Length"),
+        )
+    except resumable.UploadError as e:
+        return _tus_response(e.status, message=str(e))
+
+    response = _tus_response(201, upload)
+    response["Location"] = reverse("teachers:upload_detail", kwargs={"upload_id": upload.pk})
+    return response
+
+
+@login_required
+@require_http_methods(["HEAD", "PATCH"])
+def upload_detail(request: HttpRequest, upload_id) -> HttpResponse:
+    """HEAD: الإزاحة الحالية للاستئناف. PATCH: جزء بترويسة Upload-Offset و Upload-Checksum."""
+    upload = get_object_or_404(UploadSession, pk=upload_id, owner=request.user)
+    if request.method == "HEAD":
+        return _tus_response(200, upload)
+
+    if request.content_type != "application/offset+octet-stream":
+        return _tus_response(415, upload, "Content-Type يجب أن يكون application/offset+octet-stream")
+    try:
+        upload = resumable.append_chunk(
+            upload,
+            offset=_header_int(request, "Upload-Offset"),
+            stream=request,
+            size=_header_int(request, "Content-Length"),
+            checksum=resumable.parse_checksum(request.headers.get("Upload-Checksum", "")),
+        )
+    except resumable.UploadError as e:
+        return _tus_response(e.status, upload, str(e))
+    return _tus_response(204, upload)